@@ -10,6 +10,7 @@ from app.models import AdminHomeData
 from app import app, celery
 from app.admin_home.admin_home_utils import (
     parse_and_add_new_admin_view_data)
+from app.report_store_util import async_garbage_collect_report_stores
 
 log = logging.getLogger(__name__)
 
@@ -54,4 +55,18 @@ class AdminHomeApi(ModelRestApi):
             return self.response(200, message='loaded new data')
         except Exception as e:
             log.error(f"Failed to load new admin home data: {e}")
-            return self.response_500(message='failed to load data')
\ No newline at end of file
+            return self.response_500(message='failed to load data')
+
+    @expose('/cleanup_report_store',  methods=['POST'])
+    @protect()
+    def cleanup_report_store(self):
+        try:
+            msg = (
+                async_garbage_collect_report_stores
+                .apply_async()
+            )
+            log.debug(f"Submitted report store cleanup, {msg}")
+            return self.response(200, message='submitted report store cleanup')
+        except Exception as e:
+            log.error(f"Failed to submit report store cleanup: {e}")
+            return self.response_500(message='failed to submit cleanup')
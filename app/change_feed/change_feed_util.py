@@ -0,0 +1,371 @@
+import json
+import base64
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Tuple
+from yaml import load, Loader
+from sqlalchemy import update
+from app import db
+from app.models import (
+    RawMetadataModel,
+    RawCosMxMetadataModel,
+    RawAnalysisV2,
+    RawSeqrun,
+    SampleSheetModel)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHANGE_FEED_LIMIT = 100
+MAX_CHANGE_FEED_LIMIT = 1000
+
+
+class ChangeFeed:
+    '''
+        A class for describing a change feed of pipeline facing items, i.e. the rows
+        in the pending status ordered by their update time and id. A feed is a
+        pending queue, not a change log: items leave it when they are acknowledged
+        or moved out of the pending status, and changes of the other items are
+        not listed
+
+        :param name: Name of the feed
+        :param model: SQLAlchemy model of the items
+        :param id_column: Id column of the model
+        :param time_column: Update time column of the model
+        :param pending_status: Status of the items listed in the feed, e.g. READY
+        :param acknowledged_status: Status set for the acknowledged items, e.g. SYNCHED
+        :param payload_columns: A list of columns for the item payload
+        :param format_payload: An optional function for formatting a payload dictionary
+        :param join_columns: An optional list of (model, onclause) for the payload columns
+    '''
+    def __init__(
+        self,
+        name: str,
+        model: Any,
+        id_column: Any,
+        time_column: Any,
+        pending_status: str,
+        acknowledged_status: str,
+        payload_columns: list,
+        format_payload: Optional[Callable[[dict], dict]] = None,
+        join_columns: Optional[list] = None):
+        self.name = name
+        self.model = model
+        self.id_column = id_column
+        self.time_column = time_column
+        self.pending_status = pending_status
+        self.acknowledged_status = acknowledged_status
+        self.payload_columns = payload_columns
+        self.format_payload = format_payload
+        self.join_columns = join_columns or list()
+
+
+def _format_raw_analysis_payload(payload: dict) -> dict:
+    analysis_yaml = payload.get('analysis_yaml')
+    if analysis_yaml is not None:
+        payload['analysis_yaml'] = \
+            load(analysis_yaml, Loader=Loader)
+    return payload
+
+
+CHANGE_FEEDS = {
+    'raw_metadata': ChangeFeed(
+        name='raw_metadata',
+        model=RawMetadataModel,
+        id_column=RawMetadataModel.raw_metadata_id,
+        time_column=RawMetadataModel.update_time,
+        pending_status='READY',
+        acknowledged_status='SYNCHED',
+        payload_columns=[
+            RawMetadataModel.metadata_tag,
+            RawMetadataModel.formatted_csv_data]),
+    'raw_cosmx_metadata': ChangeFeed(
+        name='raw_cosmx_metadata',
+        model=RawCosMxMetadataModel,
+        id_column=RawCosMxMetadataModel.raw_cosmx_metadata_id,
+        time_column=RawCosMxMetadataModel.update_time,
+        pending_status='READY',
+        acknowledged_status='SYNCHED',
+        payload_columns=[
+            RawCosMxMetadataModel.cosmx_metadata_tag,
+            RawCosMxMetadataModel.formatted_csv_data]),
+    'raw_analysis_v2': ChangeFeed(
+        name='raw_analysis_v2',
+        model=RawAnalysisV2,
+        id_column=RawAnalysisV2.raw_analysis_id,
+        time_column=RawAnalysisV2.date_stamp,
+        pending_status='VALIDATED',
+        acknowledged_status='SYNCHED',
+        payload_columns=[
+            RawAnalysisV2.project_id,
+            RawAnalysisV2.pipeline_id,
+            RawAnalysisV2.analysis_name,
+            RawAnalysisV2.analysis_yaml],
+        format_payload=_format_raw_analysis_payload),
+    'raw_seqrun': ChangeFeed(
+        name='raw_seqrun',
+        model=RawSeqrun,
+        id_column=RawSeqrun.raw_seqrun_id,
+        time_column=RawSeqrun.date_stamp,
+        pending_status='READY',
+        acknowledged_status='SYNCHED',
+        payload_columns=[
+            RawSeqrun.raw_seqrun_igf_id,
+            RawSeqrun.override_cycles,
+            RawSeqrun.mismatches,
+            SampleSheetModel.samplesheet_tag,
+            SampleSheetModel.status.label('samplesheet_status')],
+        join_columns=[
+            (SampleSheetModel, SampleSheetModel.samplesheet_id==RawSeqrun.samplesheet_id)])}
+
+
+def encode_change_feed_cursor(time_stamp: datetime, item_id: int) -> str:
+    '''
+        A function for encoding the update time and id of the last item as an
+        opaque cursor string
+
+        :param time_stamp: Update time of the item
+        :param item_id: Id of the item
+        :returns: A url safe cursor string
+    '''
+    cursor = json.dumps([time_stamp.isoformat(), item_id])
+    return base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('utf-8')
+
+
+def decode_change_feed_cursor(cursor: str) -> Tuple[datetime, int]:
+    '''
+        A function for decoding a cursor string from encode_change_feed_cursor
+
+        :param cursor: A cursor string
+        :returns: Update time and id of the last item
+    '''
+    try:
+        time_stamp, item_id = \
+            json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')))
+        return datetime.fromisoformat(time_stamp), int(item_id)
+    except Exception as e:
+        raise ValueError(
+            f"Invalid change feed cursor {cursor}, error: {e}")
+
+
+def get_change_feed(feed_name: str) -> ChangeFeed:
+    if feed_name not in CHANGE_FEEDS:
+        raise KeyError(
+            f"Unknown change feed {feed_name}")
+    return CHANGE_FEEDS.get(feed_name)
+
+
+def get_change_feed_page(
+    feed_name: str,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_CHANGE_FEED_LIMIT) -> dict:
+    '''
+        A function for fetching the pending items of a change feed, changed after
+        the cursor, with the payloads inline
+
+        Items are ordered by update time and id, and leave the feed once they are
+        acknowledged. A poll without cursor lists all the pending items, and a
+        cursor is only needed for reading the next pages. The cursor is a page
+        position within the currently pending items, not a monotonic change
+        cursor, so it can't be stored for reading the later changes.
+
+        :param feed_name: Name of the change feed, e.g. raw_metadata
+        :param cursor: Cursor of the previous page, default None for all the pending items
+        :param limit: Max number of items in the page, default 100, max 1000
+        :returns: A dictionary with the list of items, the next cursor and a has_more flag
+    '''
+    try:
+        feed = get_change_feed(feed_name)
+        if limit < 1 or limit > MAX_CHANGE_FEED_LIMIT:
+            raise ValueError(
+                f"Expecting limit between 1 and {MAX_CHANGE_FEED_LIMIT}, got: {limit}")
+        query = \
+            db.session.\
+                query(
+                    feed.id_column,
+                    feed.time_column,
+                    *feed.payload_columns)
+        for join_model, onclause in feed.join_columns:
+            query = query.outerjoin(join_model, onclause)
+        query = \
+            query.filter(feed.model.status==feed.pending_status)
+        cursor_key = None
+        if cursor is not None:
+            cursor_key = \
+                decode_change_feed_cursor(cursor)
+            ## rows of the cursor second are checked here, as SQLite can store
+            ## the same time with and without microseconds
+            query = \
+                query.filter(
+                    feed.time_column >= cursor_key[0] - timedelta(seconds=1))
+        results = list()
+        for row in (
+            query
+            .order_by(feed.time_column, feed.id_column)
+            .yield_per(limit + 1)
+        ):
+            row = row._asdict()
+            if cursor_key is not None and \
+               (row.get(feed.time_column.key), row.get(feed.id_column.key)) <= cursor_key:
+                continue
+            results.append(row)
+            if len(results) > limit:
+                break
+        has_more = len(results) > limit
+        results = results[:limit]
+        items = list()
+        next_cursor = cursor
+        for row in results:
+            item_id = row.pop(feed.id_column.key)
+            time_stamp = row.pop(feed.time_column.key)
+            if feed.format_payload is not None:
+                row = feed.format_payload(row)
+            items.append({
+                'id': item_id,
+                'update_time': time_stamp.isoformat(),
+                'payload': row})
+            next_cursor = \
+                encode_change_feed_cursor(time_stamp, item_id)
+        return {
+            'feed': feed_name,
+            'items': items,
+            'next_cursor': next_cursor,
+            'has_more': has_more}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get change feed {feed_name}, error: {e}")
+
+
+def _supports_update_returning(model: Any) -> bool:
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect
+    return bool(
+        getattr(dialect, 'update_returning', False) or \
+        getattr(dialect, 'full_returning', False))
+
+
+def update_status_for_id_list(
+    model: Any,
+    id_column: Any,
+    id_list: list,
+    from_status: str,
+    to_status: str) -> dict:
+    '''
+        A function for changing the status of a list of items with one conditional
+        UPDATE ... WHERE id IN (...) AND status = from_status statement
+
+        Updated ids are read back with RETURNING if the db supports it. Otherwise
+        the UPDATE rowcount is checked, and only if some of the ids were not updated
+        (e.g. retried calls), the update is repeated after locking and fetching the
+        matching rows in the same transaction.
+
+        :param model: SQLAlchemy model of the items
+        :param id_column: Id column of the model
+        :param id_list: A list of item ids
+        :param from_status: Current status of the items to update, e.g. VALIDATED
+        :param to_status: New status of the items, e.g. SYNCHED
+        :returns: A dictionary with the list of updated ids and the list of skipped ids
+    '''
+    try:
+        if not isinstance(id_list, list):
+            raise TypeError(
+                f"Expecting a list of ids, got: {type(id_list)}")
+        id_list = list(dict.fromkeys(int(i) for i in id_list))
+        if len(id_list) == 0:
+            return {'updated': [], 'skipped': []}
+        try:
+            if _supports_update_returning(model):
+                results = \
+                    db.session.execute(
+                        update(model).\
+                        where(id_column.in_(id_list)).\
+                        where(model.status==from_status).\
+                        values(status=to_status).\
+                        returning(id_column).\
+                        execution_options(synchronize_session=False))
+                updated_ids = set(i[0] for i in results)
+            else:
+                rowcount = \
+                    db.session.\
+                        query(model).\
+                        filter(id_column.in_(id_list)).\
+                        filter(model.status==from_status).\
+                        update(
+                            {'status': to_status},
+                            synchronize_session=False)
+                if rowcount == len(id_list):
+                    updated_ids = set(id_list)
+                else:
+                    db.session.rollback()
+                    updated_ids = \
+                        db.session.\
+                            query(id_column).\
+                            filter(id_column.in_(id_list)).\
+                            filter(model.status==from_status).\
+                            with_for_update().\
+                            all()
+                    updated_ids = set(i[0] for i in updated_ids)
+                    if len(updated_ids) > 0:
+                        db.session.\
+                            query(model).\
+                            filter(id_column.in_(updated_ids)).\
+                            filter(model.status==from_status).\
+                            update(
+                                {'status': to_status},
+                                synchronize_session=False)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        return {
+            'updated': [i for i in id_list if i in updated_ids],
+            'skipped': [i for i in id_list if i not in updated_ids]}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to update status to {to_status} for {model.__tablename__}, error: {e}")
+
+
+def acknowledge_change_feed_items(
+    feed_name: str,
+    id_list: list) -> dict:
+    '''
+        A function for acknowledging a list of change feed items, pending items are
+        moved to the acknowledged status of the feed in one transaction
+
+        :param feed_name: Name of the change feed, e.g. raw_metadata
+        :param id_list: A list of item ids
+        :returns: A dictionary with the list of acknowledged ids and the list of ids
+                  which are not pending, e.g. already acknowledged
+    '''
+    try:
+        feed = get_change_feed(feed_name)
+        results = \
+            update_status_for_id_list(
+                model=feed.model,
+                id_column=feed.id_column,
+                id_list=id_list,
+                from_status=feed.pending_status,
+                to_status=feed.acknowledged_status)
+        return {
+            'acknowledged': results.get('updated'),
+            'skipped': results.get('skipped')}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to acknowledge change feed {feed_name} items, error: {e}")
+
+
+def get_request_id_list(request: Any) -> list:
+    '''
+        A function for reading the id_list from a JSON request body or an
+        uploaded JSON file
+
+        :param request: A flask request
+        :returns: A list of ids
+    '''
+    json_data = request.get_json(silent=True)
+    if json_data is None and request.files:
+        file_obj = request.files.getlist('file')[0]
+        file_obj.seek(0)
+        json_data = json.loads(file_obj.read().decode('utf-8'))
+    if not isinstance(json_data, dict) or \
+       not isinstance(json_data.get('id_list'), list):
+        raise ValueError("Missing id_list")
+    return json_data.get('id_list')
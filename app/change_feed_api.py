@@ -0,0 +1,73 @@
+import logging
+from flask import request
+from flask_appbuilder.api import expose
+from flask_appbuilder.security.decorators import protect
+from .change_feed.change_feed_util import (
+    DEFAULT_CHANGE_FEED_LIMIT,
+    MAX_CHANGE_FEED_LIMIT,
+    decode_change_feed_cursor,
+    get_change_feed_page,
+    acknowledge_change_feed_items,
+    get_request_id_list)
+
+log = logging.getLogger(__name__)
+
+class ChangeFeedApiMixin:
+    '''
+        A mixin for adding change feed endpoints to the pipeline facing apis
+
+        GET get_changes?cursor=&limit= lists the pending items after the cursor
+        with their payloads, the cursor only pages through the pending queue, and
+        POST acknowledge_changes with a JSON body {"id_list": [...]} acknowledges
+        a list of items in one call
+
+        :param change_feed_name: Name of the change feed, from CHANGE_FEEDS
+    '''
+    change_feed_name = None
+
+    @expose('/get_changes',  methods=['GET'])
+    @protect()
+    def get_changes(self):
+        try:
+            cursor = request.args.get('cursor')
+            limit = \
+                request.args.get(
+                    'limit',
+                    default=DEFAULT_CHANGE_FEED_LIMIT,
+                    type=int)
+            if limit < 1 or limit > MAX_CHANGE_FEED_LIMIT:
+                return self.response_400(
+                    message=f'Expecting limit between 1 and {MAX_CHANGE_FEED_LIMIT}')
+            if cursor is not None:
+                try:
+                    decode_change_feed_cursor(cursor)
+                except ValueError:
+                    return self.response_400(message='Invalid cursor')
+            feed_page = \
+                get_change_feed_page(
+                    feed_name=self.change_feed_name,
+                    cursor=cursor,
+                    limit=limit)
+            return self.response(200, **feed_page)
+        except Exception as e:
+            log.error(e)
+            return self.response_500(message='Failed to get changes')
+
+
+    @expose('/acknowledge_changes',  methods=['POST'])
+    @protect()
+    def acknowledge_changes(self):
+        try:
+            try:
+                id_list = get_request_id_list(request)
+                id_list = [int(i) for i in id_list]
+            except (ValueError, TypeError):
+                return self.response_400(message='Expecting a JSON with id_list')
+            results = \
+                acknowledge_change_feed_items(
+                    feed_name=self.change_feed_name,
+                    id_list=id_list)
+            return self.response(200, **results)
+        except Exception as e:
+            log.error(e)
+            return self.response_500(message='Failed to acknowledge changes')
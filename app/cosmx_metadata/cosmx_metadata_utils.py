@@ -17,6 +17,7 @@ from app.models import (
     RawCosMxMetadataBuilder,
     RawCosMxMetadataModel
 )
+from app.change_feed.change_feed_util import update_status_for_id_list
 
 class Project_data(BaseModel):
     project_igf_id: str = Field(
@@ -481,4 +482,14 @@ def validate_raw_cosmx_metadata_and_add_to_loader_table(
         raise ValueError(
             "Failed to validate raw cosmx metadata, error: "
             + str(e)
-        )
\ No newline at end of file
+        )
+
+
+def mark_raw_cosmx_metadata_as_synched(id_list: list) -> dict:
+    return update_status_for_id_list(
+        model=RawCosMxMetadataModel,
+        id_column=RawCosMxMetadataModel.raw_cosmx_metadata_id,
+        id_list=id_list,
+        from_status='READY',
+        to_status='SYNCHED'
+    )
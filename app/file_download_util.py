@@ -1,5 +1,13 @@
+import os
+import zlib
 import tempfile
-from typing import Union
+import mimetypes
+from urllib.parse import quote
+from typing import Optional, Union, Iterable, Iterator
+from flask import request, send_file, abort, Response
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from app import app
+from app.report_store_util import get_report_variant
 
 async def prepare_file_for_download(
     file_data: Union[str, bytes],
@@ -17,4 +25,114 @@ async def prepare_file_for_download(
         temp_file.close()
         return temp_file.name
     except Exception as e:
-        raise ValueError(f"Failed to dump file, error: {e}")
\ No newline at end of file
+        raise ValueError(f"Failed to dump file, error: {e}")
+
+
+def iter_gzip_chunks(
+    chunks: Iterable[Union[str, bytes]],
+    compress_level: int = 6) -> Iterator[bytes]:
+    '''
+    A generator function for gzip compressing a stream of chunks on the fly
+
+    :param chunks: An iterable of strings or bytes, strings are utf-8 encoded
+    :param compress_level: Gzip compression level, default 6
+    :returns: An iterator of gzip compressed bytes
+    '''
+    compressor = \
+        zlib.compressobj(
+            compress_level,
+            zlib.DEFLATED,
+            zlib.MAX_WBITS | 16)                                                # gzip header and trailer
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def get_report_file_etag(file_stat: os.stat_result) -> str:
+    '''
+    A function for getting the ETag of a report file from its mtime and size,
+    in the same format as nginx, so both the app and nginx responses match
+
+    :param file_stat: Stat result of the report file
+    :returns: An ETag string, without quotes
+    '''
+    return f"{int(file_stat.st_mtime):x}-{file_stat.st_size:x}"
+
+
+def send_report_file(
+    file_path: str,
+    download_name: Optional[str] = None) -> Response:
+    '''
+    A function for serving a report file after the access check
+
+    A precompressed variant (.br or .gz) is served with Content-Encoding if the
+    client accepts it. Conditional requests are answered with a 304 from the
+    file stat. If REPORT_ACCEL_REDIRECT_PREFIX is set, the file is handed to
+    nginx with X-Accel-Redirect (nginx picks the variant with gzip_static),
+    otherwise it's streamed by Flask with support for Range requests. Behind
+    nginx only the REPORT_ACCEL_ENCODINGS variants are considered.
+
+    :param file_path: Path of the report file
+    :param download_name: File name for downloading the report as attachment,
+                          default None for inline reports
+    :returns: A flask response
+    '''
+    if file_path == '' or \
+       not os.path.isfile(file_path):
+        abort(404)
+    mimetype = \
+        mimetypes.guess_type(file_path)[0] or \
+        'application/octet-stream'
+    accel_prefix = \
+        app.config.get('REPORT_ACCEL_REDIRECT_PREFIX')
+    rel_path = \
+        os.path.relpath(
+            file_path,
+            app.config['REPORT_UPLOAD_PATH'])
+    use_accel = \
+        bool(accel_prefix) and \
+        not rel_path.startswith('..')
+    ## nginx only serves the variants of its *_static modules, so the etag must match those
+    served_path, content_encoding = \
+        get_report_variant(
+            file_path=file_path,
+            accept_encodings=request.accept_encodings,
+            encodings=app.config.get('REPORT_ACCEL_ENCODINGS', ('gzip',)) if use_accel else None)
+    file_stat = os.stat(served_path)
+    etag = get_report_file_etag(file_stat)
+    if use_accel:
+        response = Response(mimetype=mimetype)
+        response.set_etag(etag)
+        response.last_modified = file_stat.st_mtime
+        response.make_conditional(request)
+        if response.status_code != 304:
+            response.headers['X-Accel-Redirect'] = \
+                f"{accel_prefix.rstrip('/')}/{quote(rel_path)}"
+            if download_name is not None:
+                response.headers['Content-Disposition'] = \
+                    f"attachment; filename*=UTF-8''{quote(download_name)}"
+    else:
+        ## file is streamed from disk, Range and If-Range requests get a 206
+        try:
+            response = \
+                send_file(
+                    served_path,
+                    mimetype=mimetype,
+                    as_attachment=download_name is not None,
+                    download_name=download_name,
+                    etag=etag,
+                    last_modified=file_stat.st_mtime,
+                    conditional=True)
+        except RequestedRangeNotSatisfiable as e:
+            response = e.get_response()
+        response.accept_ranges = 'bytes'
+        if content_encoding is not None:
+            response.headers['Content-Encoding'] = content_encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
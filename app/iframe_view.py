@@ -7,6 +7,7 @@ from app import db
 from .models import (
     PreDeMultiplexingData,
     IlluminaInteropData)
+from .file_download_util import send_report_file
 
 log = logging.getLogger(__name__)
 
@@ -58,44 +59,58 @@ def get_path_for_interop_report(
 
 class IFrameView(BaseView):
     route_base = "/"
+    ## report files share the permission of the report pages
+    method_permission_name = {
+        "view_predemult_report": "view_predemult_report",
+        "get_predemult_report_file": "view_predemult_report",
+        "view_interop_report": "view_interop_report",
+        "get_interop_report_file": "view_interop_report"}
 
     @expose("/static/predemult/<int:record_id>")
     @has_access
     @cache.cached(timeout=1200)
     def view_predemult_report(self, record_id):
-        file_path = get_path_for_predemult_report(
-            record_id=record_id
-        )
         url_link = url_for(
             'PreDeMultiplexingDataView.list'
         )
-        if file_path.endswith('.html'):
-            with open(file_path, 'r') as fp:
-                html_data = fp.read()
-            return self.render_template(
-                "iframe.html",
-                html_data=html_data,
-                url_link=url_link
-            )
-        else:
-            return self.response(500)
+        report_url = url_for(
+            'IFrameView.get_predemult_report_file',
+            record_id=record_id
+        )
+        return self.render_template(
+            "iframe.html",
+            report_url=report_url,
+            url_link=url_link
+        )
+
+    @expose("/static/predemult/<int:record_id>/report")
+    @has_access
+    def get_predemult_report_file(self, record_id):
+        file_path = get_path_for_predemult_report(
+            record_id=record_id
+        )
+        return send_report_file(file_path)
 
     @expose("/static/interop/<int:record_id>")
     @has_access
     @cache.cached(timeout=1200)
     def view_interop_report(self, record_id):
-        file_path = get_path_for_interop_report(
-            record_id=record_id
-        )
         url_link = url_for(
             'IlluminaInteropDataView.list'
         )
-        if file_path.endswith('.html'):
-            with open(file_path, 'r') as fp:
-                html_data = fp.read()
-            return self.render_template(
-                "iframe.html",
-                html_data=html_data,
-                url_link=url_link)
-        else:
-            return self.response(500)
+        report_url = url_for(
+            'IFrameView.get_interop_report_file',
+            record_id=record_id
+        )
+        return self.render_template(
+            "iframe.html",
+            report_url=report_url,
+            url_link=url_link)
+
+    @expose("/static/interop/<int:record_id>/report")
+    @has_access
+    def get_interop_report_file(self, record_id):
+        file_path = get_path_for_interop_report(
+            record_id=record_id
+        )
+        return send_report_file(file_path)
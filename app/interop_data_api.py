@@ -1,5 +1,6 @@
-import os, logging, gzip, tempfile, hashlib, shutil
+import os, logging
 from datetime import datetime
+from typing import Optional
 from flask_appbuilder import ModelRestApi
 from flask import request
 from flask_appbuilder.api import expose
@@ -7,6 +8,19 @@ from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder.security.decorators import protect
 from . import app, db, celery
 from .models import IlluminaInteropData
+from .report_upload_util import (
+    get_report_staging_dir,
+    stage_report_upload,
+    remove_staged_report)
+from .report_store_util import (
+    add_report_to_store,
+    add_report_variants)
+from .interop_metrics_util import (
+    DEFAULT_INTEROP_TREND_RUNS,
+    MAX_INTEROP_TREND_RUNS,
+    INTEROP_TREND_METRICS,
+    load_interop_metrics_from_report,
+    get_interop_metrics_trend)
 
 """
     InterOp data Api
@@ -18,38 +32,35 @@ def load_interop_report(
         run_name: str,
         tag: str,
         file_path: str,
-        base_path: str):
+        base_path: str,
+        file_name: Optional[str] = None,
+        sha256: Optional[str] = None,
+        move_file: bool = False):
     try:
         ## get date stamp
         datestamp = datetime.now()
-        datetime_str = \
-            datestamp.strftime("%Y%m%d_%H%M%S")
-        ## get file name
-        file_name = \
-            os.path.basename(file_path)
-        ## calculate new disk path
-        hash_string = \
-            f"{run_name}{tag}{file_name}{datetime_str}"
-        hash_md5 = \
-            hashlib.\
-                md5(hash_string.encode('utf-8')).\
-                hexdigest()
-        ## create dir and copy report file
-        target_dir = \
-            os.path.join(
-                base_path,
-                run_name,
-                hash_md5)
+        ## get file name, staged uploads have a temp file name
+        if file_name is None:
+            file_name = \
+                os.path.basename(file_path)
+        ## add report to the content-addressed store, identical reports share a blob
         target_file_path = \
-            os.path.join(
-                target_dir,
-                file_name)
-        os.makedirs(
-            target_dir,
-            exist_ok=True)
-        shutil.copyfile(
-            file_path,
-            target_file_path)
+            add_report_to_store(
+                file_path=file_path,
+                store_path=base_path,
+                file_name=file_name,
+                sha256=sha256,
+                move_file=move_file)
+        ## precompressed variants for serving
+        add_report_variants(target_file_path)
+        ## per-lane metrics for the cross-run queries, report is loaded even if it fails
+        try:
+            load_interop_metrics_from_report(
+                run_name=run_name,
+                file_path=target_file_path,
+                file_name=file_name)
+        except Exception as e:
+            log.warning(e)
         ## update db record
         try:
             interop_entry = \
@@ -76,18 +87,27 @@ def async_load_interop_report(
         run_name: str,
         tag: str,
         file_path: str,
-        base_path: str) -> dict:
+        base_path: str,
+        file_name: Optional[str] = None,
+        sha256: Optional[str] = None,
+        move_file: bool = False) -> dict:
     try:
         load_interop_report(
             run_name=run_name,
             tag=tag,
             file_path=file_path,
-            base_path=base_path)
+            base_path=base_path,
+            file_name=file_name,
+            sha256=sha256,
+            move_file=move_file)
         return {"message": "success"}
     except Exception as e:
         log.error(
             "Failed to run celery job, error: {0}".\
                 format(e))
+        ## staged upload is not used by any retry
+        if move_file:
+            remove_staged_report(file_path)
 
 
 class SeqrunInteropApi(ModelRestApi):
@@ -97,6 +117,7 @@ class SeqrunInteropApi(ModelRestApi):
     @expose('/add_report',  methods=['POST'])
     @protect()
     def add_report(self):
+        staged_reports = list()
         try:
             log.debug('received_res')
             log.debug(f"Files: {request.files}")
@@ -110,44 +131,94 @@ class SeqrunInteropApi(ModelRestApi):
             if run_name is None or \
                tag is None:
                 return self.response_400('Missing run_name or tag')
-            ## get report file from request
+            ## get report files from request, one tag for each file
             file_objs = request.files.getlist('file')
-            file_obj = file_objs[0]
-            file_name = file_obj.filename
-            file_obj.seek(0)
-            file_data = file_obj.read()
-            ## report file can be gzipped
-            if file_name.endswith('.gz'):
-                file_data = gzip.decompress(file_data).decode('utf-8')
-            ## get report file and dump it to tmp dir
-            report_dir = \
-                tempfile.mkdtemp(
-                    dir=app.config['CELERY_WORK_DIR'],
-                    prefix='report_',)
-            report_file = \
-                os.path.join(report_dir, file_name)
-            with open(report_file, 'wb') as fp:
-                fp.write(file_data)
-            ## send job to celery worker
+            tag_list = json_data.getlist('tag')
+            if len(file_objs) == 0:
+                return self.response_400('No files')
+            if len(file_objs) > 1 and \
+               len(tag_list) != len(file_objs):
+                return self.response_400('Expecting one tag for each file')
+            if len(file_objs) == 1:
+                tag_list = [tag]
+            ## stream report files to the staging dir, gzipped files are decompressed
             base_dir = \
                 os.path.join(
                     app.config['REPORT_UPLOAD_PATH'],
                     'interop_reports')
-            _ = \
-                async_load_interop_report.\
-                    apply_async(args=[
-                        run_name,
-                        tag,
-                        report_file,
-                        base_dir])
+            staging_dir = \
+                get_report_staging_dir(base_dir)
+            for file_obj in file_objs:
+                staged_reports.append(
+                    stage_report_upload(
+                        file_obj=file_obj,
+                        staging_dir=staging_dir))
+            ## send jobs to celery worker for adding db records
+            for report_tag, staged_report in zip(tag_list, staged_reports):
+                _ = \
+                    async_load_interop_report.\
+                        apply_async(
+                            args=[
+                                run_name,
+                                report_tag,
+                                staged_report.get('file_path'),
+                                base_dir],
+                            kwargs={
+                                'file_name': staged_report.get('file_name'),
+                                'sha256': staged_report.get('sha256'),
+                                'move_file': True})
+            file_names = \
+                ', '.join([
+                    staged_report.get('file_name')
+                        for staged_report in staged_reports])
             return self.response(
                     200,
                     message=\
-                        f'successfully submitted interop report loading job for {os.path.basename(report_file)}')
+                        f'successfully submitted interop report loading job for {file_names}',
+                    reports=[{
+                        'file_name': staged_report.get('file_name'),
+                        'sha256': staged_report.get('sha256'),
+                        'size': staged_report.get('size')}
+                            for staged_report in staged_reports])
         except Exception as e:
             log.error(e)
+            ## remove the files staged before the failure
+            for staged_report in staged_reports:
+                remove_staged_report(staged_report.get('file_path'))
             return self.response_500('failed to load file')
 
+    @expose('/metrics_trend',  methods=['GET'])
+    @protect()
+    def metrics_trend(self):
+        try:
+            metric = \
+                request.args.get('metric', default='q30_pct')
+            limit = \
+                request.args.get(
+                    'limit',
+                    default=DEFAULT_INTEROP_TREND_RUNS,
+                    type=int)
+            if metric not in INTEROP_TREND_METRICS:
+                return self.response_400(
+                    message=f"Expecting metric from {', '.join(INTEROP_TREND_METRICS)}")
+            if limit < 1 or limit > MAX_INTEROP_TREND_RUNS:
+                return self.response_400(
+                    message=f'Expecting limit between 1 and {MAX_INTEROP_TREND_RUNS}')
+            trend = \
+                get_interop_metrics_trend(
+                    metric=metric,
+                    instrument=request.args.get('instrument'),
+                    lane_id=request.args.get('lane_id', type=int),
+                    read_id=request.args.get('read_id', type=int),
+                    limit=limit)
+            return self.response(
+                200,
+                metric=metric,
+                trend=trend)
+        except Exception as e:
+            log.error(e)
+            return self.response_500('failed to get metrics trend')
+
 # def search_interop_for_run(run_name: str) -> Any:
 #     try:
 #         result = \
@@ -0,0 +1,278 @@
+import os
+import json
+import math
+import logging
+import datetime
+import pandas as pd
+from io import StringIO
+from typing import Optional
+from app import db
+from app.models import IlluminaInteropLaneMetrics
+
+log = logging.getLogger(__name__)
+
+## column names of the interop table_data and the metrics table
+INTEROP_TABLE_COLUMNS = {
+    'Lane id': 'lane_id',
+    'Read id': 'read_id',
+    'Index read': 'index_read',
+    'Cycles': 'cycles',
+    'Q30 pct': 'q30_pct',
+    'Yield': 'yield_gb',
+    'Density': 'density',
+    'Read count': 'read_count',
+    'Read count pf': 'read_count_pf',
+    'Cluster pf': 'cluster_pf',
+    'Intensity c1': 'intensity_c1',
+    'Phasing slope': 'phasing_slope',
+    'Phasing offset': 'phasing_offset',
+    'Prephasing slope': 'prephasing_slope',
+    'Prephasing offset': 'prephasing_offset',
+    'Error rate': 'error_rate'}
+INTEROP_INTEGER_COLUMNS = (
+    'lane_id',
+    'read_id',
+    'cycles')
+INTEROP_TREND_METRICS = (
+    'q30_pct',
+    'yield_gb',
+    'density',
+    'read_count',
+    'read_count_pf',
+    'cluster_pf',
+    'intensity_c1',
+    'phasing_slope',
+    'phasing_offset',
+    'prephasing_slope',
+    'prephasing_offset',
+    'error_rate')
+INTEROP_METRICS_SUFFIXES = ('.html', '.htm', '.json')
+DEFAULT_INTEROP_TREND_RUNS = 100
+MAX_INTEROP_TREND_RUNS = 500
+
+
+def get_run_instrument_and_date(run_name: str) -> tuple:
+    '''
+    A function for getting the instrument id and the run date from an Illumina
+    run name, e.g. 200505_MP2-14_94_AAACWLNM5
+
+    :param run_name: Run name
+    :returns: Instrument id ('UNKNOWN' if it's not found) and run date (or None)
+    '''
+    run_parts = run_name.split('_')
+    if len(run_parts) < 2:
+        return 'UNKNOWN', None
+    try:
+        run_date = \
+            datetime.datetime.strptime(run_parts[0], '%y%m%d').date()
+    except ValueError:
+        return 'UNKNOWN', None
+    return run_parts[1], run_date
+
+
+def parse_interop_table_data(table_data: str) -> list:
+    '''
+    A function for parsing the per-lane and per-read metrics from the html
+    table_data of an interop report
+
+    :param table_data: Html text containing the interop metrics table
+    :returns: A list of dictionaries, one for each lane and read
+    '''
+    try:
+        try:
+            tables = \
+                pd.read_html(
+                    StringIO(table_data),
+                    match='Q30 pct',
+                    flavor='lxml')
+        except ValueError:
+            ## no metrics table in the html
+            return []
+        metrics_list = list()
+        for table in tables:
+            if 'Lane id' not in table.columns or \
+               'Read id' not in table.columns:
+                continue
+            table = \
+                table[[c for c in INTEROP_TABLE_COLUMNS.keys() if c in table.columns]].\
+                    rename(columns=INTEROP_TABLE_COLUMNS)
+            for row in table.to_dict(orient='records'):
+                metrics = dict()
+                for key, value in row.items():
+                    if isinstance(value, float) and math.isnan(value):
+                        value = None
+                    elif key in INTEROP_INTEGER_COLUMNS:
+                        value = int(value)
+                    elif key == 'index_read':
+                        value = 'Y' if str(value).upper() == 'Y' else 'N'
+                    else:
+                        value = float(value)
+                    metrics.update({key: value})
+                metrics_list.append(metrics)
+            break
+        return metrics_list
+    except Exception as e:
+        raise ValueError(
+            f"Failed to parse interop table data, error: {e}")
+
+
+def load_interop_metrics(
+    run_name: str,
+    metrics_list: list) -> int:
+    '''
+    A function for replacing the interop metrics of a run
+
+    :param run_name: Run name
+    :param metrics_list: A list of metrics from parse_interop_table_data
+    :returns: Number of metrics rows added
+    '''
+    try:
+        instrument, run_date = \
+            get_run_instrument_and_date(run_name)
+        try:
+            db.session.\
+                query(IlluminaInteropLaneMetrics).\
+                filter(IlluminaInteropLaneMetrics.run_name==run_name).\
+                delete(synchronize_session=False)
+            db.session.bulk_insert_mappings(
+                IlluminaInteropLaneMetrics, [{
+                    'run_name': run_name,
+                    'instrument': instrument,
+                    'run_date': run_date,
+                    **metrics}
+                        for metrics in metrics_list])
+            db.session.flush()
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        return len(metrics_list)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to load interop metrics for run {run_name}, error: {e}")
+
+
+def load_interop_metrics_from_report(
+    run_name: str,
+    file_path: str,
+    file_name: Optional[str] = None) -> int:
+    '''
+    A function for loading the interop metrics from a report file, either an
+    html report or an interop json with the table_data key. Reports without a
+    metrics table are skipped.
+
+    :param run_name: Run name
+    :param file_path: Path of the report file
+    :param file_name: File name of the report, default basename of file_path
+    :returns: Number of metrics rows added
+    '''
+    try:
+        if file_name is None:
+            file_name = \
+                os.path.basename(file_path)
+        if not file_name.lower().endswith(INTEROP_METRICS_SUFFIXES):
+            return 0
+        with open(file_path, 'r') as fp:
+            if file_name.lower().endswith('.json'):
+                table_data = \
+                    json.load(fp).get('table_data')
+            else:
+                table_data = fp.read()
+        if table_data is None:
+            return 0
+        metrics_list = \
+            parse_interop_table_data(table_data)
+        if len(metrics_list) == 0:
+            return 0
+        return \
+            load_interop_metrics(
+                run_name=run_name,
+                metrics_list=metrics_list)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to load interop metrics from {file_path}, error: {e}")
+
+
+def get_interop_metrics_trend(
+    metric: str,
+    instrument: Optional[str] = None,
+    lane_id: Optional[int] = None,
+    read_id: Optional[int] = None,
+    limit: int = DEFAULT_INTEROP_TREND_RUNS) -> list:
+    '''
+    A function for getting the time series of an interop metric across the
+    latest runs, in a single query. Runs are selected from the
+    (instrument, run_date, run_name) index and joined to their metrics rows.
+
+    :param metric: Metric name, one of INTEROP_TREND_METRICS
+    :param instrument: Instrument id filter, default None for all instruments
+    :param lane_id: Lane id filter, default None for all lanes
+    :param read_id: Read id filter, default None for all reads
+    :param limit: Number of latest runs, default 100
+    :returns: A list of dictionaries ordered by run date
+    '''
+    try:
+        if metric not in INTEROP_TREND_METRICS:
+            raise ValueError(f"Unknown metric {metric}")
+        if limit < 1 or limit > MAX_INTEROP_TREND_RUNS:
+            raise ValueError(
+                f"Expecting limit between 1 and {MAX_INTEROP_TREND_RUNS}")
+        ## latest runs, as a derived table as mysql doesn't support limit in IN subqueries
+        run_query = \
+            db.session.\
+                query(
+                    IlluminaInteropLaneMetrics.run_name,
+                    IlluminaInteropLaneMetrics.run_date)
+        if instrument is not None:
+            run_query = \
+                run_query.\
+                    filter(IlluminaInteropLaneMetrics.instrument==instrument)
+        latest_runs = \
+            run_query.\
+                distinct().\
+                order_by(
+                    IlluminaInteropLaneMetrics.run_date.desc(),
+                    IlluminaInteropLaneMetrics.run_name.desc()).\
+                limit(limit).\
+                subquery()
+        query = \
+            db.session.\
+                query(
+                    IlluminaInteropLaneMetrics.run_name,
+                    IlluminaInteropLaneMetrics.instrument,
+                    IlluminaInteropLaneMetrics.run_date,
+                    IlluminaInteropLaneMetrics.lane_id,
+                    IlluminaInteropLaneMetrics.read_id,
+                    IlluminaInteropLaneMetrics.index_read,
+                    getattr(IlluminaInteropLaneMetrics, metric)).\
+                join(
+                    latest_runs,
+                    latest_runs.c.run_name==IlluminaInteropLaneMetrics.run_name)
+        if lane_id is not None:
+            query = \
+                query.\
+                    filter(IlluminaInteropLaneMetrics.lane_id==lane_id)
+        if read_id is not None:
+            query = \
+                query.\
+                    filter(IlluminaInteropLaneMetrics.read_id==read_id)
+        results = \
+            query.\
+                order_by(
+                    IlluminaInteropLaneMetrics.run_date,
+                    IlluminaInteropLaneMetrics.run_name,
+                    IlluminaInteropLaneMetrics.lane_id,
+                    IlluminaInteropLaneMetrics.read_id).\
+                all()
+        return [{
+            'run_name': run_name,
+            'instrument': run_instrument,
+            'run_date': run_date.isoformat() if run_date is not None else None,
+            'lane_id': run_lane_id,
+            'read_id': run_read_id,
+            'index_read': index_read,
+            'value': value}
+                for run_name, run_instrument, run_date, run_lane_id, run_read_id, index_read, value in results]
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get interop metrics trend, error: {e}")
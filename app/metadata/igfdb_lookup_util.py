@@ -0,0 +1,314 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import app, db, cache
+from app.models import (
+    Project,
+    IgfUser,
+    Sample)
+from app.validation_cache.validation_cache_util import invalidate_validation_cache
+
+log = logging.getLogger(__name__)
+
+IGFDB_LOOKUP_PREFIX = 'igfdb_lookup'
+IGFDB_LOOKUP_GENERATION_KEY = f'{IGFDB_LOOKUP_PREFIX}:generation'
+IGFDB_LOOKUP_CHUNK_SIZE = 500
+DEFAULT_IGFDB_LOOKUP_TIMEOUT = 300
+DEFAULT_IGFDB_LOOKUP_LOCAL_TIMEOUT = 30
+DEFAULT_IGFDB_LOOKUP_LOCAL_SIZE = 10000
+IGFDB_REFERENCE_LOOKUPS = list()                                                # all lookups, for invalidation
+
+
+class LocalLRUCache:
+    '''
+        A thread safe in-process LRU cache with a fixed timeout for all the entries
+
+        :param maxsize: Max number of entries
+        :param timeout: Timeout in seconds
+    '''
+    def __init__(self, maxsize: int, timeout: float):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list) -> dict:
+        '''
+            A method for fetching entries from the cache
+
+            :param keys: A list of keys
+            :returns: A dictionary of the found keys and values
+        '''
+        now = time.monotonic()
+        found = dict()
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found.update({key: value})
+        return found
+
+    def set_many(self, values: dict) -> None:
+        expires_at = time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in values.items():
+                self._data[key] = (expires_at, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class IgfdbReferenceLookup:
+    '''
+        A class for looking up igfdb reference data by key, e.g. project existence
+        or project id of a sample, with an in-process LRU and the shared app cache
+        (Redis) in front of the igfdb queries
+
+        Only the found keys are cached. Lookups for missing keys (None or False)
+        always query igfdb, as igfdb is loaded outside of the portal and new
+        entries must be visible to the next check. Entries expire after
+        IGFDB_LOOKUP_LOCAL_TIMEOUT seconds in the LRU and IGFDB_LOOKUP_CACHE_TIMEOUT
+        seconds in Redis, or when invalidate_igfdb_reference_lookups is called.
+
+        :param name: Name of the lookup, used in the cache keys
+        :param fetch_func: A function for fetching values from igfdb for a list of
+                           keys, returning a dictionary with a value for each key
+    '''
+    def __init__(
+        self,
+        name: str,
+        fetch_func: Optional[Callable[[list], dict]] = None):
+        self.name = name
+        self.fetch_func = fetch_func
+        self.local_cache = \
+            LocalLRUCache(
+                maxsize=app.config.get(
+                    'IGFDB_LOOKUP_LOCAL_SIZE',
+                    DEFAULT_IGFDB_LOOKUP_LOCAL_SIZE),
+                timeout=app.config.get(
+                    'IGFDB_LOOKUP_LOCAL_TIMEOUT',
+                    DEFAULT_IGFDB_LOOKUP_LOCAL_TIMEOUT))
+        IGFDB_REFERENCE_LOOKUPS.append(self)
+
+    def _get_cache_key(self, generation: int, key: Any) -> str:
+        return f"{IGFDB_LOOKUP_PREFIX}:{self.name}:{generation}:{key}"
+
+    def get_cached(self, keys: list) -> Tuple[dict, list]:
+        '''
+            A method for fetching values from the LRU and the shared cache
+
+            :param keys: A list of keys
+            :returns: A dictionary of the found keys and values, and a list of missing keys
+        '''
+        keys = list(dict.fromkeys(keys))
+        found = self.local_cache.get_many(keys)
+        missing_keys = [
+            key for key in keys if key not in found]
+        if len(missing_keys) == 0:
+            return found, missing_keys
+        try:
+            generation = _get_lookup_generation()
+            cached_values = \
+                cache.get_many(*[
+                    self._get_cache_key(generation, key)
+                        for key in missing_keys])
+            shared_found = {
+                key: value[0]
+                    for key, value in zip(missing_keys, cached_values)
+                        if value is not None}
+        except Exception as e:
+            log.warning(
+                f"Failed to read igfdb lookup cache, error: {e}")
+            shared_found = dict()
+        if len(shared_found) > 0:
+            self.local_cache.set_many(shared_found)
+            found.update(shared_found)
+            missing_keys = [
+                key for key in missing_keys if key not in shared_found]
+        return found, missing_keys
+
+    def set_many(self, values: dict) -> None:
+        '''
+            A method for adding values to the LRU and the shared cache, missing
+            keys are not cached
+
+            :param values: A dictionary of keys and values, None (or False) for missing keys
+        '''
+        values = {
+            key: value for key, value in values.items()
+                if value is not None and value is not False}
+        if len(values) == 0:
+            return
+        self.local_cache.set_many(values)
+        try:
+            generation = _get_lookup_generation()
+            cache.set_many({
+                self._get_cache_key(generation, key): [value]
+                    for key, value in values.items()},
+                timeout=app.config.get(
+                    'IGFDB_LOOKUP_CACHE_TIMEOUT',
+                    DEFAULT_IGFDB_LOOKUP_TIMEOUT))
+        except Exception as e:
+            log.warning(
+                f"Failed to write igfdb lookup cache, error: {e}")
+
+    def get_many(
+        self,
+        keys: list,
+        chunk_size: int = IGFDB_LOOKUP_CHUNK_SIZE) -> dict:
+        '''
+            A method for fetching values for a list of keys, igfdb is queried only
+            for the keys not found in cache, in chunks
+
+            :param keys: A list of keys
+            :param chunk_size: Max number of keys for a igfdb query, default 500
+            :returns: A dictionary with a value for each key
+        '''
+        try:
+            found, missing_keys = self.get_cached(keys)
+            for i in range(0, len(missing_keys), chunk_size):
+                chunk = missing_keys[i:i + chunk_size]
+                values = self.fetch_func(chunk)
+                values = {
+                    key: values.get(key) for key in chunk}
+                self.set_many(values)
+                found.update(values)
+            return found
+        except Exception as e:
+            raise ValueError(
+                f"Failed to lookup {self.name} in igfdb, error: {e}")
+
+    def clear_local(self) -> None:
+        self.local_cache.clear()
+
+
+def _get_lookup_generation() -> int:
+    generation = cache.get(IGFDB_LOOKUP_GENERATION_KEY)
+    if generation is None:
+        generation = 0
+    return generation
+
+
+def _fetch_project_exists(project_list: list) -> dict:
+    results = (
+        db.session
+        .query(Project.project_igf_id)
+        .filter(Project.project_igf_id.in_(project_list))
+        .all()
+    )
+    results = set(i[0] for i in results)
+    return {
+        project: project in results
+            for project in project_list}
+
+
+def _fetch_sample_projects(sample_list: list) -> dict:
+    results = (
+        db.session
+        .query(Sample.sample_igf_id, Project.project_igf_id)
+        .join(Project, Project.project_id==Sample.project_id)
+        .filter(Sample.sample_igf_id.in_(sample_list))
+        .all()
+    )
+    return {
+        sample: project
+            for sample, project in results}
+
+
+def _fetch_user_emails(name_list: list) -> dict:
+    results = (
+        db.session
+        .query(IgfUser.name, IgfUser.email_id)
+        .filter(IgfUser.name.in_(name_list))
+        .order_by(IgfUser.user_id)
+        .all()
+    )
+    return {
+        name: email_id
+            for name, email_id in results}
+
+
+def _fetch_user_names(email_list: list) -> dict:
+    results = (
+        db.session
+        .query(IgfUser.email_id, IgfUser.name)
+        .filter(IgfUser.email_id.in_(email_list))
+        .order_by(IgfUser.user_id)
+        .all()
+    )
+    return {
+        email_id: name
+            for email_id, name in results}
+
+
+project_exists_lookup = \
+    IgfdbReferenceLookup(
+        name='project_exists',
+        fetch_func=_fetch_project_exists)
+sample_project_lookup = \
+    IgfdbReferenceLookup(
+        name='sample_project',
+        fetch_func=_fetch_sample_projects)
+user_email_lookup = \
+    IgfdbReferenceLookup(
+        name='user_email',
+        fetch_func=_fetch_user_emails)
+user_name_lookup = \
+    IgfdbReferenceLookup(
+        name='user_name',
+        fetch_func=_fetch_user_names)
+
+
+def invalidate_igfdb_reference_lookups(clear_shared: bool = True) -> None:
+    '''
+        A function for invalidating all the igfdb reference lookups, e.g. after
+        loading new data to igfdb outside of the portal db session. The cached
+        validation reports are invalidated with the shared lookups, as they were
+        built from the old lookups.
+
+        :param clear_shared: Invalidate the shared cache for all the processes, default True,
+                             other processes can use their own LRU entries until the local timeout
+    '''
+    for lookup in IGFDB_REFERENCE_LOOKUPS:
+        lookup.clear_local()
+    if clear_shared:
+        try:
+            cache.cache.inc(IGFDB_LOOKUP_GENERATION_KEY)                        # atomic incr on redis, concurrent bumps are not lost
+            invalidate_validation_cache()
+        except Exception as e:
+            log.warning(
+                f"Failed to invalidate igfdb lookup cache, error: {e}")
+
+
+## invalidation hooks for the igfdb changes made via the portal sessions and table resets
+IGFDB_REFERENCE_MODELS = (Project, Sample, IgfUser)
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_lookups_after_flush(session, flush_context) -> None:
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, IGFDB_REFERENCE_MODELS):
+            invalidate_igfdb_reference_lookups()
+            return
+
+for _model in IGFDB_REFERENCE_MODELS:
+    event.listen(
+        _model.__table__,
+        'after_drop',
+        lambda *args, **kwargs: invalidate_igfdb_reference_lookups(clear_shared=False))
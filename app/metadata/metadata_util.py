@@ -1,26 +1,25 @@
 from typing import Tuple
-import pandas as pd
-from ..models import (
-    Project,
-    IgfUser,
-    Sample)
+from itertools import zip_longest
+from sqlalchemy import or_
+from ..models import IgfUser
 from .. import db
+from .igfdb_lookup_util import (
+    IGFDB_LOOKUP_CHUNK_SIZE,
+    project_exists_lookup,
+    sample_project_lookup,
+    user_email_lookup,
+    user_name_lookup)
 
 def check_for_projects_in_metadata_db(
     project_list: list
     ) -> Tuple[dict, list]:
     try:
         errors = list()
-        results = (
-            db.session
-            .query(Project.project_igf_id)
-            .filter(Project.project_igf_id.in_(project_list))
-            .all()
-        )
-        results = [i[0] for i in results]
+        results = \
+            project_exists_lookup.get_many(project_list)
         output = dict()
         for i in project_list:
-            if i in results:
+            if results.get(i):
                 output.update({i: True})
             else:
                 output.update({i: False})
@@ -88,17 +87,14 @@ def check_sample_and_project_ids_in_metadata_db(
                 check_missing=False)
             if len(name_email_errors) > 0:
                 errors.extend(name_email_errors)
-        results = (
-            db.session
-            .query(Sample.sample_igf_id, Project.project_igf_id)
-            .join(Project, Project.project_id==Sample.project_id)
-            .filter(Sample.sample_igf_id.in_(input_sample_project_dict.keys()))
-            .all()
-        )
-        for entry in results:
-            output_sample_project_dict.update({
-                entry[0]: entry[1]}
-            )
+        results = \
+            sample_project_lookup.get_many(
+                list(input_sample_project_dict.keys()))
+        for sample, project in results.items():
+            if project is not None:
+                output_sample_project_dict.update({
+                    sample: project}
+                )
         for sample, project in input_sample_project_dict.items():
             if (
                 sample not in output_sample_project_dict
@@ -159,13 +155,90 @@ def get_names_for_user_email(
             f"Failed to fetch name for email id, error: {e}")
 
 
+def get_user_name_and_email_lookup(
+    name_list: list,
+    email_list: list,
+    chunk_size: int = IGFDB_LOOKUP_CHUNK_SIZE
+    ) -> Tuple[dict, dict]:
+    '''
+    A function for fetching registered email ids for user names and registered names
+    for email ids. Cached lookups are used first, and the remaining names and email ids
+    are fetched using one query per chunk
+
+    :param name_list: A list of unique user names
+    :param email_list: A list of unique email ids
+    :param chunk_size: Max number of names and email ids in a query, default 500
+    :returns: A dictionary of name and email id, and a dictionary of email id and name
+    '''
+    try:
+        name_dict, missing_names = \
+            user_email_lookup.get_cached(name_list)
+        email_dict, missing_emails = \
+            user_name_lookup.get_cached(email_list)
+        users = dict()
+        name_chunks = [
+            missing_names[i:i + chunk_size]
+                for i in range(0, len(missing_names), chunk_size)]
+        email_chunks = [
+            missing_emails[i:i + chunk_size]
+                for i in range(0, len(missing_emails), chunk_size)]
+        for name_chunk, email_chunk in zip_longest(name_chunks, email_chunks, fillvalue=[]):
+            results = (
+                db.session
+                .query(IgfUser.user_id, IgfUser.name, IgfUser.email_id)
+                .filter(
+                    or_(
+                        IgfUser.name.in_(name_chunk),
+                        IgfUser.email_id.in_(email_chunk)
+                    )
+                )
+                .all()
+            )
+            for user_id, name, email_id in results:
+                users.update({user_id: (name, email_id)})
+        new_name_dict = {
+            name: None for name in missing_names}
+        new_email_dict = {
+            email_id: None for email_id in missing_emails}
+        ## same as get_email_ids_for_user_name, the last user wins for a shared name
+        for user_id in sorted(users.keys()):
+            name, email_id = users.get(user_id)
+            if name in new_name_dict:
+                new_name_dict.update({name: email_id})
+            if email_id in new_email_dict:
+                new_email_dict.update({email_id: name})
+        user_email_lookup.set_many(new_name_dict)
+        user_name_lookup.set_many(new_email_dict)
+        name_dict.update(new_name_dict)
+        email_dict.update(new_email_dict)
+        name_dict = {
+            k: v for k, v in name_dict.items() if v is not None}
+        email_dict = {
+            k: v for k, v in email_dict.items() if v is not None}
+        return name_dict, email_dict
+    except Exception as e:
+        raise ValueError(
+            f"Failed to fetch user name and email lookup, error: {e}")
+
+
 def check_user_name_and_email_in_metadata_db(
     name_email_list: list,
     name_column: str = 'name',
     email_column: str = 'email_id',
     check_missing: bool = True
     ) -> list:
+    '''
+    A function for checking user names and email ids against the igfdb users,
+    duplicate name and email id pairs are checked once
+
+    :param name_email_list: A list of dictionaries with name and email id
+    :param name_column: Name column, default name
+    :param email_column: Email id column, default email_id
+    :param check_missing: Report names and email ids missing in db, default True
+    :returns: A list of error messages
+    '''
     try:
+        name_email_pairs = dict()
         for entry in name_email_list:
             if (
                 entry.get(name_column) is None
@@ -173,60 +246,49 @@ def check_user_name_and_email_in_metadata_db(
             ):
                raise KeyError(
                    "Missing name or email id in the input list")
-            df = pd.DataFrame(name_email_list)
-            name_list = (
-                df[name_column]
-                .drop_duplicates()
-                .values
-                .tolist()
-            )
-            email_list = (
-                df[email_column]
-                .drop_duplicates()
-                .values
-                .tolist()
-            )
-            name_dict = get_email_ids_for_user_name(
-                name_list)
-            email_dict = get_names_for_user_email(
-                email_list)
-            errors = list()
-            for entry in name_email_list:
-                name = entry.get('name')
-                email_id = entry.get('email_id')
-                if (
-                    name_dict.get(name) is None
-                    and check_missing
-                ):
-                    errors.append(
-                        f'Missing name {name} in db'
-                    )
-                if (
-                    email_dict.get(email_id) is None
-                    and check_missing
-                ):
-                    errors.append(
-                        f'Missing email {email_id} in db'
-                    )
-                if (
-                    name_dict.get(name) is not None
-                    and email_id != name_dict.get(name)
-                ):
-                   errors.append(
-                       f"User {name} registered with email id "
-                       + str(name_dict.get(name))
-                       + f", not {email_id}"
-                    )
-                if (
-                    email_dict.get(email_id) is not None
-                    and name != email_dict.get(email_id)
-                ):
-                   errors.append(
-                       f"Email {email_id} registered with name "
-                       + str(email_dict.get(email_id))
-                       + f", not {name}"
-                    )
+            name_email_pairs.update({
+                (entry.get(name_column), entry.get(email_column)): None})
+        name_list = list(dict.fromkeys(name for name, _ in name_email_pairs))
+        email_list = list(dict.fromkeys(email_id for _, email_id in name_email_pairs))
+        name_dict, email_dict = \
+            get_user_name_and_email_lookup(
+                name_list=name_list,
+                email_list=email_list)
+        errors = list()
+        for name, email_id in name_email_pairs:
+            if (
+                name_dict.get(name) is None
+                and check_missing
+            ):
+                errors.append(
+                    f'Missing name {name} in db'
+                )
+            if (
+                email_dict.get(email_id) is None
+                and check_missing
+            ):
+                errors.append(
+                    f'Missing email {email_id} in db'
+                )
+            if (
+                name_dict.get(name) is not None
+                and email_id != name_dict.get(name)
+            ):
+               errors.append(
+                   f"User {name} registered with email id "
+                   + str(name_dict.get(name))
+                   + f", not {email_id}"
+                )
+            if (
+                email_dict.get(email_id) is not None
+                and name != email_dict.get(email_id)
+            ):
+               errors.append(
+                   f"Email {email_id} registered with name "
+                   + str(email_dict.get(email_id))
+                   + f", not {name}"
+                )
         return errors
     except Exception as e:
         raise ValueError(
-            f"Failed to compate user name and email in db, error: {e}")
\ No newline at end of file
+            f"Failed to compate user name and email in db, error: {e}")
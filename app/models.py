@@ -14,6 +14,8 @@ from sqlalchemy import (
     TIMESTAMP,
     TEXT,
     UniqueConstraint,
+    Index,
+    Float,
     DATETIME,
     DATE)
 from sqlalchemy.orm import relationship
@@ -202,6 +204,72 @@ class IlluminaInteropData(Model):
           f'<a href="{url}">report</a>'
         )
 
+"""
+  InterOp lane metrics
+"""
+
+class IlluminaInteropLaneMetrics(Model):
+    __tablename__ = 'illumina_interop_lane_metrics'
+    __table_args__ = (
+        UniqueConstraint('run_name', 'lane_id', 'read_id'),
+        Index('ix_interop_lane_metrics_instrument_run_date', 'instrument', 'run_date', 'run_name'),
+        Index('ix_interop_lane_metrics_run_date', 'run_date', 'run_name'),
+        { 'mysql_engine':'InnoDB', 'mysql_charset':'utf8' })
+    metrics_id = Column(
+      INTEGER(unsigned=True),
+      primary_key=True,
+      nullable=False
+    )
+    run_name = Column(
+      String(100),
+      nullable=False
+    )
+    instrument = Column(
+      String(50),
+      nullable=False
+    )
+    run_date = Column(
+      DATE(),
+      nullable=True
+    )
+    lane_id = Column(
+      INTEGER(unsigned=True),
+      nullable=False
+    )
+    read_id = Column(
+      INTEGER(unsigned=True),
+      nullable=False
+    )
+    index_read = Column(
+      Enum("Y", "N"),
+      nullable=False,
+      server_default='N'
+    )
+    cycles = Column(
+      INTEGER(unsigned=True),
+      nullable=True
+    )
+    q30_pct = Column(Float, nullable=True)
+    yield_gb = Column(Float, nullable=True)
+    density = Column(Float, nullable=True)
+    read_count = Column(Float, nullable=True)
+    read_count_pf = Column(Float, nullable=True)
+    cluster_pf = Column(Float, nullable=True)
+    intensity_c1 = Column(Float, nullable=True)
+    phasing_slope = Column(Float, nullable=True)
+    phasing_offset = Column(Float, nullable=True)
+    prephasing_slope = Column(Float, nullable=True)
+    prephasing_offset = Column(Float, nullable=True)
+    error_rate = Column(Float, nullable=True)
+    date_stamp = Column(
+      TIMESTAMP(),
+      nullable=False,
+      server_default=current_timestamp(),
+      onupdate=datetime.datetime.now
+    )
+    def __repr__(self):
+        return f"{self.run_name} lane {self.lane_id} read {self.read_id}"
+
 """
   Pre de-multiplexing data
 """
@@ -262,6 +330,118 @@ class PreDeMultiplexingData(Model):
           f'<a href="{url}">download</a>'
         )
 
+"""
+  Pre de-multiplexing summary
+"""
+
+class PreDeMultiplexingSampleSummary(Model):
+    __tablename__ = 'pre_demultiplexing_sample_summary'
+    __table_args__ = (
+        UniqueConstraint('run_name', 'samplesheet_tag', 'lane_id', 'sample_id'),
+        Index('ix_predemult_sample_summary_run_date', 'run_date', 'read_count'),
+        Index('ix_predemult_sample_summary_sample_id', 'sample_id', 'run_date'),
+        Index('ix_predemult_sample_summary_project', 'project_name', 'run_date'),
+        { 'mysql_engine':'InnoDB', 'mysql_charset':'utf8' })
+    summary_id = Column(
+      INTEGER(unsigned=True),
+      primary_key=True,
+      nullable=False
+    )
+    run_name = Column(
+      String(100),
+      nullable=False
+    )
+    samplesheet_tag = Column(
+      String(200),
+      nullable=False
+    )
+    run_date = Column(
+      DATE(),
+      nullable=True
+    )
+    lane_id = Column(
+      INTEGER(unsigned=True),
+      nullable=False
+    )
+    sample_id = Column(
+      String(100),
+      nullable=False
+    )
+    sample_name = Column(
+      String(200),
+      nullable=True
+    )
+    project_name = Column(
+      String(200),
+      nullable=True
+    )
+    index_sequence = Column(
+      String(100),
+      nullable=True
+    )
+    read_count = Column(
+      INTEGER(unsigned=True),
+      nullable=True
+    )
+    read_pct = Column(Float, nullable=True)
+    perfect_index_pct = Column(Float, nullable=True)
+    q30_pct = Column(Float, nullable=True)
+    mean_quality_score = Column(Float, nullable=True)
+    date_stamp = Column(
+      TIMESTAMP(),
+      nullable=False,
+      server_default=current_timestamp(),
+      onupdate=datetime.datetime.now
+    )
+    def __repr__(self):
+        return f"{self.run_name} lane {self.lane_id} {self.sample_id}"
+
+
+class PreDeMultiplexingUndeterminedBarcode(Model):
+    __tablename__ = 'pre_demultiplexing_undetermined_barcode'
+    __table_args__ = (
+        UniqueConstraint('run_name', 'samplesheet_tag', 'lane_id', 'barcode'),
+        Index('ix_predemult_undetermined_barcode_run_date', 'run_date', 'barcode'),
+        Index('ix_predemult_undetermined_barcode_barcode', 'barcode', 'run_date'),
+        { 'mysql_engine':'InnoDB', 'mysql_charset':'utf8' })
+    barcode_id = Column(
+      INTEGER(unsigned=True),
+      primary_key=True,
+      nullable=False
+    )
+    run_name = Column(
+      String(100),
+      nullable=False
+    )
+    samplesheet_tag = Column(
+      String(200),
+      nullable=False
+    )
+    run_date = Column(
+      DATE(),
+      nullable=True
+    )
+    lane_id = Column(
+      INTEGER(unsigned=True),
+      nullable=False
+    )
+    barcode = Column(
+      String(100),
+      nullable=False
+    )
+    read_count = Column(
+      INTEGER(unsigned=True),
+      nullable=True
+    )
+    date_stamp = Column(
+      TIMESTAMP(),
+      nullable=False,
+      server_default=current_timestamp(),
+      onupdate=datetime.datetime.now
+    )
+    def __repr__(self):
+        return f"{self.run_name} lane {self.lane_id} {self.barcode}"
+
 """
   Admin home view
 """
@@ -345,6 +525,52 @@ class SampleSheetModel(Model):
 	def __repr__(self):
 		return self.samplesheet_tag
 
+
+class SampleSheetVariantModel(Model):
+  __tablename__ = 'samplesheet_variant'
+  __table_args__ = (
+    UniqueConstraint('samplesheet_id', 'variant_type'),
+    { 'mysql_engine':'InnoDB', 'mysql_charset':'utf8' })
+  samplesheet_variant_id = Column(
+    INTEGER(unsigned=True),
+    primary_key=True,
+    nullable=False
+  )
+  samplesheet_id = Column(
+    INTEGER(unsigned=True),
+    ForeignKey(
+      "samplesheet.samplesheet_id",
+      onupdate="CASCADE",
+      ondelete="CASCADE"
+    ),
+    nullable=False
+  )
+  samplesheet = relationship('SampleSheetModel')
+  variant_type = Column(
+    Enum(
+      "ORIGINAL",
+      "I5_RC",
+      "V2"
+    ),
+    nullable=False
+  )
+  csv_data = Column(
+    LONGTEXTType(),
+    nullable=False
+  )
+  content_hash = Column(
+    String(64),
+    nullable=False
+  )
+  date_stamp = Column(
+    TIMESTAMP(),
+    nullable=False,
+    server_default=current_timestamp(),
+    onupdate=datetime.datetime.now
+  )
+  def __repr__(self):
+    return f"{self.samplesheet_id}_{self.variant_type}"
+
 """
   Raw metadata
 """
@@ -418,7 +644,8 @@ class RawSeqrun(Model):
       "REJECTED",
       "PREDEMULT",
       "READY",
-      "FINISHED"
+      "FINISHED",
+      "SYNCHED"
     ),
     nullable=False,
     server_default='ACTIVE'
@@ -1,5 +1,6 @@
-import os, logging, hashlib, shutil, gzip, tempfile
+import os, logging
 from datetime import datetime
+from typing import Optional
 from flask_appbuilder import ModelRestApi
 from flask import request
 from flask_appbuilder.api import expose
@@ -7,6 +8,21 @@ from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder.security.decorators import protect
 from . import db, app, celery
 from .models import PreDeMultiplexingData
+from .report_upload_util import (
+    get_report_staging_dir,
+    stage_report_upload,
+    remove_staged_report)
+from .report_store_util import (
+    add_report_to_store,
+    add_report_variants)
+from .predemult_summary_util import (
+    DEFAULT_DEMULT_SUMMARY_DAYS,
+    MAX_DEMULT_SUMMARY_DAYS,
+    DEFAULT_DEMULT_SUMMARY_LIMIT,
+    MAX_DEMULT_SUMMARY_LIMIT,
+    load_demult_summary_from_report,
+    get_low_read_count_samples,
+    get_recurrent_undetermined_barcodes)
 
 """
     Pre-demultiplexing data Api
@@ -17,38 +33,36 @@ def load_predemult_report(
         run_name: str,
         tag_name: str,
         file_path: str,
-        base_path: str):
+        base_path: str,
+        file_name: Optional[str] = None,
+        sha256: Optional[str] = None,
+        move_file: bool = False):
     try:
         ## get date stamp
         datestamp = datetime.now()
-        datetime_str = \
-            datestamp.strftime("%Y%m%d_%H%M%S")
-        ## get file name
-        file_name = \
-            os.path.basename(file_path)
-        ## calculate new disk path
-        hash_string = \
-            f"{run_name}{tag_name}{file_name}{datetime_str}"
-        hash_md5 = \
-            hashlib.\
-                md5(hash_string.encode('utf-8')).\
-                hexdigest()
-        ## create dir and copy report file
-        target_dir = \
-            os.path.join(
-                base_path,
-                run_name,
-                hash_md5)
+        ## get file name, staged uploads have a temp file name
+        if file_name is None:
+            file_name = \
+                os.path.basename(file_path)
+        ## add report to the content-addressed store, identical reports share a blob
         target_file_path = \
-            os.path.join(
-                target_dir,
-                file_name)
-        os.makedirs(
-            target_dir,
-            exist_ok=True)
-        shutil.copyfile(
-            file_path,
-            target_file_path)
+            add_report_to_store(
+                file_path=file_path,
+                store_path=base_path,
+                file_name=file_name,
+                sha256=sha256,
+                move_file=move_file)
+        ## precompressed variants for serving
+        add_report_variants(target_file_path)
+        ## sample read counts and undetermined barcodes, report is loaded even if it fails
+        try:
+            load_demult_summary_from_report(
+                run_name=run_name,
+                samplesheet_tag=tag_name,
+                file_path=target_file_path,
+                file_name=file_name)
+        except Exception as e:
+            log.warning(e)
         ## update db record
         try:
             predemult_entry = \
@@ -75,18 +89,27 @@ def async_load_predemult_report(
         run_name: str,
         tag_name: str,
         file_path: str,
-        base_path: str) -> dict:
+        base_path: str,
+        file_name: Optional[str] = None,
+        sha256: Optional[str] = None,
+        move_file: bool = False) -> dict:
     try:
         load_predemult_report(
             run_name=run_name,
             tag_name=tag_name,
             file_path=file_path,
-            base_path=base_path)
+            base_path=base_path,
+            file_name=file_name,
+            sha256=sha256,
+            move_file=move_file)
         return {"message": "success"}
     except Exception as e:
         log.error(
             "Failed to run celery job, error: {0}".\
                 format(e))
+        ## staged upload is not used by any retry
+        if move_file:
+            remove_staged_report(file_path)
 
 
 class PreDeMultiplexingDataApi(ModelRestApi):
@@ -96,6 +119,7 @@ class PreDeMultiplexingDataApi(ModelRestApi):
     @expose('/add_report',  methods=['POST'])
     @protect()
     def add_report(self):
+        staged_reports = list()
         try:
             log.debug('received_res')
             log.debug(f"Files: {request.files}")
@@ -109,41 +133,123 @@ class PreDeMultiplexingDataApi(ModelRestApi):
             if run_name is None or \
                samplesheet_tag is None:
                 return self.response_400('Missing run_name or samplesheet_tag')
-            ## get report file from request
+            ## get report files from request, one samplesheet tag for each file
             file_objs = request.files.getlist('file')
-            file_obj = file_objs[0]
-            file_name = file_obj.filename
-            file_obj.seek(0)
-            file_data = file_obj.read()
-            ## report file can be gzipped
-            if file_name.endswith('.gz'):
-                file_data = gzip.decompress(file_data).decode('utf-8')
-            ## get report file and dump it to tmp dir
-            report_dir = \
-                tempfile.mkdtemp(
-                    dir=app.config['CELERY_WORK_DIR'],
-                    prefix='report_',)
-            report_file = \
-                os.path.join(report_dir, file_name)
-            with open(report_file, 'wb') as fp:
-                fp.write(file_data)
-            ## send job to celery worker
+            samplesheet_tag_list = json_data.getlist('samplesheet_tag')
+            if len(file_objs) == 0:
+                return self.response_400('No files')
+            if len(file_objs) > 1 and \
+               len(samplesheet_tag_list) != len(file_objs):
+                return self.response_400('Expecting one samplesheet_tag for each file')
+            if len(file_objs) == 1:
+                samplesheet_tag_list = [samplesheet_tag]
+            ## stream report files to the staging dir, gzipped files are decompressed
             base_dir = \
                 os.path.join(
                     app.config['REPORT_UPLOAD_PATH'],
                     'predemult_reports')
-            _ = \
-                async_load_predemult_report.\
-                    apply_async(args=[
-                        run_name,
-                        samplesheet_tag,
-                        report_file,
-                        base_dir])
-            return self.response(200, message=f'successfully submitted demult report loading job for {os.path.basename(report_file)}')
+            staging_dir = \
+                get_report_staging_dir(base_dir)
+            for file_obj in file_objs:
+                staged_reports.append(
+                    stage_report_upload(
+                        file_obj=file_obj,
+                        staging_dir=staging_dir))
+            ## send jobs to celery worker for adding db records
+            for report_tag, staged_report in zip(samplesheet_tag_list, staged_reports):
+                _ = \
+                    async_load_predemult_report.\
+                        apply_async(
+                            args=[
+                                run_name,
+                                report_tag,
+                                staged_report.get('file_path'),
+                                base_dir],
+                            kwargs={
+                                'file_name': staged_report.get('file_name'),
+                                'sha256': staged_report.get('sha256'),
+                                'move_file': True})
+            file_names = \
+                ', '.join([
+                    staged_report.get('file_name')
+                        for staged_report in staged_reports])
+            return self.response(
+                200,
+                message=f'successfully submitted demult report loading job for {file_names}',
+                reports=[{
+                    'file_name': staged_report.get('file_name'),
+                    'sha256': staged_report.get('sha256'),
+                    'size': staged_report.get('size')}
+                        for staged_report in staged_reports])
         except Exception as e:
             log.error(e)
+            ## remove the files staged before the failure
+            for staged_report in staged_reports:
+                remove_staged_report(staged_report.get('file_path'))
             return self.response_500('failed to load file')
 
+    def _get_summary_query_args(self) -> tuple:
+        days = \
+            request.args.get(
+                'days',
+                default=DEFAULT_DEMULT_SUMMARY_DAYS,
+                type=int)
+        limit = \
+            request.args.get(
+                'limit',
+                default=DEFAULT_DEMULT_SUMMARY_LIMIT,
+                type=int)
+        if days < 1 or days > MAX_DEMULT_SUMMARY_DAYS:
+            raise ValueError(
+                f'Expecting days between 1 and {MAX_DEMULT_SUMMARY_DAYS}')
+        if limit < 1 or limit > MAX_DEMULT_SUMMARY_LIMIT:
+            raise ValueError(
+                f'Expecting limit between 1 and {MAX_DEMULT_SUMMARY_LIMIT}')
+        return days, limit
+
+    @expose('/low_read_samples',  methods=['GET'])
+    @protect()
+    def low_read_samples(self):
+        try:
+            max_read_count = \
+                request.args.get('max_read_count', type=int)
+            if max_read_count is None:
+                return self.response_400(message='Missing max_read_count')
+            try:
+                days, limit = self._get_summary_query_args()
+            except ValueError as e:
+                return self.response_400(message=str(e))
+            samples = \
+                get_low_read_count_samples(
+                    max_read_count=max_read_count,
+                    days=days,
+                    project_name=request.args.get('project_name'),
+                    limit=limit)
+            return self.response(200, samples=samples)
+        except Exception as e:
+            log.error(e)
+            return self.response_500('failed to get samples')
+
+    @expose('/undetermined_barcodes',  methods=['GET'])
+    @protect()
+    def undetermined_barcodes(self):
+        try:
+            min_runs = \
+                request.args.get('min_runs', default=2, type=int)
+            try:
+                days, limit = self._get_summary_query_args()
+            except ValueError as e:
+                return self.response_400(message=str(e))
+            barcodes = \
+                get_recurrent_undetermined_barcodes(
+                    days=days,
+                    min_runs=min_runs,
+                    limit=limit)
+            return self.response(200, barcodes=barcodes)
+        except Exception as e:
+            log.error(e)
+            return self.response_500('failed to get barcodes')
+
 
 # def search_predemultiplexing_data(run_name, samplesheet_tag):
 #     try:
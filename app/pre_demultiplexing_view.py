@@ -1,14 +1,13 @@
 import logging
 from typing import Any
-from io import BytesIO
-from app import cache
 from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder import ModelView
 from flask_appbuilder.baseviews import expose
-from flask import redirect, flash, url_for, send_file
+from flask import redirect, flash, url_for
 from flask_appbuilder.security.decorators import has_access
 from . import db
 from .models import PreDeMultiplexingData
+from .file_download_util import send_report_file
 
 log = logging.getLogger(__name__)
 
@@ -35,7 +34,6 @@ class PreDeMultiplexingDataView(ModelView):
 
     @expose("/download/rawdata/<int:record_id>")
     @has_access
-    @cache.cached(timeout=600)
     def download_reports(self, record_id: str) -> Any:
         try:
             records = (
@@ -51,20 +49,15 @@ class PreDeMultiplexingDataView(ModelView):
                     f"Report not found for id: {record_id}"
                 )
             (sample_sheet_tag, file_path) = records
-            with open(file_path, 'rb') as fp:
-                html_data = fp.read()
-            output = BytesIO(html_data)
             sample_sheet_tag = (
                 sample_sheet_tag
                 .encode('utf-8')
                 .decode()
             )
-            output.seek(0)
             self.update_redirect()
-            return send_file(
-                output,
-                download_name=f'{sample_sheet_tag}.html',
-                as_attachment=True
+            return send_report_file(
+                file_path,
+                download_name=f'{sample_sheet_tag}.html'
             )
         except Exception as e:
             log.error(e)
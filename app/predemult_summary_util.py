@@ -0,0 +1,394 @@
+import os
+import json
+import math
+import logging
+import datetime
+import pandas as pd
+from typing import Any, Optional
+from app import db
+from app.models import (
+    PreDeMultiplexingSampleSummary,
+    PreDeMultiplexingUndeterminedBarcode)
+from app.interop_metrics_util import get_run_instrument_and_date
+
+log = logging.getLogger(__name__)
+
+## column labels of the bclconvert report and the json payload tables
+DEMULT_SAMPLE_COLUMNS = {
+    'lane': 'lane_id',
+    'sampleid': 'sample_id',
+    'sample_id': 'sample_id',
+    'sample_name': 'sample_name',
+    'sample_project': 'project_name',
+    'index': 'index_sequence',
+    'barcode sequence': 'index_sequence',
+    '# reads': 'read_count',
+    'reads': 'read_count',
+    'pf clusters': 'read_count',
+    '% reads': 'read_pct',
+    '% of the lane': 'read_pct',
+    '% perfect index reads': 'perfect_index_pct',
+    '% perfect barcode': 'perfect_index_pct',
+    '% q30': 'q30_pct',
+    '% >= q30 bases': 'q30_pct',
+    'mean quality score (pf)': 'mean_quality_score',
+    'mean quality score': 'mean_quality_score'}
+DEMULT_UNDETERMINED_COLUMNS = {
+    'lane': 'lane_id',
+    'barcode': 'barcode',
+    '# reads': 'read_count',
+    'reads': 'read_count',
+    'count': 'read_count'}
+DEMULT_SUMMARY_SUFFIXES = ('.html', '.htm', '.json')
+DEMULT_TOP_UNDETERMINED_BARCODES = 20
+DEMULT_UNDETERMINED_SAMPLE_ID = 'Undetermined'
+DEFAULT_DEMULT_SUMMARY_DAYS = 30
+MAX_DEMULT_SUMMARY_DAYS = 366
+DEFAULT_DEMULT_SUMMARY_LIMIT = 100
+MAX_DEMULT_SUMMARY_LIMIT = 1000
+
+
+def _format_table(
+    table: pd.DataFrame,
+    column_map: dict,
+    required_columns: tuple) -> Optional[pd.DataFrame]:
+    columns = {
+        c: column_map.get(str(c).strip().lower())
+            for c in table.columns
+                if str(c).strip().lower() in column_map}
+    if not set(required_columns).issubset(columns.values()):
+        return None
+    table = \
+        table[list(columns.keys())].\
+            rename(columns=columns)
+    table = \
+        table.loc[:, ~table.columns.duplicated()]
+    return \
+        table.dropna(subset=list(required_columns))
+
+
+def _get_gviz_table(
+    table_data: Any,
+    lane_id: Any) -> Optional[pd.DataFrame]:
+    try:
+        if isinstance(table_data, str):
+            table_data = json.loads(table_data)
+        if not isinstance(table_data, dict) or \
+           'cols' not in table_data:
+            return None
+        columns = [
+            c.get('label') or c.get('id')
+                for c in table_data.get('cols')]
+        rows = [[
+            v.get('v') if isinstance(v, dict) else v
+                for v in row.get('c')]
+                    for row in table_data.get('rows', [])]
+        table = \
+            pd.DataFrame(rows, columns=columns)
+        if 'Lane' not in table.columns:
+            table['Lane'] = int(lane_id)
+        return table
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _get_tables_from_payload(payload_table: Any) -> list:
+    ## payload tables are json text or a dictionary of gviz tables for each lane
+    if isinstance(payload_table, str):
+        try:
+            payload_table = json.loads(payload_table)
+        except ValueError:
+            return []
+    if not isinstance(payload_table, dict):
+        return []
+    tables = list()
+    for lane_id, table_data in payload_table.items():
+        table = \
+            _get_gviz_table(
+                table_data=table_data,
+                lane_id=lane_id)
+        if table is not None:
+            tables.append(table)
+    if len(tables) == 0:
+        return []
+    return [pd.concat(tables, ignore_index=True)]
+
+
+def _get_records(
+    table: pd.DataFrame,
+    integer_columns: tuple) -> list:
+    records = list()
+    for row in table.to_dict(orient='records'):
+        record = dict()
+        for key, value in row.items():
+            if value is None or \
+               (isinstance(value, float) and math.isnan(value)):
+                value = None
+            elif key in integer_columns:
+                value = int(float(value))
+            elif isinstance(value, str):
+                value = value.strip()
+            else:
+                value = float(value)
+            record.update({key: value})
+        records.append(record)
+    return records
+
+
+def parse_demult_summary_tables(tables: list) -> dict:
+    '''
+    A function for extracting the per-sample read counts and the undetermined
+    barcodes from the tables of a pre-demultiplexing report. Tables without the
+    lane, sample (or barcode) and read count columns are ignored.
+
+    :param tables: A list of pandas dataframes
+    :returns: A dictionary with the 'samples' and 'undetermined_barcodes' lists
+    '''
+    try:
+        samples = list()
+        undetermined_barcodes = list()
+        for table in tables:
+            if len(samples) == 0:
+                sample_table = \
+                    _format_table(
+                        table=table,
+                        column_map=DEMULT_SAMPLE_COLUMNS,
+                        required_columns=('lane_id', 'sample_id', 'project_name', 'read_count'))
+                if sample_table is not None:
+                    sample_table['sample_id'] = \
+                        sample_table['sample_id'].astype(str)
+                    samples = \
+                        _get_records(
+                            table=sample_table,
+                            integer_columns=('lane_id', 'read_count'))
+                    continue
+            if len(undetermined_barcodes) == 0:
+                undetermined_table = \
+                    _format_table(
+                        table=table,
+                        column_map=DEMULT_UNDETERMINED_COLUMNS,
+                        required_columns=('lane_id', 'barcode', 'read_count'))
+                if undetermined_table is not None:
+                    ## only the top barcodes of each lane are kept
+                    undetermined_table = \
+                        undetermined_table.\
+                            sort_values('read_count', ascending=False).\
+                            drop_duplicates(subset=['lane_id', 'barcode']).\
+                            groupby('lane_id').\
+                            head(DEMULT_TOP_UNDETERMINED_BARCODES)
+                    undetermined_barcodes = \
+                        _get_records(
+                            table=undetermined_table,
+                            integer_columns=('lane_id', 'read_count'))
+        return {
+            'samples': samples,
+            'undetermined_barcodes': undetermined_barcodes}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to parse demultiplexing summary tables, error: {e}")
+
+
+def load_demult_summary(
+    run_name: str,
+    samplesheet_tag: str,
+    samples: list,
+    undetermined_barcodes: list) -> dict:
+    '''
+    A function for replacing the demultiplexing summary of a run and samplesheet
+
+    :param run_name: Run name
+    :param samplesheet_tag: Samplesheet tag
+    :param samples: A list of sample read counts from parse_demult_summary_tables
+    :param undetermined_barcodes: A list of undetermined barcodes from parse_demult_summary_tables
+    :returns: A dictionary with the number of sample and barcode rows added
+    '''
+    try:
+        _, run_date = \
+            get_run_instrument_and_date(run_name)
+        try:
+            for model, records in (
+                    (PreDeMultiplexingSampleSummary, samples),
+                    (PreDeMultiplexingUndeterminedBarcode, undetermined_barcodes)):
+                db.session.\
+                    query(model).\
+                    filter(model.run_name==run_name).\
+                    filter(model.samplesheet_tag==samplesheet_tag).\
+                    delete(synchronize_session=False)
+                db.session.bulk_insert_mappings(
+                    model, [{
+                        'run_name': run_name,
+                        'samplesheet_tag': samplesheet_tag,
+                        'run_date': run_date,
+                        **record}
+                            for record in records])
+            db.session.flush()
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        return {
+            'samples': len(samples),
+            'undetermined_barcodes': len(undetermined_barcodes)}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to load demultiplexing summary for run {run_name}, error: {e}")
+
+
+def load_demult_summary_from_report(
+    run_name: str,
+    samplesheet_tag: str,
+    file_path: str,
+    file_name: Optional[str] = None) -> dict:
+    '''
+    A function for loading the demultiplexing summary from a report file, either
+    an html report or a json payload with the sample_table and undetermined_table
+    keys. Reports without the summary tables are skipped.
+
+    :param run_name: Run name
+    :param samplesheet_tag: Samplesheet tag
+    :param file_path: Path of the report file
+    :param file_name: File name of the report, default basename of file_path
+    :returns: A dictionary with the number of sample and barcode rows added
+    '''
+    try:
+        if file_name is None:
+            file_name = \
+                os.path.basename(file_path)
+        if not file_name.lower().endswith(DEMULT_SUMMARY_SUFFIXES):
+            return {'samples': 0, 'undetermined_barcodes': 0}
+        if file_name.lower().endswith('.json'):
+            with open(file_path, 'r') as fp:
+                payload = json.load(fp)
+            tables = \
+                _get_tables_from_payload(payload.get('sample_table')) + \
+                _get_tables_from_payload(payload.get('undetermined_table'))
+        else:
+            try:
+                with open(file_path, 'r') as fp:
+                    tables = \
+                        pd.read_html(
+                            fp,
+                            match='Reads',
+                            flavor='lxml')
+            except ValueError:
+                ## no tables in the html
+                tables = []
+        summary = \
+            parse_demult_summary_tables(tables)
+        if len(summary.get('samples')) == 0 and \
+           len(summary.get('undetermined_barcodes')) == 0:
+            return {'samples': 0, 'undetermined_barcodes': 0}
+        return \
+            load_demult_summary(
+                run_name=run_name,
+                samplesheet_tag=samplesheet_tag,
+                samples=summary.get('samples'),
+                undetermined_barcodes=summary.get('undetermined_barcodes'))
+    except Exception as e:
+        raise ValueError(
+            f"Failed to load demultiplexing summary from {file_path}, error: {e}")
+
+
+def get_low_read_count_samples(
+    max_read_count: int,
+    days: int = DEFAULT_DEMULT_SUMMARY_DAYS,
+    project_name: Optional[str] = None,
+    limit: int = DEFAULT_DEMULT_SUMMARY_LIMIT) -> list:
+    '''
+    A function for listing the samples with fewer reads than a threshold, for
+    the runs of the last few days. The undetermined reads of the lanes are not
+    listed.
+
+    :param max_read_count: Max read count of the listed samples
+    :param days: Number of days before today, default 30
+    :param project_name: Project name filter, default None for all projects
+    :param limit: Max number of samples, default 100
+    :returns: A list of dictionaries ordered by run date and read count
+    '''
+    try:
+        start_date = \
+            datetime.date.today() - datetime.timedelta(days=days)
+        query = \
+            db.session.\
+                query(
+                    PreDeMultiplexingSampleSummary.run_name,
+                    PreDeMultiplexingSampleSummary.samplesheet_tag,
+                    PreDeMultiplexingSampleSummary.run_date,
+                    PreDeMultiplexingSampleSummary.lane_id,
+                    PreDeMultiplexingSampleSummary.sample_id,
+                    PreDeMultiplexingSampleSummary.sample_name,
+                    PreDeMultiplexingSampleSummary.project_name,
+                    PreDeMultiplexingSampleSummary.read_count).\
+                filter(PreDeMultiplexingSampleSummary.run_date >= start_date).\
+                filter(PreDeMultiplexingSampleSummary.read_count < max_read_count).\
+                filter(PreDeMultiplexingSampleSummary.sample_id!=DEMULT_UNDETERMINED_SAMPLE_ID)
+        if project_name is not None:
+            query = \
+                query.\
+                    filter(PreDeMultiplexingSampleSummary.project_name==project_name)
+        results = \
+            query.\
+                order_by(
+                    PreDeMultiplexingSampleSummary.run_date.desc(),
+                    PreDeMultiplexingSampleSummary.read_count).\
+                limit(limit).\
+                all()
+        return [{
+            'run_name': run_name,
+            'samplesheet_tag': samplesheet_tag,
+            'run_date': run_date.isoformat() if run_date is not None else None,
+            'lane_id': lane_id,
+            'sample_id': sample_id,
+            'sample_name': sample_name,
+            'project_name': sample_project,
+            'read_count': read_count}
+                for run_name, samplesheet_tag, run_date, lane_id, sample_id, sample_name, sample_project, read_count in results]
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get low read count samples, error: {e}")
+
+
+def get_recurrent_undetermined_barcodes(
+    days: int = DEFAULT_DEMULT_SUMMARY_DAYS,
+    min_runs: int = 2,
+    limit: int = DEFAULT_DEMULT_SUMMARY_LIMIT) -> list:
+    '''
+    A function for listing the undetermined barcodes found in multiple runs of
+    the last few days
+
+    :param days: Number of days before today, default 30
+    :param min_runs: Min number of runs for a barcode, default 2
+    :param limit: Max number of barcodes, default 100
+    :returns: A list of dictionaries ordered by the number of runs and reads
+    '''
+    try:
+        start_date = \
+            datetime.date.today() - datetime.timedelta(days=days)
+        run_count = \
+            db.func.count(db.distinct(PreDeMultiplexingUndeterminedBarcode.run_name))
+        total_read_count = \
+            db.func.sum(PreDeMultiplexingUndeterminedBarcode.read_count)
+        results = \
+            db.session.\
+                query(
+                    PreDeMultiplexingUndeterminedBarcode.barcode,
+                    run_count,
+                    total_read_count,
+                    db.func.max(PreDeMultiplexingUndeterminedBarcode.run_date)).\
+                filter(PreDeMultiplexingUndeterminedBarcode.run_date >= start_date).\
+                group_by(PreDeMultiplexingUndeterminedBarcode.barcode).\
+                having(run_count >= min_runs).\
+                order_by(
+                    run_count.desc(),
+                    total_read_count.desc()).\
+                limit(limit).\
+                all()
+        return [{
+            'barcode': barcode,
+            'run_count': barcode_run_count,
+            'read_count': int(read_count or 0),
+            'last_run_date': last_run_date.isoformat() if last_run_date is not None else None}
+                for barcode, barcode_run_count, read_count, last_run_date in results]
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get recurrent undetermined barcodes, error: {e}")
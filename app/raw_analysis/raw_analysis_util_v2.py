@@ -3,7 +3,7 @@ import os
 import json
 import logging
 from jinja2 import Template
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from app.models import (
     Sample,
     Experiment,
@@ -19,9 +19,13 @@ from app.models import (
     RawAnalysisV2)
 from yaml import load, SafeLoader
 from jsonschema import Draft202012Validator
+from app.schema_registry.schema_registry_util import schema_validator_registry
+from app.change_feed.change_feed_util import update_status_for_id_list
 
 log = logging.getLogger(__name__)
 
+ANALYSIS_SCHEMA_SOURCE_PREFIX = 'raw_analysis_schema_v2'
+
 def raw_project_query():
     try:
         results = db.session.query(
@@ -73,6 +77,9 @@ def validate_analysis_json_schema(
                 f"No metadata entry found for id {raw_analysis_schema_id}")
         json_schema = \
             raw_analysis_schema.json_schema
+        ## drop compiled validator for the old schema
+        schema_validator_registry.invalidate(
+            source=f"{ANALYSIS_SCHEMA_SOURCE_PREFIX}:{raw_analysis_schema_id}")
         if json_schema is not None:
             try:
                 _ = json.loads(json_schema)
@@ -100,7 +107,8 @@ def validate_analysis_json_schema(
 
 def _get_validation_status_for_analysis_design(
         analysis_yaml: str,
-        validation_schema: str) \
+        validation_schema: str,
+        schema_source: Optional[str] = None) \
             -> list[str]:
     try:
         error_list = list()
@@ -116,8 +124,11 @@ def _get_validation_status_for_analysis_design(
                 f"Invalid format., error: {e}")
             return error_list
         try:
-            schema = \
-                json.loads(validation_schema)
+            schema_validator = \
+                schema_validator_registry.get_validator_for_schema(
+                    schema=validation_schema,
+                    source=schema_source,
+                    validator_class=Draft202012Validator)
         except Exception as e:
             error_list.append(
                 "Failed to load validation schema. " + \
@@ -125,8 +136,6 @@ def _get_validation_status_for_analysis_design(
             return error_list
         try:
             # validation can fail if inputs are not correct
-            schema_validator = \
-                Draft202012Validator(schema)
             sorted_errors = \
                 sorted(
                     schema_validator
@@ -322,7 +331,10 @@ def _get_validation_errors_for_analysis_design(
                     schema_validation_errors = \
                         _get_validation_status_for_analysis_design(
                             analysis_yaml=analysis_yaml,
-                            validation_schema=validation_schema)
+                            validation_schema=validation_schema,
+                            schema_source=(
+                                f"{ANALYSIS_SCHEMA_SOURCE_PREFIX}:"
+                                + str(raw_analysis_schema.raw_analysis_schema_id)))
                     if len(schema_validation_errors) > 0:
                         error_list.extend(
                             schema_validation_errors)
@@ -497,4 +509,36 @@ def generate_analysis_template_for_analysis_id(raw_analysis_id: int) -> str:
         return formatted_template
     except Exception as e:
         raise ValueError(
-            f"Failed to generate template for analysis {raw_analysis_id}, error; {e}")
\ No newline at end of file
+            f"Failed to generate template for analysis {raw_analysis_id}, error; {e}")
+
+
+def mark_raw_analysis_as_synched(id_list: list) -> dict:
+    '''
+        A function for marking a list of VALIDATED raw analysis as SYNCHED
+
+        :param id_list: A list of raw_analysis_id
+        :returns: A dictionary with the list of updated ids and the list of skipped ids
+    '''
+    return \
+        update_status_for_id_list(
+            model=RawAnalysisV2,
+            id_column=RawAnalysisV2.raw_analysis_id,
+            id_list=id_list,
+            from_status='VALIDATED',
+            to_status='SYNCHED')
+
+
+def mark_raw_analysis_as_rejected(id_list: list) -> dict:
+    '''
+        A function for marking a list of VALIDATED raw analysis as REJECTED
+
+        :param id_list: A list of raw_analysis_id
+        :returns: A dictionary with the list of updated ids and the list of skipped ids
+    '''
+    return \
+        update_status_for_id_list(
+            model=RawAnalysisV2,
+            id_column=RawAnalysisV2.raw_analysis_id,
+            id_list=id_list,
+            from_status='VALIDATED',
+            to_status='REJECTED')
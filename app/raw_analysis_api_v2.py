@@ -1,19 +1,25 @@
 import json, logging
 from yaml import load, Loader
 from flask_appbuilder import ModelRestApi
-from flask import send_file
+from flask import request, send_file
 from flask_appbuilder.api import expose
 from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder.security.decorators import protect
 from . import db
 from io import BytesIO
 from .models import RawAnalysisV2
+from .change_feed_api import ChangeFeedApiMixin
+from .change_feed.change_feed_util import get_request_id_list
+from .raw_analysis.raw_analysis_util_v2 import (
+    mark_raw_analysis_as_synched,
+    mark_raw_analysis_as_rejected)
 
 log = logging.getLogger(__name__)
 
-class RawAnalysisV2Api(ModelRestApi):
+class RawAnalysisV2Api(ChangeFeedApiMixin, ModelRestApi):
     resource_name = "raw_analysis_v2"
     datamodel = SQLAInterface(RawAnalysisV2)
+    change_feed_name = "raw_analysis_v2"
 
     @expose('/search_new_analysis',  methods=['GET'])
     @protect()
@@ -78,59 +84,65 @@ class RawAnalysisV2Api(ModelRestApi):
     @protect()
     def mark_analysis_synched(self, raw_analysis_id):
         try:
-            result = \
-                db.session.\
-                    query(RawAnalysisV2).\
-                    filter(RawAnalysisV2.raw_analysis_id==raw_analysis_id).\
-                    filter(RawAnalysisV2.status=='VALIDATED').\
-                    one_or_none()
-            if result is None:
+            results = \
+                mark_raw_analysis_as_synched(
+                    id_list=[raw_analysis_id])
+            if len(results.get('updated')) == 0:
                 # can't find any raw analysis
                 return self.response(200, status='failed')
-            try:
-                db.session.\
-                    query(RawAnalysisV2).\
-                    filter(RawAnalysisV2.raw_analysis_id==raw_analysis_id).\
-                    filter(RawAnalysisV2.status=='VALIDATED').\
-                    update({
-                        'raw_analysis_id': raw_analysis_id,
-                        'status': 'SYNCHED'})
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                log.error(e)
-                return self.response(200, status='failed')
             return self.response(200, status='success')
         except Exception as e:
             log.error(e)
+            return self.response(200, status='failed')
 
 
     @expose('/mark_analysis_rejected/<raw_analysis_id>',  methods=['POST'])
     @protect()
     def mark_analysis_rejected(self, raw_analysis_id):
         try:
-            result = \
-                db.session.\
-                    query(RawAnalysisV2).\
-                    filter(RawAnalysisV2.raw_analysis_id==raw_analysis_id).\
-                    filter(RawAnalysisV2.status=='VALIDATED').\
-                    one_or_none()
-            if result is None:
+            results = \
+                mark_raw_analysis_as_rejected(
+                    id_list=[raw_analysis_id])
+            if len(results.get('updated')) == 0:
                 # can't find any raw analysis
                 return self.response(200, status='failed')
-            try:
-                db.session.\
-                    query(RawAnalysisV2).\
-                    filter(RawAnalysisV2.raw_analysis_id==raw_analysis_id).\
-                    filter(RawAnalysisV2.status=='VALIDATED').\
-                    update({
-                        'raw_analysis_id': raw_analysis_id,
-                        'status': 'REJECTED'})
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                log.error(e)
-                return self.response(200, status='success')
+            return self.response(200, status='success')
+        except Exception as e:
+            log.error(e)
             return self.response(200, status='failed')
+
+
+    @expose('/mark_analysis_list_synched',  methods=['POST'])
+    @protect()
+    def mark_analysis_list_synched(self):
+        try:
+            try:
+                id_list = get_request_id_list(request)
+                id_list = [int(i) for i in id_list]
+            except (ValueError, TypeError):
+                return self.response_400(message='Expecting a JSON with id_list')
+            results = \
+                mark_raw_analysis_as_synched(
+                    id_list=id_list)
+            return self.response(200, **results)
         except Exception as e:
-            log.error(e)
\ No newline at end of file
+            log.error(e)
+            return self.response_500(message='Failed to mark analysis as synched')
+
+
+    @expose('/mark_analysis_list_rejected',  methods=['POST'])
+    @protect()
+    def mark_analysis_list_rejected(self):
+        try:
+            try:
+                id_list = get_request_id_list(request)
+                id_list = [int(i) for i in id_list]
+            except (ValueError, TypeError):
+                return self.response_400(message='Expecting a JSON with id_list')
+            results = \
+                mark_raw_analysis_as_rejected(
+                    id_list=id_list)
+            return self.response(200, **results)
+        except Exception as e:
+            log.error(e)
+            return self.response_500(message='Failed to mark analysis as rejected')
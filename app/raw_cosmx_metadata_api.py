@@ -4,16 +4,22 @@ from flask_appbuilder import ModelRestApi
 from flask_appbuilder.api import expose
 from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder.security.decorators import protect
-from flask import send_file
+from flask import request, send_file
 from io import BytesIO
 from app import db
 from app.models import RawCosMxMetadataModel
+from app.change_feed_api import ChangeFeedApiMixin
+from app.change_feed.change_feed_util import get_request_id_list
+from app.cosmx_metadata.cosmx_metadata_utils import (
+    mark_raw_cosmx_metadata_as_synched
+)
 
 log = logging.getLogger(__name__)
 
-class RawCosMxMetadataApi(ModelRestApi):
+class RawCosMxMetadataApi(ChangeFeedApiMixin, ModelRestApi):
     resource_name = "raw_cosmx_metadata"
     datamodel = SQLAInterface(RawCosMxMetadataModel)
+    change_feed_name = "raw_cosmx_metadata"
 
     @expose(
         '/get_raw_metadata/<raw_cosmx_metadata_id>', 
@@ -57,21 +63,47 @@ class RawCosMxMetadataApi(ModelRestApi):
     @protect()
     def mark_raw_metadata_as_synced(self, raw_cosmx_metadata_id: int):
         try:
-            try:
-                (
+            results = mark_raw_cosmx_metadata_as_synched(
+                id_list=[raw_cosmx_metadata_id]
+            )
+            if len(results.get('updated')) == 0:
+                ## already synced metadata is a success, e.g. for retried calls
+                current_status = (
                     db.session
-                    .query(RawCosMxMetadataModel)
-                    .filter(RawCosMxMetadataModel.status=='READY')
+                    .query(RawCosMxMetadataModel.status)
                     .filter(
-                        RawCosMxMetadataModel.raw_cosmx_metadata_id
-                        == raw_cosmx_metadata_id
+                        RawCosMxMetadataModel.raw_cosmx_metadata_id==int(raw_cosmx_metadata_id)
                     )
-                    .update({'status':'SYNCHED'})
+                    .scalar()
+                )
+                if current_status != 'SYNCHED':
+                    # can't find any READY metadata
+                    return self.response(200, message='metadata not synced', status='failed')
+            return self.response(200, message='metadata synced', status='success', **results)
+        except Exception as e:
+            log.error(e)
+            return self.response_500(message='Failed to mark metadata as synced')
+
+    @expose(
+        '/mark_metadata_list_as_synced',
+        methods=['POST']
+    )
+    @protect()
+    def mark_metadata_list_as_synced(self):
+        try:
+            try:
+                id_list = get_request_id_list(request)
+                id_list = [int(i) for i in id_list]
+            except (ValueError, TypeError):
+                return self.response_400(
+                    message='Expecting a JSON with id_list'
                 )
-                db.session.commit()
-                return self.response(200, message='metadata synced')
-            except Exception:
-                db.session.rollback()
-                raise
+            results = mark_raw_cosmx_metadata_as_synched(
+                id_list=id_list
+            )
+            return self.response(200, **results)
         except Exception as e:
-            log.error(e)
\ No newline at end of file
+            log.error(e)
+            return self.response_500(
+                message='Failed to mark metadata as synced'
+            )
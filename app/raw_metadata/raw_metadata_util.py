@@ -1,16 +1,38 @@
 import pandas as pd
 import os
 import json
-import tempfile
+import time
+import codecs
+import logging
+from io import StringIO
+from contextlib import contextmanager
 from typing import (
     Optional,
+    Iterator,
+    Tuple,
     Any)
 from jsonschema import Draft4Validator
+from sqlalchemy import func
 from app import db
 from app.models import RawMetadataModel
+from app.schema_registry.schema_registry_util import schema_validator_registry
+from app.change_feed.change_feed_util import update_status_for_id_list
+from app.validation_cache.validation_cache_util import (
+    get_validation_cache_key,
+    get_cached_validation_report,
+    set_cached_validation_report)
 from app.metadata.metadata_util import (
     check_sample_and_project_ids_in_metadata_db)
 
+log = logging.getLogger(__name__)
+
+METADATA_SCHEMA_JSON = \
+    os.path.join(
+        os.path.dirname(__file__),
+        'metadata_validation.json')
+RAW_METADATA_INSERT_CHUNK_SIZE = 500
+READY_METADATA_BATCH_SIZE = 100
+
 EXPERIMENT_TYPE_LOOKUP = [{
   'library_preparation': 'WHOLE GENOME SEQUENCING - SAMPLE',
   'library_type': 'WHOLE GENOME',
@@ -522,24 +544,109 @@ EXPERIMENT_TYPE_LOOKUP = [{
   'library_source': 'GENOMIC','biomaterial_type':'UNKNOWN'
 }]
 
+LIBRARY_TYPE_CHECKED_SOURCES = (
+    'GENOMIC',
+    'TRANSCRIPTOMIC',
+    'GENOMIC_SINGLE_CELL',
+    'TRANSCRIPTOMIC_SINGLE_CELL')
+
+
+def _build_library_type_lookup(
+    experiment_type_lookup: list,
+    library_sources: tuple = LIBRARY_TYPE_CHECKED_SOURCES
+    ) -> dict:
+    '''
+    An internal function for compiling the experiment type lookup into frozen
+    sets of allowed library_strategy and experiment_type for each library_source,
+    UNKNOWN is allowed for all the sources
+
+    :param experiment_type_lookup: A list of dictionaries with library_source,
+                                   library_strategy and experiment_type
+    :param library_sources: Library sources to check
+    :returns: A dictionary of library_source and a tuple of two frozensets
+    '''
+    lookup = {
+        library_source: (set(['UNKNOWN']), set(['UNKNOWN']))
+            for library_source in library_sources}
+    for entry in experiment_type_lookup:
+        library_source = entry.get('library_source')
+        if library_source in lookup:
+            lookup[library_source][0].add(entry.get('library_strategy'))
+            lookup[library_source][1].add(entry.get('experiment_type'))
+    return {
+        library_source: (frozenset(strategies), frozenset(experiment_types))
+            for library_source, (strategies, experiment_types) in lookup.items()}
+
+
+LIBRARY_TYPE_LOOKUP = \
+    _build_library_type_lookup(EXPERIMENT_TYPE_LOOKUP)
+LIBRARY_STRATEGY_PAIRS = frozenset(
+    (library_source, library_strategy)
+        for library_source, (strategies, _) in LIBRARY_TYPE_LOOKUP.items()
+            for library_strategy in strategies)
+EXPERIMENT_TYPE_PAIRS = frozenset(
+    (library_source, experiment_type)
+        for library_source, (_, experiment_types) in LIBRARY_TYPE_LOOKUP.items()
+            for experiment_type in experiment_types)
+
+
+def _read_metadata_csv(csv_data: str) -> pd.DataFrame:
+    '''
+    A function for parsing metadata csv data from memory
+
+    :param csv_data: Metadata csv data as string
+    :returns: A pandas dataframe, column types are inferred by pandas
+    '''
+    return pd.read_csv(StringIO(csv_data))
+
+
+@contextmanager
+def _record_stage_time(stage_timings: dict, stage_name: str):
+    '''
+    A context manager for recording the time spent in a validation stage
+
+    :param stage_timings: A dictionary for stage name and time in seconds
+    :param stage_name: Name of the stage
+    '''
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_timings[stage_name] = \
+            round(time.perf_counter() - start_time, 6)
+
 
 def _run_metadata_json_validation(
-    metadata_file: str,
-    schema_json: str
+    metadata_file: Optional[str] = None,
+    schema_json: str = METADATA_SCHEMA_JSON,
+    metadata_df: Optional[pd.DataFrame] = None
     ) -> list:
+    '''
+    A function for validating metadata against the json schema and
+    checking for unexpected columns and duplicate rows
+
+    :param metadata_file: Metadata csv file, used if metadata_df is None
+    :param schema_json: JSON schema file for validation
+    :param metadata_df: A parsed metadata dataframe, default None
+    :returns: A list of error strings
+    '''
     try:
         if (
-            not os.path.exists(metadata_file)
+            (metadata_df is None and not os.path.exists(str(metadata_file)))
             or not os.path.exists(schema_json)
         ):
            raise IOError("Input file error")
         error_list = list()
-        with open(schema_json,'r') as jf:
-            schema = json.load(jf)
-        metadata_validator = Draft4Validator(schema)
-        metadata_json_fields = list(schema['items']['properties'].keys())
-        metadata_df = pd.read_csv(metadata_file)
-        metadata_df.fillna('', inplace=True)
+        metadata_validator = \
+            schema_validator_registry.get_validator_for_file(
+                schema_file=schema_json,
+                validator_class=Draft4Validator,
+                compiled=True)
+        metadata_json_fields = \
+            list(metadata_validator.schema['items']['properties'].keys())
+        if metadata_df is None:
+            metadata_df = pd.read_csv(metadata_file)
+        metadata_df = metadata_df.fillna('')
         if 'taxon_id' in metadata_df.columns:
             metadata_df['taxon_id'] = (
                 metadata_df['taxon_id']
@@ -557,34 +664,89 @@ def _run_metadata_json_validation(
                 "Duplicate entry found for sample "
                 + str(entry.get("sample_igf_id"))
             )
-        json_data = (
-            metadata_df
-            .to_dict(orient='records')
-        )
-        validation_errors = sorted(
-            metadata_validator.iter_errors(json_data),
-            key=lambda e: e.path
-        )
-        for err in validation_errors:
-            if isinstance(err, str):
-                error_list.append(err)
-            else:
-                if len(err.schema_path) > 2:
-                    error_list.append(
-                        str(err.schema_path[2])
-                        + ": "
-                        + err.message
-                    )
-                else:
-                    error_list.append(
-                        err.message
-                    )
+        error_list.extend(
+            metadata_validator.validate_dataframe(metadata_df))
         return error_list
     except Exception as e:
         raise ValueError(
             f"Failed to run json validation, error: {e}")
 
 
+def _check_metadata_duplicate_samples(
+    metadata_df: pd.DataFrame,
+    sample_id_col: str = 'sample_igf_id'
+    ) -> list:
+    '''
+    A function for checking samples present in more than one non-duplicate rows
+
+    :param metadata_df: A pandas dataframe with the metadata rows
+    :param sample_id_col: Sample id column name, default sample_igf_id
+    :returns: A list of error strings
+    '''
+    try:
+        error_list = list()
+        metadata_df_dup = metadata_df.drop_duplicates()
+        for sample_igf_id, s_data in metadata_df_dup.groupby(sample_id_col):
+            if len(s_data.index) > 1:
+                error_list.append(
+                    f"Sample {sample_igf_id} is present more than "
+                    + "once and not duplicate"
+                )
+        return error_list
+    except Exception as e:
+        raise ValueError(
+            f"Failed to check duplicate samples, error: {e}")
+
+
+def _run_metadata_validation_stages(
+    metadata_df: pd.DataFrame,
+    schema_json: str = METADATA_SCHEMA_JSON,
+    check_db: bool = True,
+    stage_timings: Optional[dict] = None
+    ) -> list:
+    '''
+    A function for running the schema, duplicate, library_type and
+    igfdb validation stages on a parsed metadata dataframe
+
+    :param metadata_df: A pandas dataframe with the metadata rows
+    :param schema_json: JSON schema file for validation
+    :param check_db: Check samples in metadata db, default True
+    :param stage_timings: A dictionary for recording the time spent
+                          in each stage, in seconds, default None
+    :returns: A list of error strings
+    '''
+    try:
+        if stage_timings is None:
+            stage_timings = dict()
+        error_list = list()
+        with _record_stage_time(stage_timings, 'schema'):
+            error_list.extend(
+                _run_metadata_json_validation(
+                    schema_json=schema_json,
+                    metadata_df=metadata_df))
+        with _record_stage_time(stage_timings, 'duplicate'):
+            error_list.extend(
+                _check_metadata_duplicate_samples(
+                    metadata_df=metadata_df))
+        with _record_stage_time(stage_timings, 'library_type'):
+            library_type_errors = \
+                _validate_metadata_library_types(
+                    metadata_df=metadata_df)
+            for row_index, err in library_type_errors.items():
+                error_list.append(
+                    "Metadata error: {0}, {1}".\
+                        format(metadata_df.at[row_index, 'sample_igf_id'], err))
+        if check_db:
+            with _record_stage_time(stage_timings, 'igfdb'):
+                error_list.extend(
+                    compare_metadata_sample_with_db(
+                        metadata_df=metadata_df))
+        return error_list
+    except Exception as e:
+        raise ValueError(
+            f"Failed to run metadata validation stages, error: {e}")
+
+
 def _set_metadata_validation_status(
     raw_metadata_id: int,
     status: str,
@@ -644,10 +806,26 @@ def _set_metadata_validation_status(
 def validate_raw_metadata_and_set_db_status(
     raw_metadata_id: int,
     check_db: bool=True,
-    schema_json: str = os.path.join(
-        os.path.dirname(__file__),
-        'metadata_validation.json')
+    schema_json: str = METADATA_SCHEMA_JSON,
+    use_cache: bool = True
     ) -> str:
+    '''
+        Validate formatted csv data of a raw metadata entry and set its status
+
+        Reports are cached by the normalized csv content hash, the schema file
+        stamp and the igfdb reference stamp, so the same csv uploaded with a new
+        metadata tag is not validated again
+
+        The csv data is parsed once in memory and the dataframe is passed through
+        the schema, duplicate, library_type and igfdb stages, time spent in each
+        stage is logged
+
+        :param raw_metadata_id: Raw metadata id
+        :param check_db: Check samples in metadata db, default True
+        :param schema_json: JSON schema file for validation
+        :param use_cache: Use the validation cache, default True
+        :returns: Validation status, VALIDATED or FAILED
+    '''
     try:
         error_list = list()
         raw_metadata = (
@@ -665,88 +843,84 @@ def validate_raw_metadata_and_set_db_status(
         if csv_data is None:
             raise ValueError(
                 f"No formatted csv error found for id {raw_metadata_id}")
-        with tempfile.TemporaryDirectory() as temp_dir:
-            metadata_file = os.path.join(temp_dir, 'metadata.csv')
-            with open(metadata_file, 'w') as fp:
-                fp.write(csv_data)
-            try:
-                _ = pd.read_csv(metadata_file)
-            except:
-                error_list.append('Not CSV input file')
+        cache_key = None
+        if use_cache:
+            cache_key = \
+                get_validation_cache_key(
+                    kind='raw_metadata',
+                    csv_data=csv_data,
+                    schema_file=schema_json,
+                    check_db=check_db)
+            cached_report = \
+                get_cached_validation_report(cache_key)
+            if cached_report is not None:
                 _set_metadata_validation_status(
                     raw_metadata_id=raw_metadata_id,
-                    status='FAILED',
-                    report='\n'.join(error_list))
-                return 'FAILED'
-            validation_errors = \
-                _run_metadata_json_validation(
-                    metadata_file=metadata_file,
-                    schema_json=schema_json)
-            if len(validation_errors) > 0:
-                error_list.\
-                    extend(validation_errors)
-            metadata_df = pd.read_csv(metadata_file)
-            ## check for duplicate metadat
-            metadata_df_dup = metadata_df.copy()
-            metadata_df_dup.drop_duplicates(inplace=True)
-            for sample_igf_id, s_data in metadata_df_dup.groupby('sample_igf_id'):
-                if len(s_data.index) > 1:
-                    error_list.append(
-                        f"Sample {sample_igf_id} is present more than "
-                        + "once and not duplicate"
-                    )
-            for entry in metadata_df.to_dict(orient="records"):
-                sample_id = entry.get('sample_igf_id'),
-                library_source = entry.get('library_source'),
-                library_strategy = entry.get('library_strategy'),
-                experiment_type = entry.get('experiment_type')
-                err = \
-                    _validate_metadata_library_type(
-                        sample_id=sample_id,
-                        library_source=library_source,
-                        library_strategy=library_strategy,
-                        experiment_type=experiment_type)
-                if err is not None:
-                    error_list.append(
-                        "Metadata error: {0}, {1}".\
-                            format(sample_id, err))
-            if check_db:
-                existing_metadata_errors = \
-                    compare_metadata_sample_with_db(
-                        metadata_file=metadata_file)
-                if len(existing_metadata_errors) > 0:
-                    error_list.extend(existing_metadata_errors)
-        if len(error_list) > 0:
-            error_list = [
-                f"{i+1}, {e}"
-                    for i,e in enumerate(error_list)
-            ]
+                    status=cached_report.get('status'),
+                    report=cached_report.get('report'))
+                return cached_report.get('status')
+        stage_timings = dict()
+        with _record_stage_time(stage_timings, 'parse'):
+            try:
+                metadata_df = _read_metadata_csv(csv_data)
+            except Exception:
+                metadata_df = None
+        if metadata_df is None:
+            log.info(
+                f"Metadata {raw_metadata_id} validation stage timings: {stage_timings}")
+            error_list.append('Not CSV input file')
             _set_metadata_validation_status(
                 raw_metadata_id=raw_metadata_id,
                 status='FAILED',
                 report='\n'.join(error_list))
             return 'FAILED'
+        error_list.extend(
+            _run_metadata_validation_stages(
+                metadata_df=metadata_df,
+                schema_json=schema_json,
+                check_db=check_db,
+                stage_timings=stage_timings))
+        log.info(
+            f"Metadata {raw_metadata_id} validation stage timings: {stage_timings}")
+        if len(error_list) > 0:
+            error_list = [
+                f"{i+1}, {e}"
+                    for i,e in enumerate(error_list)
+            ]
+            status = 'FAILED'
+            report = '\n'.join(error_list)
         else:
-            _set_metadata_validation_status(
-                raw_metadata_id=raw_metadata_id,
-                report='',
-                status='VALIDATED')
-            return 'VALIDATED'
+            status = 'VALIDATED'
+            report = ''
+        if cache_key is not None:
+            set_cached_validation_report(
+                cache_key=cache_key,
+                status=status,
+                report=report)
+        _set_metadata_validation_status(
+            raw_metadata_id=raw_metadata_id,
+            status=status,
+            report=report)
+        return status
     except Exception as e:
         raise ValueError(
             f"Failed to get metadata for id {raw_metadata_id}, error: {e}")
 
 
 def compare_metadata_sample_with_db(
-    metadata_file: str,
+    metadata_file: Optional[str] = None,
     project_column: str = 'project_igf_id',
     sample_column: str = 'sample_igf_id',
     name_column: str = 'name',
-    email_column: str = 'email_id'
+    email_column: str = 'email_id',
+    metadata_df: Optional[pd.DataFrame] = None
     ) -> list:
     try:
         errors = list()
-        df = pd.read_csv(metadata_file)
+        if metadata_df is None:
+            df = pd.read_csv(metadata_file)
+        else:
+            df = metadata_df
         # project_list = (
         #     df[project_column]
         #     .drop_duplicates()
@@ -777,6 +951,19 @@ def compare_metadata_sample_with_db(
             f"Failed to compare metadata with db, error: {e}")
 
 
+def _get_library_type_error_message(
+    sample_id: Any,
+    library_source: Any,
+    library_strategy: Any,
+    experiment_type: Any
+    ) -> str:
+    return (
+        f'{sample_id}: library_strategy '
+        + f'{library_strategy} or experiment_type '
+        + f'{experiment_type} is not compatible with '
+        + f'library_source {library_source}'
+    )
+
 def _validate_metadata_library_type(
     sample_id: str,
     library_source: str,
@@ -794,112 +981,73 @@ def _validate_metadata_library_type(
     '''
     try:
       error_msg = None
-      exp_lookup_data = pd.DataFrame(EXPERIMENT_TYPE_LOOKUP)
-      if library_source == 'GENOMIC':
-        library_strategy_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='GENOMIC'
-            ]['library_strategy']
-            .values
-        )
-        library_strategy_list.append('UNKNOWN')
-        experiment_type_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='GENOMIC'
-            ]['experiment_type']
-            .values
-        )
-        experiment_type_list.append('UNKNOWN')
-        if (
-            library_strategy not in library_strategy_list
-            or experiment_type not in experiment_type_list
-        ):
-            error_msg = (
-                f'{sample_id}: library_strategy '
-                + f'{library_strategy} or experiment_type '
-                + f'{experiment_type} is not compatible with '
-                + f'library_source {library_source}'
-            )
-      elif library_source == 'TRANSCRIPTOMIC':
-        library_strategy_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='TRANSCRIPTOMIC'
-            ]['library_strategy']
-            .values
-        )
-        library_strategy_list.append('UNKNOWN')
-        experiment_type_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='TRANSCRIPTOMIC'
-            ]['experiment_type']
-            .values
-        )
-        experiment_type_list.append('UNKNOWN')
-        if (
-            library_strategy not in library_strategy_list
-            or experiment_type not in experiment_type_list
-        ):
-            error_msg = (
-                f'{sample_id}: library_strategy '
-                + f'{library_strategy} or experiment_type '
-                + f'{experiment_type} is not compatible with '
-                + f'library_source {library_source}'
-            )
-      elif library_source == 'GENOMIC_SINGLE_CELL':
-        library_strategy_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='GENOMIC_SINGLE_CELL'
-            ]['library_strategy']
-            .values
-        )
-        library_strategy_list.append('UNKNOWN')
-        experiment_type_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='GENOMIC_SINGLE_CELL'
-            ]['experiment_type']
-            .values
-        )
-        experiment_type_list.append('UNKNOWN')
+      if library_source in LIBRARY_TYPE_LOOKUP:
+        library_strategy_set, experiment_type_set = \
+            LIBRARY_TYPE_LOOKUP[library_source]
         if (
-            library_strategy not in library_strategy_list
-            or experiment_type not in experiment_type_list
+            library_strategy not in library_strategy_set
+            or experiment_type not in experiment_type_set
         ):
-            error_msg = (
-                f'{sample_id}: library_strategy '
-                + f'{library_strategy} or experiment_type '
-                + f'{experiment_type} is not compatible with '
-                + f'library_source {library_source}'
-            )
-      elif library_source == 'TRANSCRIPTOMIC_SINGLE_CELL':
-        library_strategy_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='TRANSCRIPTOMIC_SINGLE_CELL'
-            ]['library_strategy']
-            .values
-        )
-        library_strategy_list.append('UNKNOWN')
-        experiment_type_list = list(
-            exp_lookup_data[
-                exp_lookup_data['library_source']=='TRANSCRIPTOMIC_SINGLE_CELL'
-            ]['experiment_type']
-            .values
-        )
-        experiment_type_list.append('UNKNOWN')
-        if (
-            library_strategy not in library_strategy_list
-            or experiment_type not in experiment_type_list
-        ):
-            error_msg = (
-                f'{sample_id}: library_strategy '
-                + f'{library_strategy} or experiment_type '
-                + f'{experiment_type} is not compatible with '
-                + f'library_source {library_source}'
-            )
+            error_msg = \
+                _get_library_type_error_message(
+                    sample_id=sample_id,
+                    library_source=library_source,
+                    library_strategy=library_strategy,
+                    experiment_type=experiment_type)
       return error_msg
     except Exception as e:
       raise ValueError(
             f"Failed to validate library type, error: {e}")
 
+def _validate_metadata_library_types(
+    metadata_df: pd.DataFrame,
+    sample_id_col: str = 'sample_igf_id',
+    library_source_col: str = 'library_source',
+    library_strategy_col: str = 'library_strategy',
+    experiment_type_col: str = 'experiment_type'
+    ) -> pd.Series:
+    '''
+    A function for validating library metadata information for all the samples,
+    same checks as _validate_metadata_library_type using one isin pass per column
+
+    :param metadata_df: A pandas dataframe with the metadata rows
+    :param sample_id_col: Sample id column name, default sample_igf_id
+    :param library_source_col: Library source column name, default library_source
+    :param library_strategy_col: Library strategy column name, default library_strategy
+    :param experiment_type_col: Experiment type column name, default experiment_type
+    :returns: A pandas series of error messages indexed as metadata_df, only for the failed rows
+    '''
+    try:
+      if library_source_col not in metadata_df.columns:
+        return pd.Series(dtype=object)
+      missing_col = \
+          pd.Series(None, index=metadata_df.index, dtype=object)
+      library_source = metadata_df[library_source_col]
+      library_strategy = metadata_df.get(library_strategy_col, missing_col)
+      experiment_type = metadata_df.get(experiment_type_col, missing_col)
+      is_checked = \
+          library_source.isin(LIBRARY_TYPE_CHECKED_SOURCES).values
+      strategy_ok = \
+          pd.MultiIndex.from_arrays(
+              [library_source, library_strategy]).isin(LIBRARY_STRATEGY_PAIRS)
+      experiment_type_ok = \
+          pd.MultiIndex.from_arrays(
+              [library_source, experiment_type]).isin(EXPERIMENT_TYPE_PAIRS)
+      failed = is_checked & ~(strategy_ok & experiment_type_ok)
+      failed_df = pd.DataFrame({
+          'sample_id': metadata_df.get(sample_id_col, missing_col),
+          'library_source': library_source,
+          'library_strategy': library_strategy,
+          'experiment_type': experiment_type})[failed]
+      return pd.Series([
+          _get_library_type_error_message(*row)
+              for row in failed_df.itertuples(index=False, name=None)],
+          index=failed_df.index,
+          dtype=object)
+    except Exception as e:
+      raise ValueError(
+            f"Failed to validate library types, error: {e}")
+
 def mark_raw_metadata_as_ready(id_list: list) -> None:
     try:
         try:
@@ -928,6 +1076,106 @@ def mark_raw_metadata_as_ready(id_list: list) -> None:
             f"Failed to mark metadata as ready, error: {e}")
 
 
+def mark_raw_metadata_as_synched(id_list: list) -> dict:
+    '''
+        A function for marking a list of READY raw metadata as SYNCHED
+
+        :param id_list: A list of raw_metadata_id
+        :returns: A dictionary with the list of updated ids and the list of skipped ids
+    '''
+    return \
+        update_status_for_id_list(
+            model=RawMetadataModel,
+            id_column=RawMetadataModel.raw_metadata_id,
+            id_list=id_list,
+            from_status='READY',
+            to_status='SYNCHED')
+
+
+
+def get_ready_metadata_page(
+    cursor: int = 0,
+    limit: Optional[int] = None
+    ) -> Tuple[Optional[int], Optional[int]]:
+    '''
+    A function for finding the last READY metadata id of a page, ordered by id
+
+    :param cursor: Only the metadata ids after this value are listed, default 0
+    :param limit: Max number of metadata entries in the page, default None for all
+    :returns: The last metadata id of the page, or None if the page is empty, and
+              the cursor for the next page, or None if it is the last page
+    '''
+    try:
+        if limit is None:
+            last_id = (
+                db.session
+                .query(func.max(RawMetadataModel.raw_metadata_id))
+                .filter(RawMetadataModel.status=='READY')
+                .filter(RawMetadataModel.raw_metadata_id > cursor)
+                .scalar()
+            )
+            return last_id, None
+        if limit < 1:
+            raise ValueError(
+                f"Expecting a positive limit, got: {limit}")
+        metadata_ids = (
+            db.session
+            .query(RawMetadataModel.raw_metadata_id)
+            .filter(RawMetadataModel.status=='READY')
+            .filter(RawMetadataModel.raw_metadata_id > cursor)
+            .order_by(RawMetadataModel.raw_metadata_id)
+            .limit(limit + 1)
+            .all()
+        )
+        metadata_ids = [i[0] for i in metadata_ids]
+        if len(metadata_ids) == 0:
+            return None, None
+        if len(metadata_ids) > limit:
+            return metadata_ids[limit - 1], metadata_ids[limit - 1]
+        return metadata_ids[-1], None
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get ready metadata page, error: {e}")
+
+
+def iter_ready_metadata_json(
+    cursor: int = 0,
+    last_id: Optional[int] = None,
+    batch_size: int = READY_METADATA_BATCH_SIZE
+    ) -> Iterator[str]:
+    '''
+    A generator function for exporting the READY metadata entries as a JSON object
+    of metadata tag and formatted csv data, rows are fetched in batches from the db
+    and the JSON is generated one entry at a time
+
+    :param cursor: Only the metadata ids after this value are exported, default 0
+    :param last_id: Last metadata id to export, default None for all
+    :param batch_size: Number of rows to fetch at a time, default 100
+    :returns: An iterator of JSON strings
+    '''
+    query = (
+        db.session
+        .query(
+            RawMetadataModel.metadata_tag,
+            RawMetadataModel.formatted_csv_data)
+        .filter(RawMetadataModel.status=='READY')
+        .filter(RawMetadataModel.raw_metadata_id > cursor)
+    )
+    if last_id is not None:
+        query = \
+            query.filter(RawMetadataModel.raw_metadata_id <= last_id)
+    separator = ''
+    yield '{'
+    for metadata_tag, formatted_csv_data in (
+        query
+        .order_by(RawMetadataModel.raw_metadata_id)
+        .yield_per(batch_size)
+    ):
+        yield f"{separator}{json.dumps(metadata_tag)}: {json.dumps(formatted_csv_data)}"
+        separator = ', '
+    yield '}'
+
+
 def search_metadata_table_and_get_new_projects(
     data: Any
     ) -> list:
@@ -965,61 +1213,191 @@ def search_metadata_table_and_get_new_projects(
         raise ValueError(
             f"Failed to search for new metadata, error: {e}")
 
+def iter_json_list_items(
+    file_obj: Any,
+    chunk_size: int = 65536
+    ) -> Iterator[Any]:
+    '''
+    A generator function for parsing a JSON list from a file object one item
+    at a time, only the current item is kept in memory
+
+    :param file_obj: A file object opened in text or binary mode, e.g. gzip.open(file)
+    :param chunk_size: Number of bytes or characters to read at a time, default 65536
+    :returns: An iterator of the list items
+    '''
+    json_decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    eof = False
+    state = 'start'
+    read_size = chunk_size
+    def read_chunk():
+        chunk = file_obj.read(read_size)
+        if isinstance(chunk, bytes):
+            return utf8_decoder.decode(chunk, final=not chunk), not chunk
+        return chunk, not chunk
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                if state != 'done':
+                    raise ValueError("Incomplete JSON list")
+                return
+            buffer, eof = read_chunk()
+            position = 0
+            continue
+        if state == 'done':
+            raise ValueError(
+                f"Unexpected data after JSON list: {buffer[position:position+20]}")
+        if state == 'start':
+            if buffer[position] != '[':
+                raise TypeError("Expecting a JSON list")
+            position += 1
+            state = 'item_or_end'
+        elif state == 'sep':
+            if buffer[position] == ',':
+                state = 'item'
+            elif buffer[position] == ']':
+                state = 'done'
+            else:
+                raise ValueError(
+                    f"Expecting ',' or ']' in JSON list, got: {buffer[position]}")
+            position += 1
+        else:
+            if state == 'item_or_end' and buffer[position] == ']':
+                position += 1
+                state = 'done'
+                continue
+            try:
+                item, end = json_decoder.raw_decode(buffer, position)
+                ## numbers and literals can continue in the next chunk
+                is_complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                is_complete = False
+            if not is_complete:
+                chunk, eof = read_chunk()
+                buffer = buffer[position:] + chunk
+                position = 0
+                read_size = read_size * 2                                       # avoid parsing large items too many times
+                continue
+            yield item
+            ## buffer is only compacted when the next chunk is read
+            position = end
+            read_size = chunk_size
+            state = 'sep'
+
+
+def _get_csv_data_from_json(data: Any) -> str:
+    '''
+    An internal function for converting a list of records, or its
+    JSON string, to csv data
+    '''
+    if isinstance(data, str):
+        data = json.loads(data)
+    return (
+        pd.DataFrame(data)
+        .to_csv(index=False)
+    )
+
+
+def _add_raw_metadata_chunk(
+    entries: list,
+    added_tags: set
+    ) -> int:
+    '''
+    An internal function for adding a chunk of new metadata entries to the
+    db session, using one query for the existing metadata tags and one bulk insert
+
+    :param entries: A list of metadata dictionaries
+    :param added_tags: A set of metadata tags added in the current session, updated in place
+    :returns: Number of new metadata entries
+    '''
+    metadata_tags = list()
+    for entry in entries:
+        if (
+            entry.get("metadata_tag") is None
+            or entry.get("raw_csv_data") is None
+            or entry.get("formatted_csv_data") is None
+        ):
+            raise KeyError("Missing metadata info")
+        metadata_tags.append(entry.get("metadata_tag"))
+    existing_tags = (
+        db.session
+        .query(
+            RawMetadataModel.metadata_tag
+        )
+        .filter(
+            RawMetadataModel.metadata_tag.in_(set(metadata_tags))
+        )
+        .all()
+    )
+    existing_tags = set(i[0] for i in existing_tags)
+    existing_tags.update(added_tags)
+    new_entries = list()
+    for entry in entries:
+        metadata_tag = entry.get("metadata_tag")
+        if metadata_tag in existing_tags:
+            continue
+        new_entries.append({
+            'metadata_tag': metadata_tag,
+            'raw_csv_data': _get_csv_data_from_json(entry.get("raw_csv_data")),
+            'formatted_csv_data': _get_csv_data_from_json(entry.get("formatted_csv_data"))})
+        existing_tags.add(metadata_tag)
+        added_tags.add(metadata_tag)
+    if len(new_entries) > 0:
+        db.session.bulk_insert_mappings(
+            RawMetadataModel,
+            new_entries)
+    return len(new_entries)
+
+
 def parse_and_add_new_raw_metadata(
-    data: Any
-    ) -> None:
+    data: Any,
+    chunk_size: int = RAW_METADATA_INSERT_CHUNK_SIZE
+    ) -> int:
+    '''
+    A function for adding new metadata entries to db, existing metadata tags
+    are skipped. Entries are checked and inserted in chunks, and csv data is
+    only generated for the new entries. All the chunks are added in one transaction.
+
+    :param data: A list of metadata dictionaries, its JSON string or bytes, or a
+                 file object with the JSON list, which is parsed one entry at a time
+    :param chunk_size: Number of entries to check and insert at a time, default 500
+    :returns: Number of new metadata entries
+    '''
     try:
         if isinstance(data, bytes):
             data = json.loads(data.decode())
         if isinstance(data, str):
             data = json.loads(data)
-        if not isinstance(data, list):
+        if hasattr(data, 'read'):
+            data = iter_json_list_items(data)
+        elif not isinstance(data, list):
             raise TypeError(
                 f"Expecting a list of metadata dictionary, got: {type(data)}")
         try:
+            added_tags = set()
+            entries = list()
             for entry in data:
-                metadata_tag = entry.get("metadata_tag")
-                raw_csv_data = entry.get("raw_csv_data")
-                formatted_csv_data = entry.get("formatted_csv_data")
-                if (
-                    metadata_tag is None
-                    or raw_csv_data is None
-                    or formatted_csv_data is None
-                ):
-                    raise KeyError("Missing metadata info")
-                exists = (
-                    db.session
-                    .query(
-                        RawMetadataModel
-                    )
-                    .filter(
-                        RawMetadataModel.metadata_tag==metadata_tag
-                    )
-                    .one_or_none()
-                )
-                if isinstance(raw_csv_data, str):
-                    raw_csv_data = json.loads(raw_csv_data)
-                if isinstance(formatted_csv_data, str):
-                    formatted_csv_data = json.loads(formatted_csv_data)
-                raw_csv_data = (
-                    pd.DataFrame(raw_csv_data)
-                    .to_csv(index=False)
-                )
-                formatted_csv_data = (
-                    pd.DataFrame(formatted_csv_data)
-                    .to_csv(index=False)
-                )
-                if exists is None:
-                    metadata = RawMetadataModel(
-                        metadata_tag=metadata_tag,
-                        raw_csv_data=raw_csv_data,
-                        formatted_csv_data=formatted_csv_data)
-                    db.session.add(metadata)
-                    db.session.flush()
+                entries.append(entry)
+                if len(entries) >= chunk_size:
+                    _add_raw_metadata_chunk(
+                        entries=entries,
+                        added_tags=added_tags)
+                    entries = list()
+            if len(entries) > 0:
+                _add_raw_metadata_chunk(
+                    entries=entries,
+                    added_tags=added_tags)
             db.session.commit()
+            return len(added_tags)
         except:
             db.session.rollback()
             raise
     except Exception as e:
         raise ValueError(
-            f"Failed to add new metadata, error: {e}")
\ No newline at end of file
+            f"Failed to add new metadata, error: {e}")
@@ -1,20 +1,27 @@
 import json, logging, gzip
 from flask_appbuilder import ModelRestApi
-from flask import request, send_file
+from flask import request, send_file, Response, stream_with_context
 from flask_appbuilder.api import expose
 from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder.security.decorators import protect
 from . import db
 from io import BytesIO
 from .models import RawMetadataModel
+from .change_feed_api import ChangeFeedApiMixin
+from .change_feed.change_feed_util import get_request_id_list
 from .raw_metadata.raw_metadata_util import search_metadata_table_and_get_new_projects
 from .raw_metadata.raw_metadata_util import parse_and_add_new_raw_metadata
+from .raw_metadata.raw_metadata_util import get_ready_metadata_page
+from .raw_metadata.raw_metadata_util import iter_ready_metadata_json
+from .raw_metadata.raw_metadata_util import mark_raw_metadata_as_synched
+from .file_download_util import iter_gzip_chunks
 
 log = logging.getLogger(__name__)
 
-class RawMetadataDataApi(ModelRestApi):
+class RawMetadataDataApi(ChangeFeedApiMixin, ModelRestApi):
     resource_name = "raw_metadata"
     datamodel = SQLAInterface(RawMetadataModel)
+    change_feed_name = "raw_metadata"
 
     @expose('/search_new_metadata',  methods=['POST'])
     @protect()
@@ -48,12 +55,16 @@ class RawMetadataDataApi(ModelRestApi):
             file_obj = file_objs[0]
             file_name = file_obj.filename
             file_obj.seek(0)
-            json_data = file_obj.read()
-            if not json_data:
+            if not file_obj.read(1):
                 return self.response_400('No data')
+            file_obj.seek(0)
+            ## parse the json list one entry at a time, without reading
+            ## the decompressed payload in memory
             if file_name.endswith('.gz'):
-                json_data = gzip.decompress(json_data).decode('utf-8')
-            parse_and_add_new_raw_metadata(data=json_data)
+                with gzip.open(file_obj.stream, 'rb') as json_fp:
+                    parse_and_add_new_raw_metadata(data=json_fp)
+            else:
+                parse_and_add_new_raw_metadata(data=file_obj.stream)
             return self.response(200, message='loaded new metadata')
         except Exception as e:
             log.error(e)
@@ -87,24 +98,34 @@ class RawMetadataDataApi(ModelRestApi):
     @protect()
     def download_ready_metadata(self):
         try:
-            results = (
-                db.session
-                .query(
-                    RawMetadataModel.metadata_tag,
-                    RawMetadataModel.formatted_csv_data)
-                .filter(RawMetadataModel.status=='READY')
-                .all()
-            )
-            if len(results)==0:
+            try:
+                cursor = request.args.get('cursor', default=0, type=int)
+                limit = request.args.get('limit', default=None, type=int)
+                last_id, next_cursor = \
+                    get_ready_metadata_page(
+                        cursor=cursor,
+                        limit=limit)
+            except ValueError as e:
+                return self.response_400(message=str(e))
+            if last_id is None:
                 return self.response(200)
-            else:
-                data = dict()
-                for entry in results:
-                    data.update({entry[0]: entry[1]})
-                data = json.dumps(data)
-                output = BytesIO(data.encode())
-                output.seek(0)
-                return send_file(output, download_name='metadata.json', as_attachment=True)
+            ## stream the json from a db cursor, gzip compressed if the client accepts it
+            json_chunks = \
+                iter_ready_metadata_json(
+                    cursor=cursor,
+                    last_id=last_id)
+            headers = {
+                'Content-Disposition': 'attachment; filename=metadata.json',
+                'Vary': 'Accept-Encoding'}
+            if next_cursor is not None:
+                headers['X-Next-Cursor'] = str(next_cursor)
+            if request.accept_encodings.quality('gzip') > 0:
+                json_chunks = iter_gzip_chunks(json_chunks)
+                headers['Content-Encoding'] = 'gzip'
+            return Response(
+                stream_with_context(json_chunks),
+                mimetype='application/json',
+                headers=headers)
         except Exception as e:
             log.error(e)
 
@@ -112,20 +133,42 @@ class RawMetadataDataApi(ModelRestApi):
     @protect()
     def mark_raw_metadata_as_synced(self, raw_metadata_id: int):
         try:
-            try:
-                (db.session
-                .query(RawMetadataModel)
-                .filter(RawMetadataModel.status=='READY')
-                .filter(RawMetadataModel.raw_metadata_id==raw_metadata_id)
-                .update({'status':'SYNCHED'})
+            results = \
+                mark_raw_metadata_as_synched(
+                    id_list=[raw_metadata_id])
+            if len(results.get('updated')) == 0:
+                ## already synced metadata is a success, e.g. for retried calls
+                current_status = (
+                    db.session
+                    .query(RawMetadataModel.status)
+                    .filter(RawMetadataModel.raw_metadata_id==int(raw_metadata_id))
+                    .scalar()
                 )
-                db.session.commit()
-                return self.response(200, message='metadata synced')
-            except:
-                db.session.rollback()
-                raise
+                if current_status != 'SYNCHED':
+                    # can't find any READY metadata
+                    return self.response(200, message='metadata not synced', status='failed')
+            return self.response(200, message='metadata synced', status='success', **results)
+        except Exception as e:
+            log.error(e)
+            return self.response_500(message='Failed to mark metadata as synced')
+
+
+    @expose('/mark_metadata_list_as_synced',  methods=['POST'])
+    @protect()
+    def mark_metadata_list_as_synced(self):
+        try:
+            try:
+                id_list = get_request_id_list(request)
+                id_list = [int(i) for i in id_list]
+            except (ValueError, TypeError):
+                return self.response_400(message='Expecting a JSON with id_list')
+            results = \
+                mark_raw_metadata_as_synched(
+                    id_list=id_list)
+            return self.response(200, **results)
         except Exception as e:
             log.error(e)
+            return self.response_500(message='Failed to mark metadata as synced')
 
 
     @expose('/mark_ready_metadata_as_synced',  methods=['GET'])
@@ -1,11 +1,19 @@
+import json
+from io import StringIO
 from typing import (
     Tuple,
     Any,
-    Optional)
+    Optional,
+    Union)
 from app import db
 from app.models import (
     RawSeqrun,
     SampleSheetModel)
+from app.samplesheet.samplesheet_util import (
+    SampleSheet,
+    get_read_cycles_from_override_cycles,
+    fetch_samplesheet_variant_hash,
+    update_samplesheet_variants_in_db)
 
 def check_and_add_new_raw_seqrun(
     seqrun_id_list: list,
@@ -127,6 +135,191 @@ def fetch_samplesheet_for_seqrun(
         raise ValueError(
             f"Failed to fetch samplesheet for seqrun, error: {e}")
 
+def fetch_samplesheet_variant_for_seqrun(
+    seqrun_id: str,
+    variant_type: str = 'ORIGINAL'
+    ) -> Optional[Tuple[str, int, str]]:
+    '''
+        Fetch the stored variant of the validated samplesheet of a run, without
+        reading the csv data
+
+        :param seqrun_id: Raw seqrun igf id
+        :param variant_type: Variant type, ORIGINAL, I5_RC or V2
+        :returns: None if no validated samplesheet found, or a tuple of
+                  samplesheet tag, samplesheet variant id and content hash
+    '''
+    try:
+        result = (
+            db.session
+            .query(
+                SampleSheetModel.samplesheet_tag,
+                SampleSheetModel.samplesheet_id
+            )
+            .join(
+                RawSeqrun,
+                RawSeqrun.samplesheet_id==SampleSheetModel.samplesheet_id
+            )
+            .filter(
+                RawSeqrun.raw_seqrun_igf_id==seqrun_id
+            )
+            .filter(
+                SampleSheetModel.status=='PASS'
+            )
+            .filter(
+                SampleSheetModel.validation_time >= SampleSheetModel.update_time
+            )
+            .one_or_none()
+        )
+        if result is None:
+            return None
+        (samplesheet_tag, samplesheet_id) = result
+        variant = \
+            fetch_samplesheet_variant_hash(
+                samplesheet_id=samplesheet_id,
+                variant_type=variant_type)
+        if variant is None:
+            ## validated before the variants were added
+            update_samplesheet_variants_in_db(
+                samplesheet_id=samplesheet_id)
+            variant = \
+                fetch_samplesheet_variant_hash(
+                    samplesheet_id=samplesheet_id,
+                    variant_type=variant_type)
+        if variant is None:
+            return None
+        (samplesheet_variant_id, content_hash) = variant
+        return samplesheet_tag, samplesheet_variant_id, content_hash
+    except Exception as e:
+        raise ValueError(
+            f"Failed to fetch samplesheet variant for seqrun, error: {e}")
+
+def get_read_cycles_from_run_config(
+    run_config: Union[str, dict, None]
+    ) -> Optional[list]:
+    '''
+        Get read cycles from the run config of a raw seqrun. The run config is
+        expected as a JSON with a list of reads from RunInfo.xml, e.g.
+        {"reads": [{"number": 1, "num_cycles": 151, "is_indexed_read": "N"}, ...]}
+
+        :param run_config: Run config JSON string or dictionary
+        :returns: A list of (read type, cycles) tuples, or None if no reads found
+    '''
+    try:
+        if run_config is None or run_config == '':
+            return None
+        if isinstance(run_config, bytes):
+            run_config = run_config.decode()
+        if isinstance(run_config, str):
+            try:
+                run_config = json.loads(run_config)
+            except json.JSONDecodeError:
+                return None
+        if not isinstance(run_config, dict):
+            return None
+        reads = run_config.get('reads', run_config.get('Reads'))
+        if not isinstance(reads, list) or len(reads) == 0:
+            return None
+        read_cycles = list()
+        for read_index, read in enumerate(reads):
+            number = read.get('number', read.get('Number', read_index + 1))
+            num_cycles = read.get('num_cycles', read.get('NumCycles'))
+            is_indexed_read = \
+                read.get('is_indexed_read', read.get('IsIndexedRead', 'N'))
+            if num_cycles is None:
+                raise ValueError(
+                    f"Missing cycles for read {number}")
+            if isinstance(is_indexed_read, str):
+                is_indexed_read = is_indexed_read.upper() in ('Y', 'TRUE')
+            read_cycles.append((
+                int(number),
+                'I' if is_indexed_read else 'Y',
+                int(num_cycles)))
+        read_cycles.sort(key=lambda x: x[0])
+        return [(read_type, cycles) for _, read_type, cycles in read_cycles]
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get read cycles from run config, error: {e}")
+
+def fetch_split_samplesheets_for_seqrun(
+    seqrun_id: str
+    ) -> Optional[list]:
+    '''
+        Split the validated samplesheet of a run by lane and index lengths. The run
+        read cycles are taken from the reads list of the run config, or from the
+        run's override cycles. If neither is set, the sub-samplesheets don't have
+        the OverrideCycles setting.
+
+        :param seqrun_id: Raw seqrun igf id
+        :returns: None if no validated samplesheet found, or a list of sub-samplesheets
+                  with lane, index lengths, override_cycles, sample_count and csv_data
+    '''
+    try:
+        result = fetch_samplesheet_for_seqrun(seqrun_id=seqrun_id)
+        if result is None:
+            return None
+        (_, csv_data) = result
+        if isinstance(csv_data, bytes):
+            csv_data = csv_data.decode()
+        run_config, override_cycles = (
+            db.session
+            .query(
+                RawSeqrun.run_config,
+                RawSeqrun.override_cycles)
+            .filter(RawSeqrun.raw_seqrun_igf_id==seqrun_id)
+            .one()
+        )
+        read_cycles = \
+            get_read_cycles_from_run_config(run_config)
+        if read_cycles is None:
+            read_cycles = \
+                get_read_cycles_from_override_cycles(override_cycles)
+        sa = SampleSheet(infile=StringIO(csv_data))
+        return sa.get_split_samplesheets(read_cycles=read_cycles)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to fetch split samplesheets for seqrun, error: {e}")
+
+def fetch_index_collisions_for_seqrun(
+    seqrun_id: str,
+    mismatches: Optional[int] = None
+    ) -> Any:
+    '''
+        Check the validated samplesheet of a run for index collisions
+
+        :param seqrun_id: Raw seqrun igf id
+        :param mismatches: Barcode mismatches, default None for the run's mismatches value
+        :returns: None if no validated samplesheet found, or a tuple of the
+                  colliding pairs, recommended mismatches per lane and the
+                  largest safe mismatches for the run
+    '''
+    try:
+        result = fetch_samplesheet_for_seqrun(seqrun_id=seqrun_id)
+        if result is None:
+            return None
+        (_, csv_data) = result
+        if isinstance(csv_data, bytes):
+            csv_data = csv_data.decode()
+        if mismatches is None:
+            run_mismatches = (
+                db.session
+                .query(RawSeqrun.mismatches)
+                .filter(RawSeqrun.raw_seqrun_igf_id==seqrun_id)
+                .scalar()
+            )
+            mismatches = \
+                int(run_mismatches) if run_mismatches is not None else 1
+        sa = SampleSheet(infile=StringIO(csv_data))
+        collisions, lane_mismatches = \
+            sa.get_index_collisions(mismatches=mismatches)
+        run_mismatches = None
+        if len(lane_mismatches) > 0 and \
+           None not in lane_mismatches.values():
+            run_mismatches = min(lane_mismatches.values())
+        return collisions, lane_mismatches, run_mismatches
+    except Exception as e:
+        raise ValueError(
+            f"Failed to fetch index collisions for seqrun, error: {e}")
+
 def check_and_filter_raw_seqruns_after_checking_samplesheet(
     raw_seqrun_igf_ids: list
     ) -> Tuple[list, list]:
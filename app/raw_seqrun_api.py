@@ -1,19 +1,36 @@
 import json, logging
 from flask_appbuilder import ModelRestApi
-from flask import request, send_file
+from flask import request, send_file, make_response
 from flask_appbuilder.api import expose
 from flask_appbuilder.models.sqla.interface import SQLAInterface
 from flask_appbuilder.security.decorators import protect
 from io import BytesIO
 from .models import RawSeqrun
-from .raw_seqrun.raw_seqrun_util import fetch_samplesheet_for_seqrun
+from .change_feed_api import ChangeFeedApiMixin
 from .raw_seqrun.raw_seqrun_util import fetch_override_cycle_for_seqrun
 from .raw_seqrun.raw_seqrun_util import fetch_samplesheet_id_for_seqrun
 from .raw_seqrun.raw_seqrun_util import check_and_add_new_raw_seqrun
+from .raw_seqrun.raw_seqrun_util import fetch_samplesheet_variant_for_seqrun
+from .raw_seqrun.raw_seqrun_util import fetch_split_samplesheets_for_seqrun
+from .raw_seqrun.raw_seqrun_util import fetch_index_collisions_for_seqrun
+from .samplesheet.samplesheet_util import fetch_samplesheet_variant_data
+from .samplesheet.samplesheet_util import SAMPLESHEET_VARIANT_TYPES
 
-class RawSeqrunApi(ModelRestApi):
+
+def _get_samplesheet_variant_file_name(tag: str, variant_type: str) -> str:
+    tag = \
+        tag.\
+            replace(' ', '_').\
+            replace('/', '_').\
+            replace('\\', '_')
+    if variant_type == 'ORIGINAL':
+        return f"{tag}.csv"
+    return f"{tag}_{variant_type}.csv"
+
+class RawSeqrunApi(ChangeFeedApiMixin, ModelRestApi):
     resource_name = "raw_seqrun"
     datamodel = SQLAInterface(RawSeqrun)
+    change_feed_name = "raw_seqrun"
 
     @expose('/add_new_seqrun',  methods=['POST'])
     @protect()
@@ -61,26 +78,67 @@ class RawSeqrunApi(ModelRestApi):
                 json_data = json_data.decode('utf-8')
             json_data = json.loads(json_data)
             seqrun_id = json_data.get("seqrun_id")
+            variant_type = json_data.get("variant", "ORIGINAL")
             if seqrun_id is None:
                 return self.response_400('No seqrun_id found')
+            if variant_type not in SAMPLESHEET_VARIANT_TYPES:
+                return self.response_400(f'Unknown variant {variant_type}')
             result = \
-                fetch_samplesheet_for_seqrun(seqrun_id=seqrun_id)
+                fetch_samplesheet_variant_for_seqrun(
+                    seqrun_id=seqrun_id,
+                    variant_type=variant_type)
             if result is None:
                 return self.response(200, message='No samplesheet found')
             else:
-                (tag, csv_data) = result
-                tag = \
-                    tag.\
-                        replace(' ', '_').\
-                        replace('/', '_').\
-                        replace('\\', '_')
+                (tag, samplesheet_variant_id, content_hash) = result
+                csv_data = \
+                    fetch_samplesheet_variant_data(
+                        samplesheet_variant_id=samplesheet_variant_id)
                 output = BytesIO(csv_data.encode())
                 output.seek(0)
-                attachment_filename = f"{tag}.csv"
-                return send_file(output, download_name=attachment_filename, as_attachment=True)
+                attachment_filename = \
+                    _get_samplesheet_variant_file_name(tag, variant_type)
+                return send_file(output, download_name=attachment_filename, as_attachment=True, etag=content_hash, conditional=False)
         except Exception as e:
             logging.error(e)
 
+    @expose('/get_run_samplesheet/<seqrun_id>',  methods=['GET'])
+    @protect()
+    def get_run_samplesheet(self, seqrun_id):
+        '''
+            Download a variant (ORIGINAL, I5_RC or V2) of the validated samplesheet
+            of a run, e.g. /get_run_samplesheet/<seqrun_id>?variant=V2
+
+            The response has the content hash of the variant as ETag, and a request
+            with a matching If-None-Match header gets 304 without reading the csv data
+        '''
+        try:
+            variant_type = request.args.get("variant", "ORIGINAL")
+            if variant_type not in SAMPLESHEET_VARIANT_TYPES:
+                return self.response_400(f'Unknown variant {variant_type}')
+            result = \
+                fetch_samplesheet_variant_for_seqrun(
+                    seqrun_id=seqrun_id,
+                    variant_type=variant_type)
+            if result is None:
+                return self.response_404()
+            (tag, samplesheet_variant_id, content_hash) = result
+            if request.if_none_match.contains(content_hash):
+                response = make_response('', 304)
+                response.set_etag(content_hash)
+                return response
+            csv_data = \
+                fetch_samplesheet_variant_data(
+                    samplesheet_variant_id=samplesheet_variant_id)
+            output = BytesIO(csv_data.encode())
+            output.seek(0)
+            attachment_filename = \
+                _get_samplesheet_variant_file_name(tag, variant_type)
+            return send_file(output, download_name=attachment_filename, as_attachment=True, etag=content_hash, conditional=False)
+        except Exception as e:
+            logging.error(e)
+            return self.response_500()
+
     @expose('/get_run_override_cycle/<seqrun_id>',  methods=['POST'])
     @protect()
     def get_run_override_cycle(self, seqrun_id):
@@ -105,4 +163,57 @@ class RawSeqrunApi(ModelRestApi):
             else:
                 return self.response(200, samplesheet_id=result)
         except Exception as e:
-            logging.error(e)
\ No newline at end of file
+            logging.error(e)
+
+    @expose('/get_split_samplesheets/<seqrun_id>',  methods=['GET'])
+    @protect()
+    def get_split_samplesheets(self, seqrun_id):
+        '''
+            Get the validated samplesheet of a run split by lane and index lengths,
+            each sub-samplesheet is a V2 samplesheet with its own OverrideCycles, if
+            the run read cycles are known from the run config or override cycles
+        '''
+        try:
+            result = \
+                fetch_split_samplesheets_for_seqrun(seqrun_id=seqrun_id)
+            if result is None:
+                return self.response_404()
+            return self.response(200, samplesheets=result)
+        except Exception as e:
+            logging.error(e)
+            return self.response_400('Failed to split samplesheet')
+
+    @expose('/get_index_collisions/<seqrun_id>',  methods=['GET'])
+    @protect()
+    def get_index_collisions(self, seqrun_id):
+        '''
+            Check the validated samplesheet of a run for index pairs which can't be
+            resolved with the barcode mismatches, default the run's mismatches value.
+            Returns the colliding pairs, the recommended mismatches for each lane and
+            the largest safe mismatches for the run, or null if a lane can't be
+            demultiplexed
+        '''
+        try:
+            mismatches = request.args.get('mismatches')
+            if mismatches is not None:
+                try:
+                    mismatches = int(mismatches)
+                except ValueError:
+                    return self.response_400('Expecting an integer for mismatches')
+                if mismatches < 0:
+                    return self.response_400('Expecting an integer for mismatches')
+            result = \
+                fetch_index_collisions_for_seqrun(
+                    seqrun_id=seqrun_id,
+                    mismatches=mismatches)
+            if result is None:
+                return self.response_404()
+            collisions, lane_mismatches, run_mismatches = result
+            return self.response(
+                200,
+                collisions=collisions,
+                lane_mismatches=lane_mismatches,
+                mismatches=run_mismatches)
+        except Exception as e:
+            logging.error(e)
+            return self.response_400('Failed to check index collisions')
@@ -0,0 +1,405 @@
+import os
+import gzip
+import time
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional, Tuple
+from app import app, db, celery
+from app.models import (
+    IlluminaInteropData,
+    PreDeMultiplexingData,
+    CosmxSlideQCData,
+    AnalysesQCData)
+from app.report_upload_util import (
+    REPORT_UPLOAD_CHUNK_SIZE,
+    REPORT_STAGING_DIR_NAME,
+    get_report_staging_dir,
+    stage_report_stream)
+
+try:
+    import brotli                                                               # optional, for .br variants
+except ImportError:
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+REPORT_BLOB_DIR_NAME = 'blobs'
+REPORT_STORE_DIRS = (
+    'interop_reports',
+    'predemult_reports')
+REPORT_BLOB_MODELS = (
+    IlluminaInteropData,
+    PreDeMultiplexingData,
+    CosmxSlideQCData,
+    AnalysesQCData)
+REPORT_STORE_LOCK_FILE_NAME = '.lock'
+REPORT_GC_GRACE_PERIOD = 3600                                                   # seconds, for blobs without db rows yet
+REPORT_STAGING_GC_GRACE_PERIOD = 7 * 24 * 3600                                  # seconds, staged files wait for queued celery jobs
+REPORT_GC_CHUNK_SIZE = 500
+## precompressed variants, in order of preference
+REPORT_VARIANT_ENCODINGS = (
+    ('br', '.br'),
+    ('gzip', '.gz'))
+REPORT_VARIANT_SUFFIXES = tuple(
+    suffix for _, suffix in REPORT_VARIANT_ENCODINGS)
+REPORT_COMPRESSIBLE_SUFFIXES = (
+    '.html', '.htm', '.json', '.txt', '.csv', '.tsv', '.js', '.css', '.svg', '.xml')
+
+
+def get_report_blob_path(
+    store_path: str,
+    sha256: str,
+    file_name: str) -> str:
+    '''
+    A function for getting the path of a report blob, blobs are keyed by the
+    sha256 of the bytes in sharded dirs, e.g. blobs/ab/cd/abcd.../report.html
+
+    :param store_path: Base path of the report store
+    :param sha256: Sha256 checksum of the report
+    :param file_name: File name of the report
+    :returns: Path of the blob
+    '''
+    return \
+        os.path.join(
+            store_path,
+            REPORT_BLOB_DIR_NAME,
+            sha256[:2],
+            sha256[2:4],
+            sha256,
+            os.path.basename(file_name))
+
+
+@contextmanager
+def report_store_lock(
+    store_path: str,
+    exclusive: bool = False) -> Iterator[None]:
+    '''
+    A context manager for locking a report store, blobs are added with a shared
+    lock and the garbage collector runs with an exclusive lock
+
+    :param store_path: Base path of the report store
+    :param exclusive: Get an exclusive lock, default False
+    '''
+    os.makedirs(store_path, exist_ok=True)
+    with open(os.path.join(store_path, REPORT_STORE_LOCK_FILE_NAME), 'a') as fp:
+        fcntl.flock(
+            fp.fileno(),
+            fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+
+def _get_file_sha256(
+    file_path: str,
+    chunk_size: int = REPORT_UPLOAD_CHUNK_SIZE) -> str:
+    checksum = hashlib.sha256()
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def add_report_to_store(
+    file_path: str,
+    store_path: str,
+    file_name: Optional[str] = None,
+    sha256: Optional[str] = None,
+    move_file: bool = False) -> str:
+    '''
+    A function for adding a report file to the content-addressed store
+
+    Identical reports collapse to one blob. If the blob exists, the new file is
+    dropped and the blob mtime is refreshed, so the garbage collector will not
+    remove it before the db row is added. The blob is reused under a shared store
+    lock, so a running garbage collector can't remove it at the same time. The
+    same bytes with another file name are hard linked to the existing blob.
+
+    :param file_path: Path of the report file
+    :param store_path: Base path of the report store
+    :param file_name: File name of the report, default basename of file_path
+    :param sha256: Sha256 checksum of the report, calculated if it's None
+    :param move_file: Move a staged file to the store, default False for copying the file
+    :returns: Path of the blob
+    '''
+    try:
+        if file_name is None:
+            file_name = \
+                os.path.basename(file_path)
+        if not move_file:
+            ## copy the file to the staging dir first, blob is moved in place
+            with open(file_path, 'rb') as fp:
+                staged_report = \
+                    stage_report_stream(
+                        stream=fp,
+                        staging_dir=get_report_staging_dir(store_path))
+            file_path = staged_report.get('file_path')
+            sha256 = staged_report.get('sha256')
+        elif sha256 is None:
+            sha256 = \
+                _get_file_sha256(file_path)
+        blob_path = \
+            get_report_blob_path(
+                store_path=store_path,
+                sha256=sha256,
+                file_name=file_name)
+        blob_dir = os.path.dirname(blob_path)
+        with report_store_lock(store_path):
+            os.makedirs(blob_dir, exist_ok=True)
+            if os.path.exists(blob_path):
+                os.remove(file_path)
+                os.utime(blob_path)
+                return blob_path
+            existing_blobs = [
+                f for f in os.listdir(blob_dir)
+                    if not f.startswith('.') and \
+                       not f.endswith(REPORT_VARIANT_SUFFIXES)]
+            if len(existing_blobs) > 0:
+                try:
+                    os.link(
+                        os.path.join(blob_dir, existing_blobs[0]),
+                        blob_path)
+                    os.remove(file_path)
+                    os.utime(blob_path)
+                    return blob_path
+                except FileExistsError:
+                    os.remove(file_path)
+                    os.utime(blob_path)
+                    return blob_path
+                except OSError as e:
+                    log.warning(
+                        f"Failed to link report blob {blob_path}, error: {e}")
+            os.replace(file_path, blob_path)
+            return blob_path
+    except Exception as e:
+        raise ValueError(
+            f"Failed to add report {file_path} to store, error: {e}")
+
+
+def _write_report_variant(
+    blob_path: str,
+    variant_path: str,
+    encoding: str,
+    chunk_size: int = REPORT_UPLOAD_CHUNK_SIZE) -> None:
+    fd, temp_path = \
+        tempfile.mkstemp(
+            dir=os.path.dirname(blob_path),
+            prefix='.variant_',
+            suffix='.tmp')
+    try:
+        with open(blob_path, 'rb') as fp, \
+             os.fdopen(fd, 'wb') as out_fp:
+            if encoding == 'gzip':
+                with gzip.GzipFile(
+                        filename='', fileobj=out_fp, mode='wb',
+                        compresslevel=9, mtime=0) as gz_fp:
+                    shutil.copyfileobj(fp, gz_fp, chunk_size)
+            else:
+                compressor = brotli.Compressor(quality=11)
+                for chunk in iter(lambda: fp.read(chunk_size), b''):
+                    out_fp.write(compressor.process(chunk))
+                out_fp.write(compressor.finish())
+        os.replace(temp_path, variant_path)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def add_report_variants(blob_path: str) -> dict:
+    '''
+    A function for writing precompressed siblings of a report blob, e.g.
+    report.html.gz, for the text reports. Brotli (.br) variants are written only
+    if the brotli package is installed. Existing variants are kept.
+
+    :param blob_path: Path of the report blob
+    :returns: A dictionary of encodings and variant paths
+    '''
+    try:
+        variants = dict()
+        if not blob_path.lower().endswith(REPORT_COMPRESSIBLE_SUFFIXES):
+            return variants
+        for encoding, suffix in REPORT_VARIANT_ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            variant_path = f"{blob_path}{suffix}"
+            if not os.path.exists(variant_path):
+                _write_report_variant(
+                    blob_path=blob_path,
+                    variant_path=variant_path,
+                    encoding=encoding)
+            variants.update({encoding: variant_path})
+        return variants
+    except Exception as e:
+        raise ValueError(
+            f"Failed to add precompressed variants for {blob_path}, error: {e}")
+
+
+def get_report_variant(
+    file_path: str,
+    accept_encodings: Any,
+    encodings: Optional[Iterable[str]] = None) -> Tuple[str, Optional[str]]:
+    '''
+    A function for selecting a precompressed variant of a report for a client
+
+    :param file_path: Path of the report
+    :param accept_encodings: Accepted encodings of the client, e.g. request.accept_encodings
+    :param encodings: Encodings to consider, default None for all the variant encodings
+    :returns: Path of the selected file and its content encoding, None for the report itself
+    '''
+    for encoding, suffix in REPORT_VARIANT_ENCODINGS:
+        if encodings is not None and \
+           encoding not in encodings:
+            continue
+        variant_path = f"{file_path}{suffix}"
+        if accept_encodings.quality(encoding) > 0 and \
+           os.path.isfile(variant_path):
+            return variant_path, encoding
+    return file_path, None
+
+
+def get_report_blob_ref_counts(blob_paths: list) -> dict:
+    '''
+    A function for counting the db rows pointing at a list of blobs, across all
+    the report tables
+
+    :param blob_paths: A list of blob paths
+    :returns: A dictionary with a reference count for each blob path
+    '''
+    try:
+        ref_counts = {
+            blob_path: 0 for blob_path in blob_paths}
+        for i in range(0, len(blob_paths), REPORT_GC_CHUNK_SIZE):
+            chunk = blob_paths[i:i + REPORT_GC_CHUNK_SIZE]
+            for model in REPORT_BLOB_MODELS:
+                results = (
+                    db.session
+                    .query(model.file_path, db.func.count())
+                    .filter(model.file_path.in_(chunk))
+                    .group_by(model.file_path)
+                    .all()
+                )
+                for blob_path, count in results:
+                    ref_counts[blob_path] += count
+        return ref_counts
+    except Exception as e:
+        raise ValueError(
+            f"Failed to count report blob references, error: {e}")
+
+
+def garbage_collect_report_store(
+    store_path: str,
+    grace_period: int = REPORT_GC_GRACE_PERIOD,
+    staging_grace_period: int = REPORT_STAGING_GC_GRACE_PERIOD,
+    dry_run: bool = False) -> list:
+    '''
+    A function for removing the blobs without any db row pointing at them, and the
+    leftover staged files of failed uploads
+
+    Blobs changed within the grace period are kept, as their db rows can still be
+    on the way. It runs with an exclusive store lock and checks the blob mtime
+    again before removing it, so a blob reused by add_report_to_store is kept.
+    Staged files are kept for the longer staging grace period, as their celery
+    jobs can wait in the queue.
+
+    :param store_path: Base path of the report store
+    :param grace_period: Min age of the removed blobs in seconds, default 3600
+    :param staging_grace_period: Min age of the removed staged files in seconds, default 7 days
+    :param dry_run: List the files without removing them, default False
+    :returns: A list of removed file paths
+    '''
+    try:
+        cutoff = time.time() - grace_period
+        staging_cutoff = time.time() - staging_grace_period
+        blob_root = \
+            os.path.join(store_path, REPORT_BLOB_DIR_NAME)
+        with report_store_lock(store_path, exclusive=True):
+            candidate_blobs = list()
+            orphan_variants = list()
+            for root, _, files in os.walk(blob_root):
+                for file_name in files:
+                    file_path = os.path.join(root, file_name)
+                    if file_name.endswith(REPORT_VARIANT_SUFFIXES):
+                        ## variants are removed with their report
+                        source_path = os.path.splitext(file_path)[0]
+                        if not os.path.exists(source_path) and \
+                           os.path.getmtime(file_path) < cutoff:
+                            orphan_variants.append(file_path)
+                    elif os.path.getmtime(file_path) < cutoff:
+                        candidate_blobs.append(file_path)
+            ref_counts = \
+                get_report_blob_ref_counts(candidate_blobs)
+            removed_files = list()
+            for blob_path, count in ref_counts.items():
+                if count == 0:
+                    removed_files.append(blob_path)
+                    removed_files.extend([
+                        f"{blob_path}{suffix}"
+                            for suffix in REPORT_VARIANT_SUFFIXES
+                                if os.path.exists(f"{blob_path}{suffix}")])
+            removed_files.extend(orphan_variants)
+            staging_dir = \
+                os.path.join(store_path, REPORT_STAGING_DIR_NAME)
+            if os.path.isdir(staging_dir):
+                for file_name in os.listdir(staging_dir):
+                    file_path = os.path.join(staging_dir, file_name)
+                    if os.path.getmtime(file_path) < staging_cutoff:
+                        removed_files.append(file_path)
+            if dry_run:
+                return removed_files
+            ## check the blobs again, they can be reused after listing
+            kept_blobs = [
+                blob_path for blob_path in ref_counts.keys()
+                    if os.path.exists(blob_path) and \
+                       os.path.getmtime(blob_path) >= cutoff]
+            if len(kept_blobs) > 0:
+                removed_files = [
+                    file_path for file_path in removed_files
+                        if not any(
+                            file_path == blob_path or \
+                            file_path.startswith(f"{blob_path}.")
+                                for blob_path in kept_blobs)]
+            for file_path in removed_files:
+                os.remove(file_path)
+            ## remove the empty blob and shard dirs
+            for root, dirs, files in os.walk(blob_root, topdown=False):
+                if root != blob_root and \
+                   len(os.listdir(root)) == 0:
+                    os.rmdir(root)
+        if len(removed_files) > 0:
+            log.info(
+                f"Removed {len(removed_files)} files from report store {store_path}")
+        return removed_files
+    except Exception as e:
+        raise ValueError(
+            f"Failed to garbage collect report store {store_path}, error: {e}")
+
+
+@celery.task(bind=True)
+def async_garbage_collect_report_stores(self) -> dict:
+    try:
+        removed_files = list()
+        for store_dir in REPORT_STORE_DIRS:
+            store_path = \
+                os.path.join(
+                    app.config['REPORT_UPLOAD_PATH'],
+                    store_dir)
+            if os.path.isdir(store_path):
+                removed_files.extend(
+                    garbage_collect_report_store(
+                        store_path=store_path,
+                        grace_period=app.config.get(
+                            'REPORT_GC_GRACE_PERIOD',
+                            REPORT_GC_GRACE_PERIOD),
+                        staging_grace_period=app.config.get(
+                            'REPORT_STAGING_GC_GRACE_PERIOD',
+                            REPORT_STAGING_GC_GRACE_PERIOD)))
+        return {"message": "success", "removed_files": len(removed_files)}
+    except Exception as e:
+        log.error(
+            f"Failed to run celery job, error: {e}")
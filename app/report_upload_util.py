@@ -0,0 +1,115 @@
+import os
+import gzip
+import hashlib
+import logging
+import tempfile
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+REPORT_UPLOAD_CHUNK_SIZE = 1024 * 1024
+REPORT_STAGING_DIR_NAME = '.staging'
+
+
+def get_report_staging_dir(base_path: str) -> str:
+    '''
+    A function for getting the staging dir for report uploads, staged files
+    are on the same filesystem as the final reports and can be renamed in place
+
+    :param base_path: Base path of the reports
+    :returns: Path of the staging dir
+    '''
+    staging_dir = \
+        os.path.join(base_path, REPORT_STAGING_DIR_NAME)
+    os.makedirs(staging_dir, exist_ok=True)
+    return staging_dir
+
+
+def stage_report_stream(
+    stream: Any,
+    staging_dir: str,
+    chunk_size: int = REPORT_UPLOAD_CHUNK_SIZE) -> dict:
+    '''
+    A function for writing a binary stream to a new file in the staging dir,
+    the bytes are hashed as they are written
+
+    :param stream: A binary file-like object
+    :param staging_dir: Staging dir, from get_report_staging_dir
+    :param chunk_size: Read chunk size in bytes, default 1MB
+    :returns: A dictionary with the staged file_path, the sha256 checksum and the size
+    '''
+    checksum = hashlib.sha256()
+    size = 0
+    fd, staged_path = \
+        tempfile.mkstemp(
+            dir=staging_dir,
+            prefix='upload_',
+            suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                checksum.update(chunk)
+                size += len(chunk)
+                fp.write(chunk)
+    except:
+        os.remove(staged_path)
+        raise
+    return {
+        'file_path': staged_path,
+        'sha256': checksum.hexdigest(),
+        'size': size}
+
+
+def stage_report_upload(
+    file_obj: Any,
+    staging_dir: str,
+    chunk_size: int = REPORT_UPLOAD_CHUNK_SIZE) -> dict:
+    '''
+    A function for streaming an uploaded report file to the staging dir, gzipped
+    uploads (.gz) are decompressed on the fly and the bytes are hashed as they are
+    written, so the report is never held in memory
+
+    :param file_obj: An uploaded file, e.g. from request.files
+    :param staging_dir: Staging dir, from get_report_staging_dir
+    :param chunk_size: Read chunk size in bytes, default 1MB
+    :returns: A dictionary with the file_name (without .gz), the staged file_path,
+              the sha256 checksum and the size of the report
+    '''
+    try:
+        file_name = \
+            os.path.basename(file_obj.filename or '')
+        if file_name == '':
+            raise ValueError("Missing file name")
+        stream = getattr(file_obj, 'stream', file_obj)
+        if file_name.endswith('.gz'):
+            file_name = file_name[:-len('.gz')]
+            stream = gzip.GzipFile(fileobj=stream, mode='rb')
+        staged_report = \
+            stage_report_stream(
+                stream=stream,
+                staging_dir=staging_dir,
+                chunk_size=chunk_size)
+        staged_report.update({'file_name': file_name})
+        return staged_report
+    except Exception as e:
+        raise ValueError(
+            f"Failed to stage report upload, error: {e}")
+
+
+def remove_staged_report(file_path: str) -> None:
+    '''
+    A function for removing a staged report file after a failed upload or load,
+    missing files are ignored as the file can be moved to the store already
+
+    :param file_path: Path of the staged file
+    '''
+    try:
+        if file_path is not None and \
+           os.path.exists(file_path):
+            os.remove(file_path)
+    except Exception as e:
+        log.warning(
+            f"Failed to remove staged report {file_path}, error: {e}")
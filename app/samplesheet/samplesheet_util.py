@@ -1,29 +1,213 @@
 import pandas as pd
 import numpy as np
 import os
-import json
 import re
-import tempfile
-from typing import Tuple, Any
+import hashlib
+import logging
+from typing import Tuple, Any, Union, TextIO, Optional
+from io import StringIO
 from datetime import datetime
 from jsonschema import Draft4Validator
 from collections import defaultdict, deque
 from app import db
-from app.models import SampleSheetModel
+from app.models import (
+    SampleSheetModel,
+    SampleSheetVariantModel)
+from app.schema_registry.schema_registry_util import schema_validator_registry
+from app.validation_cache.validation_cache_util import (
+    get_validation_cache_key,
+    get_cached_validation_report,
+    set_cached_validation_report)
 from app.metadata.metadata_util import (
     check_for_projects_in_metadata_db,
     check_sample_and_project_ids_in_metadata_db)
 
+SAMPLESHEET_SCHEMA_JSON = \
+    os.path.join(
+        os.path.dirname(__file__),
+        'samplesheet_validation.json')
+SAMPLESHEET_VARIANT_TYPES = ('ORIGINAL', 'I5_RC', 'V2')
+SINGLE_CELL_INDEX_PATTERN = re.compile(r'^SI-[GNT][ATNS]-[A-Z][0-9]+')
+INDEX_SEQUENCE_PATTERN = re.compile(r'^[ACGTN]*$')
+MAX_PACKED_INDEX_LENGTH = 32                                                    # 2 bits per base in a uint64
+
+_INDEX_BASE_CODE = np.zeros(256, dtype=np.uint64)
+for _base, _code in (('C', 1), ('G', 2), ('T', 3)):
+    _INDEX_BASE_CODE[ord(_base)] = _code
+_INDEX_N_CODE = np.zeros(256, dtype=np.uint64)
+_INDEX_N_CODE[ord('N')] = 3
+_INDEX_SLOT_SHIFT = \
+    np.array(
+        [62 - 2 * i for i in range(MAX_PACKED_INDEX_LENGTH)],
+        dtype=np.uint64)
+_INDEX_LOW_BITS = np.uint64(0x5555555555555555)
+_INDEX_PREFIX_MASK = \
+    np.array(
+        [((1 << (2 * i)) - 1) << (64 - 2 * i) if i > 0 else 0
+         for i in range(MAX_PACKED_INDEX_LENGTH + 1)],
+        dtype=np.uint64)
+
+
+def _pack_index_sequences(
+    index_seqs: list) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+        An internal function for packing index sequences into 2-bit uint64 arrays.
+        Bases are left aligned, so the first base of every index is in the highest bits.
+
+        :param index_seqs: A list of index sequences containing only A, C, G, T or N
+        :returns: Three numpy arrays, packed bases, packed N mask and sequence lengths
+    '''
+    try:
+        index_seqs = [str(i).upper() for i in index_seqs]
+        lengths = np.array([len(i) for i in index_seqs], dtype=np.int64)
+        if len(lengths) > 0 and lengths.max() > MAX_PACKED_INDEX_LENGTH:
+            raise ValueError(
+                f"Index longer than {MAX_PACKED_INDEX_LENGTH} bases")
+        chars = (
+            np.array(index_seqs, dtype=f'S{MAX_PACKED_INDEX_LENGTH}')
+            .view(np.uint8)
+            .reshape(len(index_seqs), MAX_PACKED_INDEX_LENGTH)
+        )
+        packed = np.bitwise_or.reduce(
+            _INDEX_BASE_CODE[chars] << _INDEX_SLOT_SHIFT,
+            axis=1)
+        n_mask = np.bitwise_or.reduce(
+            _INDEX_N_CODE[chars] << _INDEX_SLOT_SHIFT,
+            axis=1)
+        return packed, n_mask, lengths
+    except Exception as e:
+        raise ValueError(
+            f"Failed to pack index sequences, error: {e}")
+
+
+def _get_pairwise_index_distances(
+    packed_index: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    row_index: np.ndarray,
+    col_index: np.ndarray) -> np.ndarray:
+    '''
+        An internal function for calculating Hamming distances between two
+        sets of index sequences. Only the shared prefix of each pair is compared
+        and N matches any base.
+
+        :param packed_index: Packed index sequences from _pack_index_sequences
+        :param row_index: A numpy array of positions in the packed index for the rows
+        :param col_index: A numpy array of positions in the packed index for the columns
+        :returns: A 2D numpy array of mismatch counts
+    '''
+    try:
+        packed, n_mask, lengths = packed_index
+        xor = packed[row_index, None] ^ packed[None, col_index]
+        diff = (xor | (xor >> np.uint64(1))) & _INDEX_LOW_BITS
+        shared_length = \
+            np.minimum(
+                lengths[row_index, None],
+                lengths[None, col_index])
+        diff &= _INDEX_PREFIX_MASK[shared_length]
+        diff &= ~(n_mask[row_index, None] | n_mask[None, col_index])
+        return np.bitwise_count(diff).astype(np.int64)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get pairwise index distances, error: {e}")
+
+def get_override_cycles(
+    read_cycles: list,
+    index1_length: int = 0,
+    index2_length: int = 0
+    ) -> str:
+    '''
+        A function for calculating bcl-convert OverrideCycles for a group of
+        samples with same index lengths, e.g. Y151;I8N2;I8N2;Y151
+
+        :param read_cycles: A list of (read type, cycles) tuples in read order,
+                            read type Y for sequencing reads and I for index reads
+        :param index1_length: Length of the I7 index, default 0
+        :param index2_length: Length of the I5 index, default 0
+        :returns: OverrideCycles string
+    '''
+    try:
+        override_cycles = list()
+        index_lengths = deque([index1_length, index2_length])
+        for read_type, cycles in read_cycles:
+            cycles = int(cycles)
+            if read_type == 'Y':
+                override_cycles.append(f"Y{cycles}")
+            elif read_type == 'I':
+                index_length = \
+                    index_lengths.popleft() if len(index_lengths) > 0 else 0
+                if index_length > cycles:
+                    raise ValueError(
+                        f"Index length {index_length} is more than {cycles} index cycles")
+                elif index_length == 0:
+                    override_cycles.append(f"N{cycles}")
+                elif index_length == cycles:
+                    override_cycles.append(f"I{cycles}")
+                else:
+                    override_cycles.append(
+                        f"I{index_length}N{cycles - index_length}")
+            else:
+                raise ValueError(
+                    f"Unknown read type {read_type}")
+        if any(i > 0 for i in index_lengths):
+            raise ValueError(
+                "Not enough index reads for the index lengths "
+                + f"{index1_length} and {index2_length}")
+        return ';'.join(override_cycles)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get override cycles, error: {e}")
+
+
+def get_read_cycles_from_override_cycles(
+    override_cycles: Optional[str]
+    ) -> Optional[list]:
+    '''
+        A function for getting the run read cycles from an OverrideCycles
+        string, e.g. Y151;I8N2;I8N2;Y151 is [('Y', 151), ('I', 10), ('I', 10), ('Y', 151)].
+        Reads with I cycles, or only N cycles after the first sequencing read,
+        are index reads.
+
+        :param override_cycles: OverrideCycles string
+        :returns: A list of (read type, cycles) tuples, or None if the cycles
+                  are not set or can't be counted, e.g. Y*
+    '''
+    try:
+        if override_cycles is None or \
+           str(override_cycles).strip() == '':
+            return None
+        read_cycles = list()
+        for read in str(override_cycles).strip().split(';'):
+            read = read.strip().upper()
+            if '*' in read:
+                return None
+            segments = \
+                re.findall(r'([YINU])(\d+)', read)
+            if len(segments) == 0 or \
+               ''.join(f"{t}{c}" for t, c in segments) != read:
+                raise ValueError(
+                    f"Unknown read cycles {read}")
+            read_types = set(t for t, _ in segments)
+            cycles = sum(int(c) for _, c in segments)
+            if 'I' in read_types or \
+               (read_types == {'N'} and len(read_cycles) > 0):
+                read_cycles.append(('I', cycles))
+            else:
+                read_cycles.append(('Y', cycles))
+        return read_cycles
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get read cycles from override cycles, error: {e}")
+
+
 class SampleSheet:
     '''
         A class for processing SampleSheet files for Illumina sequencing runs
 
-        :param infile: A samplesheet file
+        :param infile: A samplesheet file path or a file-like object, e.g. io.StringIO
         :param data_header_name: name of the data section, default Data
     '''
 
     def __init__(self,
-        infile: str,
+        infile: Union[str, TextIO],
         data_header_name: tuple = ('Data', 'BCLConvert_Data')):
         self.infile = infile
         self.data_header_name = data_header_name
@@ -39,27 +223,45 @@ class SampleSheet:
 
     def _read_samplesheet(self) -> defaultdict:
         '''
-            Function for reading SampleSheet.csv file
+            Function for reading SampleSheet.csv file or a file-like object
         '''
         try:
             infile = self.infile
+            if hasattr(infile, 'read'):
+                return self._parse_samplesheet_lines(lines=infile)
             if os.path.exists(infile) == False:
                 raise IOError(f'file {infile} not found')
+            with open(infile, 'r') as f:
+                return self._parse_samplesheet_lines(lines=f)
+        except Exception as e:
+            raise ValueError(
+                f"Failed to read samplesheet, error {e}")
+
+    @staticmethod
+    def _parse_samplesheet_lines(lines: Any) -> defaultdict:
+        '''
+            Function for grouping samplesheet lines by section header
+
+            :param lines: An iterable of samplesheet lines, str or bytes
+            :returns: A defaultdict of section name and list of rows
+        '''
+        try:
             sample_data = defaultdict(list)
             header = ''
-            with open(infile, 'r') as f:
-                for i in f:
-                    row = i.rstrip('\n')
-                    if row != '':
-                        if row.startswith('['):
-                            header = (
-                                row
-                                .split(',')[0]
-                                .strip('[')
-                                .strip(']')
-                            )
-                        else:
-                            sample_data[header].append(row)
+            for i in lines:
+                if isinstance(i, bytes):
+                    i = i.decode()
+                row = i.rstrip('\r\n')
+                if row != '':
+                    if row.startswith('['):
+                        header = (
+                            row
+                            .split(',')[0]
+                            .strip('[')
+                            .strip(']')
+                        )
+                    else:
+                        sample_data[header].append(row)
             return sample_data
         except Exception as e:
             raise ValueError(
@@ -158,11 +360,9 @@ class SampleSheet:
                     "Missing I_5 index sequences for "
                     + str(data_series['Sample_ID'])
                 )
-            single_cell_index_pattern = \
-                re.compile(r'^SI-[GNT][ATNS]-[A-Z][0-9]+')
             if (
                 re.search(single_cell_flag_pattern, data_series['Description'])
-                and not re.search(single_cell_index_pattern, data_series['index'])
+                and not re.search(SINGLE_CELL_INDEX_PATTERN, data_series['index'])
             ):
                 err.append(
                     "Required I_7 single cell indexes for 10X sample "
@@ -170,7 +370,7 @@ class SampleSheet:
                 )
             if (
                 not re.search(single_cell_flag_pattern, data_series['Description'])
-                and re.search(single_cell_index_pattern, data_series['index'])
+                and re.search(SINGLE_CELL_INDEX_PATTERN, data_series['index'])
             ):
                 err.append(
                     "Found I_7 single cell indexes, missing 10X description sample "
@@ -178,7 +378,7 @@ class SampleSheet:
                 )
             if (
                 re.search(single_cell_flag_pattern, data_series['Description'])
-                and re.search(single_cell_index_pattern, data_series['index'])
+                and re.search(SINGLE_CELL_INDEX_PATTERN, data_series['index'])
                 and 'index2' in data_series and data_series['index2'] !=''
             ):
                 err.append(
@@ -195,10 +395,80 @@ class SampleSheet:
                     f"Failed to check samplesheet data row, error: {e}")
 
 
+    @staticmethod
+    def _check_samplesheet_data_columns(
+        data: pd.DataFrame,
+        single_cell_flag: str = '10X') -> pd.Series:
+        '''
+            An internal static method for columnar validation of samplesheet data.
+            It applies the same rules as _check_samplesheet_data_row, but
+            evaluates each rule once per column using boolean masks
+
+            :param data: A pandas dataframe, containing the samplesheet data rows
+            :param single_cell_flag: A keyword for single cell sample description, default 10X
+            :returns: A pandas series of error messages, indexed as data, with NAN value for valid rows
+        '''
+        try:
+            if not isinstance(data, pd.DataFrame):
+                raise AttributeError(type(data))
+            data = data.fillna('').astype(str)
+            empty_col = pd.Series('', index=data.index, dtype=object)
+            sample_id = data.get('Sample_ID', empty_col)
+            is_single_cell = (
+                data.get('Description', empty_col)
+                .str.match(
+                    r'^{0}$'.format(single_cell_flag),
+                    case=False))
+            has_single_cell_index = (
+                data.get('index', empty_col)
+                .str.match(SINGLE_CELL_INDEX_PATTERN))
+            has_index2 = (
+                'index2' in data.columns
+                and data['index2'] != ''
+            )
+            missing_index2 = (
+                'index2' not in data.columns
+                or data['index2'] == ''
+            )
+            checks = list()
+            if 'Sample_ID' in data.columns and 'Sample_Name' in data.columns:
+                checks.append((
+                    data['Sample_ID'] == data['Sample_Name'],
+                    "Same sample id and sample names are not allowed"))
+            if 'I5_Index_ID' in data.columns:
+                checks.append((
+                    (data['I5_Index_ID'] != '') & missing_index2,
+                    "Missing I_5 index sequences for "))
+            checks.append((
+                is_single_cell & ~has_single_cell_index,
+                "Required I_7 single cell indexes for 10X sample "))
+            checks.append((
+                ~is_single_cell & has_single_cell_index,
+                "Found I_7 single cell indexes, missing 10X description sample "))
+            checks.append((
+                is_single_cell & has_single_cell_index & has_index2,
+                "Found I_5 index(2) for single cell sample "))
+            err = empty_col
+            for mask, message in checks:
+                mask = empty_col.eq('') & mask                                  # broadcast scalar masks to the data index
+                if not mask.any():
+                    continue
+                new_err = (message + sample_id).where(mask, '')
+                err = err.where(
+                    ~mask,
+                    err.where(err == '', err + '\n') + new_err)
+            return err.where(err != '', np.nan)
+        except Exception as e:
+            raise ValueError(
+                    f"Failed to check samplesheet data columns, error: {e}")
+
+
     def _validate_samplesheet_columns(self, schema_json: str) -> list:
         try:
-            with open(schema_json, 'r') as jp:
-                json_data = json.load(jp)
+            json_data = \
+                schema_validator_registry.get_validator_for_file(
+                    schema_file=schema_json,
+                    validator_class=Draft4Validator).schema
             allowed_samplesheet_fields = \
                 list(json_data['items']['properties'].keys())
             errors = list()
@@ -316,6 +586,100 @@ class SampleSheet:
                 f"Failed to get duplicate entries, error: {e}")
 
 
+    def get_index_collisions(
+        self,
+        mismatches: int = 1,
+        max_mismatches: int = 2,
+        sample_id_col: str = 'Sample_ID',
+        lane_col: str = 'Lane',
+        index_columns: tuple = ("index", "index2"),
+        block_size: int = 1024) -> Tuple[list, dict]:
+        '''
+            A method for finding index pairs within a lane which can't be resolved
+            with the given barcode mismatches. Distances are calculated for each
+            index read on the shared prefix, and a pair is only resolved if at
+            least one of the index reads is more than 2 x mismatches apart.
+            Single cell index names (SI-*) are not checked.
+
+            :param mismatches: Number of allowed barcode mismatches, default 1
+            :param max_mismatches: Max value for the recommended mismatches, default 2
+            :param sample_id_col: Sample id column name, default Sample_ID
+            :param lane_col: Lane column name, default Lane
+            :param index_columns: Index column names, default ("index", "index2")
+            :param block_size: Number of rows compared in each vectorized pass, default 1024
+            :returns: A list of colliding pairs and a dictionary of lane and
+                      recommended mismatches, or None if the lane can't be demultiplexed
+        '''
+        try:
+            df = pd.DataFrame(self._data)
+            df.fillna('', inplace=True)
+            index_lookup_columns = [
+                i for i in index_columns
+                if i in df.columns]
+            if len(index_lookup_columns) == 0:
+                raise ValueError(
+                    "No index lookup column found in samplesheet")
+            for col in index_lookup_columns:
+                df[col] = df[col].astype(str).str.strip().str.upper()
+            df = df[
+                df[index_lookup_columns]
+                .apply(lambda x: x.str.match(INDEX_SEQUENCE_PATTERN))
+                .all(axis=1)]
+            if lane_col not in df.columns:
+                df = df.assign(**{lane_col: 'all'})
+            collisions = list()
+            recommended_mismatches = dict()
+            for lane, l_data in df.groupby(lane_col, sort=True):
+                l_data = l_data.reset_index(drop=True)
+                sample_count = len(l_data.index)
+                packed_indexes = {
+                    col: _pack_index_sequences(index_seqs=l_data[col].tolist())
+                        for col in index_lookup_columns}
+                min_distance = None
+                for start in range(0, sample_count, block_size):
+                    row_index = np.arange(start, min(start + block_size, sample_count))
+                    col_index = np.arange(start + 1, sample_count)
+                    if len(col_index) == 0:
+                        continue
+                    pair_distance = np.zeros((len(row_index), len(col_index)), dtype=np.int64)
+                    for col in index_lookup_columns:
+                        pair_distance = np.maximum(
+                            pair_distance,
+                            _get_pairwise_index_distances(
+                                packed_index=packed_indexes[col],
+                                row_index=row_index,
+                                col_index=col_index))
+                    upper_triangle = col_index[None, :] > row_index[:, None]
+                    if not upper_triangle.any():
+                        continue
+                    block_min = int(pair_distance[upper_triangle].min())
+                    if min_distance is None or block_min < min_distance:
+                        min_distance = block_min
+                    row_pos, col_pos = \
+                        np.nonzero(upper_triangle & (pair_distance <= 2 * mismatches))
+                    for i, j in zip(row_index[row_pos], col_index[col_pos]):
+                        collisions.append({
+                            'lane': lane,
+                            'samples': [
+                                l_data.at[i, sample_id_col],
+                                l_data.at[j, sample_id_col]],
+                            'indexes': [
+                                ", ".join(l_data.loc[i, index_lookup_columns].tolist()),
+                                ", ".join(l_data.loc[j, index_lookup_columns].tolist())],
+                            'distance': int(pair_distance[i - start, j - start - 1])})
+                if min_distance is None:
+                    recommended_mismatches[lane] = max_mismatches
+                elif min_distance == 0:
+                    recommended_mismatches[lane] = None
+                else:
+                    recommended_mismatches[lane] = \
+                        min(max_mismatches, (min_distance - 1) // 2)
+            return collisions, recommended_mismatches
+        except Exception as e:
+            raise ValueError(
+                f"Failed to get index collisions, error: {e}")
+
+
     def get_samplesheet_with_reverse_complement_index(
             self,
             index_field: str = 'index2') \
@@ -359,11 +723,24 @@ class SampleSheet:
 
     def get_v2_samplesheet_data(
         self,
-        allowed_columns: tuple = ('Sample_ID', 'index', 'index2', 'Sample_Project')) -> str:
+        allowed_columns: tuple = ('Sample_ID', 'index', 'index2', 'Sample_Project'),
+        data: Optional[list] = None,
+        override_cycles: Optional[str] = None,
+        add_override_cycles: bool = True) -> str:
         '''
         Convert V1 to V2 samplesheet
+
+        :param allowed_columns: Data columns for the V2 samplesheet
+        :param data: An optional subset of the samplesheet data rows, default all the rows
+        :param override_cycles: An optional OverrideCycles value, default a template value
+        :param add_override_cycles: Add the OverrideCycles setting, default True
         '''
         try:
+            if data is None:
+                data = self._data
+            if override_cycles is None:
+                override_cycles = "Y_READ1_;I_INDEX1_;I_INDEX2_;Y_READ2_"
+
             final_v2_samplesheet = list()
             for key, val in self._header_data.items():
                 if (
@@ -384,17 +761,18 @@ class SampleSheet:
                 "CreateFastqForIndexReads,1",
                 "MinimumTrimmedReadLength,8",
                 "FastqCompressionFormat,gzip",
-                "MaskShortReads,8",
-                "OverrideCycles,Y_READ1_;I_INDEX1_;I_INDEX2_;Y_READ2_",
-                ","
-            ]
+                "MaskShortReads,8"]
+            if add_override_cycles:
+                val.append(
+                    f"OverrideCycles,{override_cycles}")
+            val.append(",")
             final_v2_samplesheet.append(
                 f'[{key}]')
             final_v2_samplesheet.extend(val)
             final_v2_samplesheet.append(
                 '[BCLConvert_Data]')
             samplesheet_df = pd.DataFrame(
-                self._data,
+                data,
                 columns=self._data_header)
             target_columns = [
                 c for c in self._data_header
@@ -411,11 +789,92 @@ class SampleSheet:
                 f"Failed to convert V1 to V2 samplesheet, error: {e}")
 
 
+    def get_split_samplesheets(
+        self,
+        read_cycles: Optional[list] = None,
+        lane_col: str = 'Lane',
+        index_columns: tuple = ("index", "index2"),
+        allowed_columns: tuple = ('Lane', 'Sample_ID', 'index', 'index2', 'Sample_Project')
+        ) -> list:
+        '''
+            A method for splitting the samplesheet by lane and index lengths, so the
+            groups can be demultiplexed in parallel. Each group is converted to a V2
+            samplesheet with its own OverrideCycles. Single cell index names (SI-*)
+            are grouped separately per lane, and their samplesheets don't have the
+            OverrideCycles setting, bcl-convert uses the run cycles for them.
+            Without the run read cycles, none of the samplesheets get OverrideCycles,
+            as the index cycles of the run can't be known from the samplesheet.
+
+            :param read_cycles: A list of (read type, cycles) tuples for the run, e.g.
+                                [('Y', 151), ('I', 10), ('I', 10), ('Y', 151)], default
+                                None for samplesheets without OverrideCycles
+            :param lane_col: Lane column name, default Lane
+            :param index_columns: I7 and I5 index column names, default ("index", "index2")
+            :param allowed_columns: Data columns for the V2 samplesheets
+            :returns: A list of dictionaries with lane, index1_length, index2_length,
+                      override_cycles, sample_count and csv_data, sorted by lane and
+                      index lengths
+        '''
+        try:
+            df = pd.DataFrame(self._data, columns=self._data_header)
+            df.fillna('', inplace=True)
+            index1_col, index2_col = index_columns
+            index_lengths = dict()
+            for col in index_columns:
+                if col in df.columns:
+                    index_lengths[col] = \
+                        df[col].astype(str).str.strip().str.len()
+                else:
+                    index_lengths[col] = \
+                        pd.Series(0, index=df.index)
+            is_single_cell = (
+                df[index1_col].astype(str).str.strip()
+                .str.match(SINGLE_CELL_INDEX_PATTERN)
+                if index1_col in df.columns
+                else pd.Series(False, index=df.index)
+            )
+            group_df = pd.DataFrame({
+                'lane': df[lane_col].astype(str).str.strip() if lane_col in df.columns else '',
+                'single_cell': is_single_cell,
+                'index1_length': index_lengths[index1_col].where(~is_single_cell, 0),
+                'index2_length': index_lengths[index2_col].where(~is_single_cell, 0)})
+            if lane_col not in df.columns:
+                allowed_columns = [
+                    c for c in allowed_columns if c != lane_col]
+            split_samplesheets = list()
+            for (lane, single_cell, index1_length, index2_length), g_data in \
+                group_df.groupby(
+                    ['lane', 'single_cell', 'index1_length', 'index2_length'],
+                    sort=True):
+                data = [self._data[i] for i in g_data.index]
+                override_cycles = None
+                if not single_cell and \
+                   read_cycles is not None:
+                    override_cycles = \
+                        get_override_cycles(
+                            read_cycles=read_cycles,
+                            index1_length=int(index1_length),
+                            index2_length=int(index2_length))
+                split_samplesheets.append({
+                    'lane': lane if lane != '' else None,
+                    'index1_length': None if single_cell else int(index1_length),
+                    'index2_length': None if single_cell else int(index2_length),
+                    'override_cycles': override_cycles,
+                    'sample_count': len(data),
+                    'csv_data': self.get_v2_samplesheet_data(
+                        allowed_columns=allowed_columns,
+                        data=data,
+                        override_cycles=override_cycles,
+                        add_override_cycles=override_cycles is not None)})
+            return split_samplesheets
+        except Exception as e:
+            raise ValueError(
+                f"Failed to split samplesheet, error: {e}")
+
+
     def validate_samplesheet_data(
         self,
-        schema_json: str = os.path.join(
-            os.path.dirname(__file__),
-            'samplesheet_validation.json')
+        schema_json: str = SAMPLESHEET_SCHEMA_JSON
         ) -> list:
         '''
             A method for validation of samplesheet data
@@ -426,47 +885,26 @@ class SampleSheet:
         try:
             data = self._data
             data = pd.DataFrame(data)                                           # read data as pandas dataframe
-            data = data.fillna("").applymap(lambda x: str(x))                   # replace nan with empty strings and convert all entries to string
-            json_data = data.to_dict(orient='records')                          # convert dataframe to list of dictionaries
-            error_list = list()                                                 # define empty error list
+            data = data.fillna("").astype(str)                                  # replace nan with empty strings and convert all entries to string
             if not os.path.exists(schema_json):
                 raise IOError(
                     f'json schema file {schema_json} not found')
-            with open(schema_json,'r') as jf:
-                schema = json.load(jf)                                          # read schema from the json file
             # syntactic validation
-            v_s = Draft4Validator(schema)                                       # initiate validator using schema
-            error_list = \
-                sorted(
-                    v_s.iter_errors(json_data),
-                    key=lambda e: e.path)                                       # overwrite error_list with validation error
-            temp_error_list = list()
-            for err in error_list:
-                if isinstance(err, str):
-                    temp_error_list.append(err)
-                else:
-                    if len(err.schema_path) > 2:
-                        temp_error_list.append(
-                            str(err.schema_path[2])
-                            + ": "
-                            + err.message)
-                    else:
-                        temp_error_list.append(
-                            err.message)
-            error_list = temp_error_list
+            v_s = \
+                schema_validator_registry.get_validator_for_file(
+                    schema_file=schema_json,
+                    validator_class=Draft4Validator,
+                    compiled=True)                                              # compiled column-wise validator, reloaded if the schema file changes
+            error_list = v_s.validate_dataframe(data)
             # semantic validation
             column_errors = self._validate_samplesheet_columns(
                 schema_json=schema_json)
             if len(column_errors) > 0:
                 error_list.extend(column_errors)
             else:
-                other_errors = data.apply(
-                    lambda x: (
-                        self._check_samplesheet_data_row(
-                            data_series=x)
-                        ),
-                    axis=1
-                )
+                other_errors = \
+                    self._check_samplesheet_data_columns(
+                        data=data)
                 other_errors.dropna(inplace=True)
                 # add other errors to the list
                 if len(other_errors) > 0:
@@ -482,6 +920,208 @@ class SampleSheet:
                 f"Failed to validate samplesheet. Error: {e}")
 
 
+def build_samplesheet_variants(
+    csv_data: Union[str, bytes]
+    ) -> dict:
+    '''
+        Build the pipeline variants of a samplesheet, i.e. the original csv,
+        csv with reverse complemented I5 index and the V2 samplesheet
+
+        :param csv_data: Samplesheet csv data
+        :returns: A dictionary of variant type and a dictionary with
+                  csv_data and content_hash (sha256 of the csv data)
+    '''
+    try:
+        if isinstance(csv_data, bytes):
+            csv_data = csv_data.decode()
+        sa = SampleSheet(infile=StringIO(csv_data))
+        variants = {
+            'ORIGINAL': csv_data,
+            'I5_RC': sa.get_samplesheet_with_reverse_complement_index(
+                index_field='index2'),
+            'V2': sa.get_v2_samplesheet_data()}
+        return {
+            variant_type: {
+                'csv_data': variant_csv_data,
+                'content_hash': hashlib.sha256(
+                    variant_csv_data.encode('utf-8')).hexdigest()}
+                for variant_type, variant_csv_data in variants.items()}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to build samplesheet variants, error: {e}")
+
+
+def _update_samplesheet_variants_in_session(
+    samplesheet_csv_data: dict
+    ) -> None:
+    '''
+        An internal function for replacing the stored variants of samplesheets,
+        without commit
+
+        :param samplesheet_csv_data: A dictionary of samplesheet id and csv data,
+                                     csv data None for removing the variants
+    '''
+    if len(samplesheet_csv_data) == 0:
+        return None
+    (
+        db.session
+        .query(SampleSheetVariantModel)
+        .filter(
+            SampleSheetVariantModel.samplesheet_id.in_(
+                list(samplesheet_csv_data.keys())))
+        .delete(synchronize_session=False)
+    )
+    for samplesheet_id, csv_data in samplesheet_csv_data.items():
+        if csv_data is None:
+            continue
+        try:
+            variants = build_samplesheet_variants(csv_data)
+        except Exception as e:
+            logging.warning(
+                f"Skipping variants for samplesheet {samplesheet_id}, error: {e}")
+            continue
+        for variant_type, variant in variants.items():
+            db.session.add(
+                SampleSheetVariantModel(
+                    samplesheet_id=samplesheet_id,
+                    variant_type=variant_type,
+                    csv_data=variant.get('csv_data'),
+                    content_hash=variant.get('content_hash')))
+    db.session.flush()
+
+
+def update_samplesheet_variants_in_db(
+    samplesheet_id: int
+    ) -> None:
+    '''
+        Rebuild the stored variants of a validated samplesheet
+
+        :param samplesheet_id: Samplesheet id
+    '''
+    try:
+        csv_data = (
+            db.session
+            .query(SampleSheetModel.csv_data)
+            .filter(SampleSheetModel.samplesheet_id==samplesheet_id)
+            .filter(SampleSheetModel.status=='PASS')
+            .scalar()
+        )
+        try:
+            _update_samplesheet_variants_in_session(
+                {samplesheet_id: csv_data})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise ValueError(
+                f"Failed db update for {samplesheet_id}, error: {e}")
+    except Exception as e:
+        raise ValueError(
+            f"Failed to update samplesheet variants, error: {e}")
+
+
+def fetch_samplesheet_variant_hash(
+    samplesheet_id: int,
+    variant_type: str = 'ORIGINAL'
+    ) -> Optional[Tuple[int, str]]:
+    '''
+        Fetch the id and content hash of a stored variant of a validated
+        samplesheet, without reading the csv data
+
+        :param samplesheet_id: Samplesheet id
+        :param variant_type: Variant type, ORIGINAL, I5_RC or V2
+        :returns: None if not found, or a tuple of variant id and content hash
+    '''
+    try:
+        if variant_type not in SAMPLESHEET_VARIANT_TYPES:
+            raise ValueError(
+                f"Unknown samplesheet variant {variant_type}")
+        result = (
+            db.session
+            .query(
+                SampleSheetVariantModel.samplesheet_variant_id,
+                SampleSheetVariantModel.content_hash
+            )
+            .join(
+                SampleSheetModel,
+                SampleSheetModel.samplesheet_id==SampleSheetVariantModel.samplesheet_id
+            )
+            .filter(SampleSheetVariantModel.samplesheet_id==samplesheet_id)
+            .filter(SampleSheetVariantModel.variant_type==variant_type)
+            .filter(SampleSheetModel.status=='PASS')
+            .filter(
+                SampleSheetModel.validation_time >= SampleSheetModel.update_time
+            )
+            .one_or_none()
+        )
+        if result is None:
+            return None
+        return tuple(result)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to fetch samplesheet variant hash, error: {e}")
+
+
+def fetch_samplesheet_variant_data(
+    samplesheet_variant_id: int
+    ) -> Optional[str]:
+    '''
+        Fetch the csv data of a stored samplesheet variant
+
+        :param samplesheet_variant_id: Samplesheet variant id
+        :returns: Csv data or None if not found
+    '''
+    try:
+        csv_data = (
+            db.session
+            .query(SampleSheetVariantModel.csv_data)
+            .filter(
+                SampleSheetVariantModel.samplesheet_variant_id==samplesheet_variant_id)
+            .scalar()
+        )
+        if isinstance(csv_data, bytes):
+            csv_data = csv_data.decode()
+        return csv_data
+    except Exception as e:
+        raise ValueError(
+            f"Failed to fetch samplesheet variant data, error: {e}")
+
+
+def get_samplesheet_variant_csv_data(
+    samplesheet_id: int,
+    variant_type: str = 'ORIGINAL'
+    ) -> Optional[str]:
+    '''
+        Get csv data for a variant of a validated samplesheet, the variants
+        missing in db (e.g. validated before the variants were added) are
+        built and stored
+
+        :param samplesheet_id: Samplesheet id
+        :param variant_type: Variant type, ORIGINAL, I5_RC or V2
+        :returns: Csv data or None if the samplesheet is not validated
+    '''
+    try:
+        result = \
+            fetch_samplesheet_variant_hash(
+                samplesheet_id=samplesheet_id,
+                variant_type=variant_type)
+        if result is None:
+            update_samplesheet_variants_in_db(
+                samplesheet_id=samplesheet_id)
+            result = \
+                fetch_samplesheet_variant_hash(
+                    samplesheet_id=samplesheet_id,
+                    variant_type=variant_type)
+        if result is None:
+            return None
+        (samplesheet_variant_id, _) = result
+        return \
+            fetch_samplesheet_variant_data(
+                samplesheet_variant_id=samplesheet_variant_id)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get samplesheet variant, error: {e}")
+
+
 def update_samplesheet_validation_entry_in_db(
     samplesheet_tag: str,
     report: str,
@@ -501,11 +1141,12 @@ def update_samplesheet_validation_entry_in_db(
             status = 'PASS'
         else:
             status='FAILED'
+        validation_time = datetime.now()
         samplesheeet_data = {
             'status': status,
             'report': report,
-            'validation_time': datetime.now(),
-            'update_time': datetime.now()}
+            'validation_time': validation_time,
+            'update_time': validation_time}
         try:
             (
                 db.session
@@ -513,6 +1154,8 @@ def update_samplesheet_validation_entry_in_db(
                 .filter(SampleSheetModel.samplesheet_tag==samplesheet_tag)
                 .update(samplesheeet_data)
             )
+            _update_samplesheet_variants_in_session({
+                entry.samplesheet_id: entry.csv_data if status == 'PASS' else None})
             db.session.commit()
         except Exception as e:
             db.session.rollback()
@@ -523,10 +1166,84 @@ def update_samplesheet_validation_entry_in_db(
             f"Failed to update samplesheet validation status, error: {e}")
 
 
-def validate_samplesheet_data_and_update_db(
-    samplesheet_id: str,
-    check_metadata: bool = True
-    ) -> Any:
+def update_samplesheet_validation_entries_in_db(
+    report_list: list
+    ) -> dict:
+    '''
+        Update validation status and report for a list of samplesheets
+        in a single transaction, and rebuild the pipeline variants of the
+        samplesheets with pass status
+
+        :param report_list: A list of dictionaries with samplesheet_id, status and report
+        :returns: A dictionary of samplesheet_id and updated status
+    '''
+    try:
+        mappings = list()
+        results = dict()
+        validation_time = datetime.now()
+        for entry in report_list:
+            if entry is None or \
+               entry.get('samplesheet_id') is None or \
+               entry.get('status') is None:
+                continue
+            status = 'PASS' if entry.get('status') == 'pass' else 'FAILED'
+            mappings.append({
+                'samplesheet_id': entry.get('samplesheet_id'),
+                'status': status,
+                'report': entry.get('report', ''),
+                'validation_time': validation_time,
+                'update_time': validation_time})
+            results[entry.get('samplesheet_id')] = entry.get('status')
+        if len(mappings) > 0:
+            try:
+                db.session.bulk_update_mappings(
+                    SampleSheetModel,
+                    mappings)
+                pass_ids = [
+                    m.get('samplesheet_id') for m in mappings
+                        if m.get('status') == 'PASS']
+                samplesheet_csv_data = {
+                    m.get('samplesheet_id'): None for m in mappings}
+                if len(pass_ids) > 0:
+                    samplesheet_csv_data.update(
+                        dict(
+                            db.session
+                            .query(
+                                SampleSheetModel.samplesheet_id,
+                                SampleSheetModel.csv_data)
+                            .filter(SampleSheetModel.samplesheet_id.in_(pass_ids))
+                            .all()))
+                _update_samplesheet_variants_in_session(
+                    samplesheet_csv_data)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                raise ValueError(
+                    f"Failed bulk db update, error: {e}")
+        return results
+    except Exception as e:
+        raise ValueError(
+            f"Failed to update samplesheet validation entries, error: {e}")
+
+
+def get_samplesheet_validation_report(
+    samplesheet_id: int,
+    check_metadata: bool = True,
+    use_cache: bool = True
+    ) -> Optional[dict]:
+    '''
+        Validate a samplesheet without updating the db
+
+        Reports are cached by the normalized csv content hash, the schema file
+        stamp and the igfdb reference stamp, so the same csv uploaded with a new
+        samplesheet tag is not validated again
+
+        :param samplesheet_id: Samplesheet id
+        :param check_metadata: Check samples and projects in metadata db, default True
+        :param use_cache: Use the validation cache, default True
+        :returns: None if the samplesheet is missing, or a dictionary with
+                  samplesheet_id, samplesheet_tag, status (pass or failed) and report
+    '''
     try:
         entry = (
             db.session
@@ -534,54 +1251,93 @@ def validate_samplesheet_data_and_update_db(
             .filter(SampleSheetModel.samplesheet_id==samplesheet_id)
             .one_or_none()
         )
-        if entry is not None:
-            csv_data = entry.csv_data
-            with tempfile.TemporaryDirectory() as temp_dir:
-                csv_file = os.path.join(temp_dir, 'SampleSheet.csv')
-                with open(csv_file, 'w') as fp:
-                    fp.write(csv_data)
-                sa = SampleSheet(infile=csv_file)
-                errors = sa.validate_samplesheet_data()
-                if check_metadata:
-                    metadata_errors = compare_sample_with_metadata_db(
-                        samplesheet_file=csv_file)
-                    if len(metadata_errors) > 0:
-                        errors.extend(metadata_errors)
-                if len(errors) > 0:
-                    formatted_errors = list()
-                    for index, err_str in enumerate(errors):
-                        formatted_errors.append(
-                            str(index + 1)
-                            + ". "
-                            + str(err_str)
-                        )
-                    update_samplesheet_validation_entry_in_db(
-                        samplesheet_tag=entry.samplesheet_tag,
-                        report='\n'.join(formatted_errors),
-                        status='failed')
-                    return 'failed'
-                else:
-                    update_samplesheet_validation_entry_in_db(
-                        samplesheet_tag=entry.samplesheet_tag,
-                        report='',
-                        status='pass')
-                    return 'pass'
-        else:
+        if entry is None:
             return None
+        csv_data = entry.csv_data
+        if isinstance(csv_data, bytes):
+            csv_data = csv_data.decode()
+        cache_key = None
+        if use_cache:
+            cache_key = \
+                get_validation_cache_key(
+                    kind='samplesheet',
+                    csv_data=csv_data,
+                    schema_file=SAMPLESHEET_SCHEMA_JSON,
+                    check_db=check_metadata)
+            cached_report = \
+                get_cached_validation_report(cache_key)
+            if cached_report is not None:
+                return {
+                    'samplesheet_id': entry.samplesheet_id,
+                    'samplesheet_tag': entry.samplesheet_tag,
+                    'status': cached_report.get('status'),
+                    'report': cached_report.get('report')}
+        sa = SampleSheet(infile=StringIO(csv_data))                              # parse once, shared by all the checks
+        errors = sa.validate_samplesheet_data()
+        if check_metadata:
+            metadata_errors = compare_sample_with_metadata_db(
+                samplesheet=sa)
+            if len(metadata_errors) > 0:
+                errors.extend(metadata_errors)
+        formatted_errors = list()
+        for index, err_str in enumerate(errors):
+            formatted_errors.append(
+                str(index + 1)
+                + ". "
+                + str(err_str)
+            )
+        status = 'failed' if len(errors) > 0 else 'pass'
+        report = '\n'.join(formatted_errors)
+        if cache_key is not None:
+            set_cached_validation_report(
+                cache_key=cache_key,
+                status=status,
+                report=report)
+        return {
+            'samplesheet_id': entry.samplesheet_id,
+            'samplesheet_tag': entry.samplesheet_tag,
+            'status': status,
+            'report': report}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get samplesheet validation report, error: {e}")
+
+
+def validate_samplesheet_data_and_update_db(
+    samplesheet_id: str,
+    check_metadata: bool = True
+    ) -> Any:
+    try:
+        validation_report = \
+            get_samplesheet_validation_report(
+                samplesheet_id=samplesheet_id,
+                check_metadata=check_metadata)
+        if validation_report is None:
+            return None
+        update_samplesheet_validation_entry_in_db(
+            samplesheet_tag=validation_report.get('samplesheet_tag'),
+            report=validation_report.get('report'),
+            status=validation_report.get('status'))
+        return validation_report.get('status')
     except Exception as e:
         raise ValueError(
             f"Failed samplesheet validation wrapper, error: {e}")
 
 
 def compare_sample_with_metadata_db(
-    samplesheet_file: str,
+    samplesheet_file: Optional[str] = None,
     project_column: str = 'Sample_Project',
-    sample_column: str = 'Sample_ID'
+    sample_column: str = 'Sample_ID',
+    samplesheet: Optional[SampleSheet] = None
     ) -> list:
     try:
         errors = list()
-        sa = SampleSheet(infile=samplesheet_file)
-        df = pd.DataFrame(sa._data)
+        if samplesheet is None:
+            if samplesheet_file is None:
+                raise ValueError(
+                    "Missing samplesheet_file or samplesheet")
+            samplesheet = SampleSheet(infile=samplesheet_file)
+        df = pd.DataFrame(samplesheet._data)
         project_list = (
             df[project_column]
             .drop_duplicates()
@@ -1,13 +1,20 @@
-import logging, tempfile, os
+import logging
 from app.samplesheet.samplesheet_util import SampleSheet
 from flask_appbuilder.models.sqla.interface import SQLAInterface
-from flask import redirect, flash, url_for, send_file
-from flask_appbuilder import ModelView
+from flask import redirect, flash, url_for, send_file, jsonify
+from flask_appbuilder import ModelView, expose
+from flask_appbuilder.security.decorators import has_access
+from celery import chord
+from celery.result import AsyncResult
 from . import celery
-from io import BytesIO
+from io import BytesIO, StringIO
 from flask_appbuilder.actions import action
 from .models import SampleSheetModel
-from .samplesheet.samplesheet_util import validate_samplesheet_data_and_update_db
+from .samplesheet.samplesheet_util import (
+    validate_samplesheet_data_and_update_db,
+    get_samplesheet_validation_report,
+    get_samplesheet_variant_csv_data,
+    update_samplesheet_validation_entries_in_db)
 
 
 @celery.task(bind=True)
@@ -26,6 +33,57 @@ def async_validate_samplesheet(self, id_list):
                     format(e))
 
 
+@celery.task(bind=True)
+def async_get_samplesheet_validation_report(self, samplesheet_id):
+    try:
+        return \
+            get_samplesheet_validation_report(
+                samplesheet_id=samplesheet_id)
+    except Exception as e:
+        logging.error(
+            f"Failed to validate samplesheet {samplesheet_id}, error: {e}")
+        return {
+            'samplesheet_id': samplesheet_id,
+            'status': None,
+            'error': str(e)}
+
+
+@celery.task(bind=True)
+def async_update_samplesheet_validation_reports(self, report_list):
+    try:
+        results = \
+            update_samplesheet_validation_entries_in_db(
+                report_list=report_list)
+        for entry in report_list:
+            if entry is not None and \
+               entry.get('samplesheet_id') not in results:
+                results[entry.get('samplesheet_id')] = entry.get('status')
+        return results
+    except Exception as e:
+        logging.error(
+            f"Failed to update samplesheet validation reports, error: {e}")
+        raise                                                                   # task state is FAILURE, not a null result
+
+
+def submit_samplesheet_validation_jobs(id_list: list) -> AsyncResult:
+    '''
+        Validate samplesheets in parallel and update the db in a single
+        transaction after all the validation jobs are finished
+
+        :param id_list: A list of samplesheet ids
+        :returns: AsyncResult of the db update job, with a dictionary
+                  of samplesheet id and status (pass, failed or None) as result
+    '''
+    try:
+        return chord(
+            async_get_samplesheet_validation_report.s(samplesheet_id)
+            for samplesheet_id in id_list)(
+                async_update_samplesheet_validation_reports.s())
+    except Exception as e:
+        raise ValueError(
+            f"Failed to submit samplesheet validation jobs, error: {e}")
+
+
 class SampleSheetView(ModelView):
     datamodel = SQLAInterface(SampleSheetModel)
     label_columns = {
@@ -50,9 +108,24 @@ class SampleSheetView(ModelView):
         "can_list",
         "can_show",
         "can_add",
-        "can_edit"]
+        "can_edit",
+        "can_validation_status"]
     base_order = ("samplesheet_id", "desc")
 
+    @expose('/validation_status/<string:task_id>')
+    @has_access
+    def validation_status(self, task_id):
+        result = AsyncResult(task_id, app=celery)
+        response = {
+            'task_id': task_id,
+            'state': result.state,
+            'results': None}
+        if result.successful():
+            response['results'] = result.result
+        elif result.failed():
+            response['error'] = str(result.result)
+        return jsonify(response)
+
     @action("download_samplesheet", "Download samplesheet", confirmation=None, icon="fa-file-excel-o", multiple=False, single=True)
     def download_samplesheet(self, item):
         try:
@@ -73,15 +146,15 @@ class SampleSheetView(ModelView):
             if item.status != 'PASS':
                 flash('Samplesheet is not validated', 'danger')
                 raise
-            csv_data = item.csv_data
-            if isinstance(csv_data, bytes):
-                csv_data = csv_data.decode()
-            i5_rc_csv_data = ''
-            with tempfile.TemporaryDirectory() as temp_dir:
-                csv_file = os.path.join(temp_dir, 'SampleSheet.csv')
-                with open(csv_file, 'w') as fp:
-                    fp.write(csv_data)
-                sa = SampleSheet(infile=csv_file)
+            i5_rc_csv_data = \
+                get_samplesheet_variant_csv_data(
+                    samplesheet_id=item.samplesheet_id,
+                    variant_type='I5_RC')
+            if i5_rc_csv_data is None:
+                csv_data = item.csv_data
+                if isinstance(csv_data, bytes):
+                    csv_data = csv_data.decode()
+                sa = SampleSheet(infile=StringIO(csv_data))
                 i5_rc_csv_data = \
                     sa.get_samplesheet_with_reverse_complement_index(index_field='index2')
             output = BytesIO(i5_rc_csv_data.encode())
@@ -102,14 +175,15 @@ class SampleSheetView(ModelView):
             if item.status != 'PASS':
                 flash('Samplesheet is not validated', 'danger')
                 raise
-            csv_data = item.csv_data
-            if isinstance(csv_data, bytes):
-                csv_data = csv_data.decode()
-            with tempfile.TemporaryDirectory() as temp_dir:
-                csv_file = os.path.join(temp_dir, 'SampleSheet.csv')
-                with open(csv_file, 'w') as fp:
-                    fp.write(csv_data)
-                sa = SampleSheet(infile=csv_file)
+            v2_csv_data = \
+                get_samplesheet_variant_csv_data(
+                    samplesheet_id=item.samplesheet_id,
+                    variant_type='V2')
+            if v2_csv_data is None:
+                csv_data = item.csv_data
+                if isinstance(csv_data, bytes):
+                    csv_data = csv_data.decode()
+                sa = SampleSheet(infile=StringIO(csv_data))
                 v2_csv_data = sa.get_v2_samplesheet_data()
             output = BytesIO(v2_csv_data.encode())
             samplesheet_tag = item.samplesheet_tag.encode()
@@ -133,10 +207,13 @@ class SampleSheetView(ModelView):
             else:
                 id_list = [item.samplesheet_id]
                 tag_list = [item.samplesheet_tag]
-            _ = \
-                async_validate_samplesheet.\
-                    apply_async(args=[id_list])
-            flash("Submitted jobs for {0}".format(', '.join(tag_list)), "info")
+            result = \
+                submit_samplesheet_validation_jobs(id_list=id_list)
+            flash(
+                "Submitted jobs for {0}, status: {1}".format(
+                    ', '.join(tag_list),
+                    url_for('SampleSheetView.validation_status', task_id=result.id)),
+                "info")
             self.update_redirect()
             return redirect(self.get_redirect())
         except:
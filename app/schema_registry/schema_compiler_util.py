@@ -0,0 +1,327 @@
+import re
+import logging
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Optional
+
+log = logging.getLogger(__name__)
+
+## keywords checked by the compiled validators, others fall back to jsonschema
+ARRAY_KEYWORDS = ('type', 'minItems', 'maxItems', 'uniqueItems', 'items')
+ROW_KEYWORDS = ('type', 'properties', 'required')
+COLUMN_KEYWORDS = ('type', 'enum', 'pattern', 'minLength', 'maxLength')
+
+
+def format_validation_errors(errors: Any) -> list:
+    '''
+        A function for formatting jsonschema errors as "property: message" strings
+
+        :param errors: An iterable of jsonschema ValidationError objects or strings
+        :returns: A list of error strings, sorted by the error path
+    '''
+    try:
+        error_list = list()
+        for err in sorted(errors, key=lambda e: e.path):
+            if isinstance(err, str):
+                error_list.append(err)
+            else:
+                if len(err.schema_path) > 2:
+                    error_list.append(
+                        str(err.schema_path[2])
+                        + ": "
+                        + err.message)
+                else:
+                    error_list.append(
+                        err.message)
+        return error_list
+    except Exception as e:
+        raise ValueError(
+            f"Failed to format validation errors, error: {e}")
+
+
+def _json_equal(one: Any, two: Any) -> bool:
+    '''
+        An internal function for comparing scalar values as JSON values,
+        booleans are not equal to numbers
+    '''
+    if isinstance(one, str) or isinstance(two, str):
+        return one == two
+    if isinstance(one, bool) != isinstance(two, bool):
+        return False
+    return one == two
+
+
+class CompiledSchemaValidator:
+    '''
+        A class for validating tabular data against a JSON schema of type array of
+        objects, e.g. samplesheet_validation.json or metadata_validation.json
+
+        The schema is compiled once into a list of column check functions, which run
+        on the whole pandas dataframe column instead of each row dictionary. Error
+        messages and ordering are same as jsonschema iter_errors, sorted by the error
+        path and formatted by format_validation_errors. If the schema uses any keyword
+        which is not supported here, the jsonschema validator is used as fallback.
+
+        :param validator: A jsonschema validator object, e.g. Draft4Validator(schema)
+    '''
+    def __init__(self, validator: Any):
+        self.validator = validator
+        self.schema = validator.schema
+        self._type_checker = validator.TYPE_CHECKER
+        self._array_checks = list()
+        self._row_checks = list()
+        self._column_checks = dict()
+        self.fallback_reason = self._compile()
+        if self.fallback_reason is not None:
+            log.debug(
+                f"Using jsonschema for validation, reason: {self.fallback_reason}")
+
+    @property
+    def is_compiled(self) -> bool:
+        return self.fallback_reason is None
+
+    def _get_unsupported_keyword(
+        self,
+        schema: dict,
+        supported_keywords: tuple) -> Optional[str]:
+        for keyword in schema:
+            if keyword in self.validator.VALIDATORS and \
+               keyword not in supported_keywords:
+                return keyword
+        return None
+
+    def _compile(self) -> Optional[str]:
+        '''
+            An internal method for compiling the schema into check functions
+
+            :returns: None if the schema is compiled, or the reason for fallback
+        '''
+        schema = self.schema
+        if not isinstance(schema, dict) or \
+           schema.get('type') != 'array' or \
+           not isinstance(schema.get('items'), dict) or \
+           schema['items'].get('type') != 'object':
+            return 'schema is not an array of objects'
+        items = schema['items']
+        unsupported = \
+            self._get_unsupported_keyword(schema, ARRAY_KEYWORDS)
+        if unsupported is not None:
+            return f'unsupported keyword {unsupported}'
+        unsupported = \
+            self._get_unsupported_keyword(items, ROW_KEYWORDS)
+        if unsupported is not None:
+            return f'unsupported keyword items.{unsupported}'
+        for keyword, value in schema.items():
+            if keyword == 'minItems':
+                self._array_checks.append(
+                    self._compile_min_items(value))
+            elif keyword == 'maxItems':
+                self._array_checks.append(
+                    self._compile_max_items(value))
+            elif keyword == 'uniqueItems' and value:
+                self._array_checks.append(
+                    self._compile_unique_items())
+        for keyword, value in items.items():
+            if keyword == 'required':
+                self._row_checks.append(
+                    self._compile_required(value))
+        for property_name, subschema in items.get('properties', {}).items():
+            if not isinstance(subschema, dict):
+                return f'unsupported schema for property {property_name}'
+            unsupported = \
+                self._get_unsupported_keyword(subschema, COLUMN_KEYWORDS)
+            if unsupported is not None:
+                return f'unsupported keyword {unsupported} for property {property_name}'
+            checks = list()
+            for keyword, value in subschema.items():
+                if keyword == 'type':
+                    checks.append(self._compile_type(value))
+                elif keyword == 'enum':
+                    checks.append(self._compile_enum(value))
+                elif keyword == 'pattern':
+                    checks.append(self._compile_pattern(value))
+                elif keyword == 'minLength':
+                    checks.append(self._compile_min_length(value))
+                elif keyword == 'maxLength':
+                    checks.append(self._compile_max_length(value))
+            self._column_checks[property_name] = checks
+        return None
+
+    @staticmethod
+    def _compile_min_items(min_items: int) -> Callable:
+        message = "should be non-empty" if min_items == 1 else "is too short"
+        def check(data, records):
+            if len(data.index) < min_items:
+                return f"{records()!r} {message}"
+        return check
+
+    @staticmethod
+    def _compile_max_items(max_items: int) -> Callable:
+        message = "is expected to be empty" if max_items == 0 else "is too long"
+        def check(data, records):
+            if len(data.index) > max_items:
+                return f"{records()!r} {message}"
+        return check
+
+    @staticmethod
+    def _compile_unique_items() -> Callable:
+        def check(data, records):
+            if data.duplicated().any():
+                return f"{records()!r} has non-unique elements"
+        return check
+
+    @staticmethod
+    def _compile_required(required: list) -> Callable:
+        def check(data):
+            return [
+                f"{property_name!r} is a required property"
+                for property_name in required
+                if property_name not in data.columns]
+        return check
+
+    def _compile_type(self, types: Any) -> Callable:
+        if isinstance(types, str):
+            types = [types]
+        reprs = ", ".join(repr(t) for t in types)
+        is_type = self._type_checker.is_type
+        def check(column, is_str_column):
+            if is_str_column:
+                if 'string' in types:
+                    return np.zeros(len(column), dtype=bool), None
+                failed = np.ones(len(column), dtype=bool)
+            else:
+                failed = np.fromiter(
+                    (not any(is_type(v, t) for t in types) for v in column),
+                    dtype=bool,
+                    count=len(column))
+            return failed, lambda v: f"{v!r} is not of type {reprs}"
+        return check
+
+    @staticmethod
+    def _compile_enum(enums: list) -> Callable:
+        str_enums = set(e for e in enums if isinstance(e, str))
+        def check(column, is_str_column):
+            if is_str_column:
+                failed = ~column.isin(str_enums).values
+            else:
+                failed = np.fromiter(
+                    (all(not _json_equal(e, v) for e in enums) for v in column),
+                    dtype=bool,
+                    count=len(column))
+            return failed, lambda v: f"{v!r} is not one of {enums!r}"
+        return check
+
+    @staticmethod
+    def _compile_pattern(pattern: str) -> Callable:
+        regex = re.compile(pattern)
+        def check(column, is_str_column):
+            if is_str_column:
+                search = regex.search
+                failed = np.fromiter(
+                    (search(v) is None for v in column.values),
+                    dtype=bool,
+                    count=len(column))
+            else:
+                failed = np.fromiter(
+                    (isinstance(v, str) and not regex.search(v) for v in column),
+                    dtype=bool,
+                    count=len(column))
+            return failed, lambda v: f"{v!r} does not match {pattern!r}"
+        return check
+
+    @staticmethod
+    def _compile_min_length(min_length: int) -> Callable:
+        message = "should be non-empty" if min_length == 1 else "is too short"
+        def check(column, is_str_column):
+            if is_str_column:
+                failed = (column.str.len() < min_length).values
+            else:
+                failed = np.fromiter(
+                    (isinstance(v, str) and len(v) < min_length for v in column),
+                    dtype=bool,
+                    count=len(column))
+            return failed, lambda v: f"{v!r} {message}"
+        return check
+
+    @staticmethod
+    def _compile_max_length(max_length: int) -> Callable:
+        message = "is expected to be empty" if max_length == 0 else "is too long"
+        def check(column, is_str_column):
+            if is_str_column:
+                failed = (column.str.len() > max_length).values
+            else:
+                failed = np.fromiter(
+                    (isinstance(v, str) and len(v) > max_length for v in column),
+                    dtype=bool,
+                    count=len(column))
+            return failed, lambda v: f"{v!r} {message}"
+        return check
+
+    def _run_jsonschema(self, data: pd.DataFrame) -> list:
+        json_data = data.to_dict(orient='records')
+        return format_validation_errors(
+            self.validator.iter_errors(json_data))
+
+    def validate_dataframe(self, data: pd.DataFrame) -> list:
+        '''
+            A method for validating all the rows of a dataframe
+
+            :param data: A pandas dataframe, each row is validated as an item of the array
+            :returns: A list of error strings, or an empty list if no error found
+        '''
+        try:
+            if not self.is_compiled:
+                return self._run_jsonschema(data)
+            data = data.reset_index(drop=True)
+            records_cache = list()
+            def records():
+                if len(records_cache) == 0:
+                    records_cache.append(data.to_dict(orient='records'))
+                return records_cache[0]
+            error_list = list()
+            for check in self._array_checks:
+                err = check(data, records)
+                if err is not None:
+                    error_list.append(err)
+            if len(data.index) == 0:
+                return error_list
+            row_errors = list()
+            for check in self._row_checks:
+                row_errors.extend(check(data))
+            ## collect (row, property, message) in jsonschema path order
+            column_errors = list()
+            for property_name in sorted(self._column_checks.keys()):
+                if property_name not in data.columns:
+                    continue
+                column = data[property_name]
+                is_str_column = \
+                    pd.api.types.infer_dtype(column, skipna=False) == 'string'
+                values = None
+                for check in self._column_checks[property_name]:
+                    failed, get_message = check(column, is_str_column)
+                    failed_rows = np.flatnonzero(failed)
+                    if len(failed_rows) == 0:
+                        continue
+                    if values is None:
+                        values = column.tolist()
+                    column_errors.extend(
+                        (row, property_name, get_message(values[row]))
+                        for row in failed_rows)
+            column_errors.sort(key=lambda e: e[0])                              # stable sort keeps property and keyword order
+            if len(row_errors) == 0:
+                error_list.extend(
+                    f"{property_name}: {message}"
+                    for _, property_name, message in column_errors)
+                return error_list
+            position = 0
+            for row in range(len(data.index)):
+                error_list.extend(row_errors)
+                while position < len(column_errors) and \
+                      column_errors[position][0] == row:
+                    _, property_name, message = column_errors[position]
+                    error_list.append(f"{property_name}: {message}")
+                    position += 1
+            return error_list
+        except Exception as e:
+            raise ValueError(
+                f"Failed to validate dataframe, error: {e}")
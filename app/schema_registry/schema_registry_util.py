@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+import logging
+from threading import Lock
+from collections import OrderedDict
+from typing import Any, Optional, Union
+from jsonschema import Draft4Validator, Draft202012Validator
+from app.schema_registry.schema_compiler_util import CompiledSchemaValidator
+
+log = logging.getLogger(__name__)
+
+class SchemaValidatorRegistry:
+    '''
+        A process wide LRU registry of compiled JSON schema validators
+
+        Validators for schema files are keyed by the file path and reloaded when
+        the file mtime changes. Validators for schemas stored in the database are
+        keyed by an optional source label (or the content hash) and reloaded when
+        the content hash changes.
+
+        :param maxsize: Max number of validators to keep, default 64
+    '''
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._validators = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _get_content_hash(schema: Union[str, bytes, dict]) -> str:
+        if isinstance(schema, dict):
+            schema = json.dumps(schema, sort_keys=True)
+        if isinstance(schema, str):
+            schema = schema.encode('utf-8')
+        return hashlib.sha256(schema).hexdigest()
+
+    def _lookup(
+        self,
+        key: tuple,
+        fingerprint: Any) -> Any:
+        with self._lock:
+            entry = self._validators.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._validators.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _store(
+        self,
+        key: tuple,
+        fingerprint: Any,
+        validator: Any) -> None:
+        with self._lock:
+            self._validators[key] = (fingerprint, validator)
+            self._validators.move_to_end(key)
+            while len(self._validators) > self.maxsize:
+                self._validators.popitem(last=False)
+                self.evictions += 1
+
+    def get_validator_for_file(
+        self,
+        schema_file: str,
+        validator_class: Any = Draft4Validator,
+        compiled: bool = False) -> Any:
+        '''
+            Get a compiled validator for a JSON schema file
+
+            :param schema_file: Path of the JSON schema file
+            :param validator_class: A jsonschema validator class, default Draft4Validator
+            :param compiled: Return a CompiledSchemaValidator for dataframes, default False
+            :returns: A validator object, with the loaded schema as validator.schema
+        '''
+        try:
+            if not os.path.exists(schema_file):
+                raise IOError(
+                    f'json schema file {schema_file} not found')
+            schema_file = os.path.abspath(schema_file)
+            key = (
+                'compiled' if compiled else 'file',
+                schema_file,
+                validator_class.__name__)
+            fingerprint = os.stat(schema_file).st_mtime_ns
+            validator = self._lookup(key=key, fingerprint=fingerprint)
+            if validator is None:
+                with open(schema_file, 'r') as jf:
+                    schema = json.load(jf)
+                validator = validator_class(schema)
+                if compiled:
+                    validator = CompiledSchemaValidator(validator)
+                self._store(
+                    key=key,
+                    fingerprint=fingerprint,
+                    validator=validator)
+                log.debug(f"Loaded json schema {schema_file}, {self.get_stats()}")
+            return validator
+        except Exception as e:
+            raise ValueError(
+                f"Failed to get validator for schema file {schema_file}, error: {e}")
+
+    def get_validator_for_schema(
+        self,
+        schema: Union[str, bytes, dict],
+        source: Optional[str] = None,
+        validator_class: Any = Draft202012Validator) -> Any:
+        '''
+            Get a compiled validator for a JSON schema string, e.g. from the database
+
+            :param schema: A JSON schema string or a dictionary
+            :param source: An optional source label, e.g. raw_analysis_schema_v2:1, used for invalidation
+            :param validator_class: A jsonschema validator class, default Draft202012Validator
+            :returns: A validator object, with the loaded schema as validator.schema
+        '''
+        content_hash = self._get_content_hash(schema)
+        if source is None:
+            source = content_hash
+        key = ('schema', source, validator_class.__name__)
+        validator = self._lookup(key=key, fingerprint=content_hash)
+        if validator is None:
+            if not isinstance(schema, dict):
+                schema = json.loads(schema)
+            validator = validator_class(schema)
+            self._store(
+                key=key,
+                fingerprint=content_hash,
+                validator=validator)
+            log.debug(f"Loaded json schema {source}, {self.get_stats()}")
+        return validator
+
+    def invalidate(
+        self,
+        source: Optional[str] = None) -> None:
+        '''
+            Remove validators from the registry. Cached validation reports are
+            kept, their keys already change with the samplesheet and metadata
+            schema files
+
+            :param source: A schema file path or a source label, default None for all the validators
+        '''
+        with self._lock:
+            if source is None:
+                self._validators.clear()
+            else:
+                if os.path.exists(source):
+                    source = os.path.abspath(source)
+                for key in [k for k in self._validators if k[1] == source]:
+                    self._validators.pop(key)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._validators)}
+
+
+schema_validator_registry = SchemaValidatorRegistry()
@@ -0,0 +1,194 @@
+import os
+import hashlib
+import logging
+from typing import Any, Optional, Union
+from sqlalchemy import func
+from app import app, db, cache
+from app.models import (
+    Project,
+    IgfUser,
+    Sample)
+
+log = logging.getLogger(__name__)
+
+VALIDATION_CACHE_PREFIX = 'validation_cache'
+VALIDATION_CACHE_GENERATION_KEY = f'{VALIDATION_CACHE_PREFIX}:generation'
+DEFAULT_VALIDATION_CACHE_TIMEOUT = 300
+
+
+def get_normalized_content_hash(csv_data: Union[str, bytes]) -> str:
+    '''
+        A function for calculating a content hash for csv data. Line endings,
+        byte order mark and empty lines are ignored, as the csv parsers skip them,
+        so the same csv exported by different tools gets the same hash
+
+        :param csv_data: A csv string or bytes
+        :returns: A sha256 hex digest
+    '''
+    try:
+        if isinstance(csv_data, bytes):
+            csv_data = csv_data.decode('utf-8')
+        lines = [
+            line for line in csv_data.lstrip('\ufeff').splitlines()
+                if line != '']
+        return \
+            hashlib.sha256(
+                '\n'.join(lines).encode('utf-8')).\
+            hexdigest()
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get content hash, error: {e}")
+
+
+def get_schema_file_stamp(schema_file: str) -> str:
+    '''
+        A function for getting a version stamp for a schema file
+
+        :param schema_file: Path of the JSON schema file
+        :returns: A string with the file mtime and size
+    '''
+    try:
+        if not os.path.exists(schema_file):
+            raise IOError(
+                f'json schema file {schema_file} not found')
+        stat = os.stat(schema_file)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get schema stamp, error: {e}")
+
+
+def get_igfdb_reference_stamp() -> str:
+    '''
+        A function for getting a version stamp for the igfdb reference tables
+        used by the validation checks, i.e. Project, Sample and IgfUser. It is
+        calculated from the row count, the max id and the max timestamp of each
+        table, so inserts and deletes change the stamp. Updates of existing rows,
+        e.g. a sample moved to another project, don't change it, the cached
+        reports expire after VALIDATION_CACHE_TIMEOUT seconds (same as the igfdb
+        lookups) unless invalidate_igfdb_reference_lookups is called
+
+        :returns: A sha256 hex digest
+    '''
+    try:
+        stamp_list = list()
+        for id_column, time_column in (
+            (Project.project_id, Project.start_timestamp),
+            (Sample.sample_id, Sample.date_created),
+            (IgfUser.user_id, IgfUser.date_created)):
+            result = (
+                db.session
+                .query(
+                    func.count(id_column),
+                    func.max(id_column),
+                    func.max(time_column))
+                .one()
+            )
+            stamp_list.append(
+                '|'.join([str(i) for i in result]))
+        return \
+            hashlib.sha256(
+                ';'.join(stamp_list).encode('utf-8')).\
+            hexdigest()
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get igfdb reference stamp, error: {e}")
+
+
+def _get_cache_generation() -> int:
+    try:
+        generation = cache.get(VALIDATION_CACHE_GENERATION_KEY)
+    except Exception as e:
+        log.warning(
+            f"Failed to read validation cache generation, error: {e}")
+        generation = None
+    if generation is None:
+        generation = 0
+    return generation
+
+
+def get_validation_cache_key(
+    kind: str,
+    csv_data: Union[str, bytes],
+    schema_file: str,
+    check_db: bool = True) -> str:
+    '''
+        A function for building the validation cache key
+
+        :param kind: Type of the validation, e.g. samplesheet or raw_metadata
+        :param csv_data: A csv string or bytes
+        :param schema_file: Path of the JSON schema file used for validation
+        :param check_db: Include the igfdb reference stamp, default True
+        :returns: A cache key string
+    '''
+    try:
+        content_hash = \
+            get_normalized_content_hash(csv_data)
+        schema_stamp = \
+            get_schema_file_stamp(schema_file)
+        reference_stamp = 'no_db'
+        if check_db:
+            reference_stamp = \
+                get_igfdb_reference_stamp()
+        schema_hash = \
+            hashlib.sha256(
+                f"{os.path.abspath(schema_file)}:{schema_stamp}".encode('utf-8')).\
+            hexdigest()
+        return \
+            f"{VALIDATION_CACHE_PREFIX}:{kind}:{_get_cache_generation()}:" + \
+            f"{content_hash}:{schema_hash[:16]}:{reference_stamp[:16]}"
+    except Exception as e:
+        raise ValueError(
+            f"Failed to get validation cache key, error: {e}")
+
+
+def get_cached_validation_report(cache_key: str) -> Optional[dict]:
+    '''
+        A function for fetching a validation report from cache
+
+        :param cache_key: A cache key from get_validation_cache_key
+        :returns: A dictionary with status and report, or None if not found
+    '''
+    try:
+        return cache.get(cache_key)
+    except Exception as e:
+        log.warning(
+            f"Failed to read validation cache, error: {e}")
+        return None
+
+
+def set_cached_validation_report(
+    cache_key: str,
+    status: str,
+    report: str) -> None:
+    '''
+        A function for storing a validation report in cache
+
+        :param cache_key: A cache key from get_validation_cache_key
+        :param status: Validation status
+        :param report: Validation report
+    '''
+    try:
+        cache.set(
+            cache_key,
+            {'status': status, 'report': report},
+            timeout=app.config.get(
+                'VALIDATION_CACHE_TIMEOUT',
+                DEFAULT_VALIDATION_CACHE_TIMEOUT))
+    except Exception as e:
+        log.warning(
+            f"Failed to write validation cache, error: {e}")
+
+
+def invalidate_validation_cache() -> None:
+    '''
+        A function for invalidating all the cached validation reports. It is called
+        by invalidate_igfdb_reference_lookups, for the igfdb changes which are not
+        visible from the reference stamp. Schema file changes are covered by the
+        schema stamp in the cache key
+    '''
+    try:
+        cache.cache.inc(VALIDATION_CACHE_GENERATION_KEY)                        # atomic incr on redis, concurrent bumps are not lost
+    except Exception as e:
+        raise ValueError(
+            f"Failed to invalidate validation cache, error: {e}")
@@ -0,0 +1,194 @@
+import os
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+from app.models import (
+    Project,
+    RawProject,
+    IgfUser,
+    ProjectUser,
+    Sample,
+    Platform,
+    Seqrun,
+    Experiment,
+    Run,
+    Collection,
+    File,
+    Collection_group)
+from benchmarks.data_generators import (
+    get_project_igf_id,
+    get_sample_igf_id)
+
+## file name prefix of the benchmark only SQLite dbs
+BENCHMARK_DB_PREFIX = 'benchmark_'
+
+
+def check_sqlite_db() -> None:
+    '''
+        A function for checking that the portal db and the igfdb are benchmark only
+        SQLite dbs, as the benchmark drops and seeds all the tables. Db files need
+        a name starting with BENCHMARK_DB_PREFIX, e.g. sqlite:////tmp/benchmark_app.db
+    '''
+    try:
+        for bind in (None, 'igfdb'):
+            engine = db.get_engine(bind=bind)
+            if engine.url.get_backend_name() != 'sqlite':
+                raise ValueError(
+                    f"Benchmark needs a SQLite db, found {engine.url.get_backend_name()} "
+                    + f"for bind {bind}")
+            database = engine.url.database
+            if database not in (None, '', ':memory:') and \
+               not os.path.basename(database).startswith(BENCHMARK_DB_PREFIX):
+                raise ValueError(
+                    f"Benchmark needs an in-memory db or a {BENCHMARK_DB_PREFIX}*.db file, "
+                    + f"found {database} for bind {bind}")
+    except Exception as e:
+        raise ValueError(
+            f"Failed to check benchmark db, error: {e}")
+
+
+@contextmanager
+def count_db_queries():
+    '''
+    A context manager for counting the SQL statements sent to the portal db
+    and the igfdb
+
+    :returns: A dictionary with the statement count, updated on exit
+    '''
+    counter = {'query_count': 0}
+    def count(*args, **kwargs):
+        counter['query_count'] += 1
+    engines = set(
+        db.get_engine(bind=bind) for bind in (None, 'igfdb'))
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', count)
+
+
+def reset_db() -> None:
+    '''
+        A function for recreating all the tables of the benchmark only SQLite dbs
+    '''
+    try:
+        check_sqlite_db()
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    except Exception as e:
+        raise ValueError(
+            f"Failed to reset benchmark db, error: {e}")
+
+
+def seed_igfdb(
+    project_count: int = 10,
+    sample_count: int = 1000,
+    fastq_sample_count: int = 0) -> dict:
+    '''
+        A function for loading synthetic projects, users and samples to igfdb,
+        sample ids and project ids match the data generators
+
+        :param project_count: Number of projects, default 10
+        :param sample_count: Number of samples, default 1000
+        :param fastq_sample_count: Number of samples with fastq files, default 0
+        :returns: A dictionary with the row counts
+    '''
+    try:
+        projects = [{
+            'project_id': i + 1,
+            'project_igf_id': get_project_igf_id(i),
+            'deliverable': 'FASTQ'}
+                for i in range(project_count)]
+        users = [{
+            'user_id': i + 1,
+            'name': f'User{i}',
+            'email_id': f'user{i}@example.com',
+            'username': f'user{i}'}
+                for i in range(project_count)]
+        project_users = [{
+            'project_user_id': i + 1,
+            'project_id': i + 1,
+            'user_id': i + 1,
+            'data_authority': 'T'}
+                for i in range(project_count)]
+        samples = [{
+            'sample_id': i + 1,
+            'sample_igf_id': get_sample_igf_id(i),
+            'project_id': i % project_count + 1}
+                for i in range(sample_count)]
+        fastq_sample_count = min(fastq_sample_count, sample_count)
+        experiments = list()
+        runs = list()
+        collections = list()
+        files = list()
+        collection_groups = list()
+        for i in range(fastq_sample_count):
+            experiments.append({
+                'experiment_id': i + 1,
+                'experiment_igf_id': f'{get_sample_igf_id(i)}_NEXTSEQ2000',
+                'library_name': get_sample_igf_id(i),
+                'platform_name': 'NEXTSEQ2000',
+                'status': 'ACTIVE',
+                'project_id': i % project_count + 1,
+                'sample_id': i + 1})
+            runs.append({
+                'run_id': i + 1,
+                'run_igf_id': f'{get_sample_igf_id(i)}_run',
+                'experiment_id': i + 1,
+                'seqrun_id': 1,
+                'lane_number': '1',
+                'status': 'ACTIVE'})
+            collections.append({
+                'collection_id': i + 1,
+                'name': f'{get_sample_igf_id(i)}_run',
+                'type': 'demultiplexed_fastq'})
+            files.append({
+                'file_id': i + 1,
+                'file_path': f'/benchmark/{get_sample_igf_id(i)}_R1.fastq.gz',
+                'status': 'ACTIVE'})
+            collection_groups.append({
+                'collection_group_id': i + 1,
+                'collection_id': i + 1,
+                'file_id': i + 1})
+        try:
+            db.session.bulk_insert_mappings(Project, projects)
+            db.session.bulk_insert_mappings(RawProject, projects)
+            db.session.bulk_insert_mappings(IgfUser, users)
+            db.session.bulk_insert_mappings(ProjectUser, project_users)
+            db.session.bulk_insert_mappings(Sample, samples)
+            if fastq_sample_count > 0:
+                db.session.add(
+                    Platform(
+                        platform_id=1,
+                        platform_igf_id='platform1',
+                        model_name='NEXTSEQ2000',
+                        vendor_name='ILLUMINA',
+                        software_name='RTA',
+                        software_version='x.y.z'))
+                db.session.add(
+                    Seqrun(
+                        seqrun_id=1,
+                        seqrun_igf_id='seqrun1',
+                        flowcell_id='XXX',
+                        platform_id=1))
+                db.session.flush()
+                db.session.bulk_insert_mappings(Experiment, experiments)
+                db.session.bulk_insert_mappings(Run, runs)
+                db.session.bulk_insert_mappings(Collection, collections)
+                db.session.bulk_insert_mappings(File, files)
+                db.session.bulk_insert_mappings(Collection_group, collection_groups)
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        return {
+            'projects': project_count,
+            'users': project_count,
+            'samples': sample_count,
+            'fastq_samples': fastq_sample_count}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to seed igfdb, error: {e}")
@@ -0,0 +1,177 @@
+import random
+import pandas as pd
+
+SAMPLESHEET_HEADER = [
+    '[Header],,,,,,,,,,',
+    'IEMFileVersion,4,,,,,,,,,',
+    'Investigator Name,benchmark,,,,,,,,,',
+    'Experiment Name,benchmark,,,,,,,,,',
+    'Workflow,GenerateFASTQ,,,,,,,,,',
+    ',,,,,,,,,,',
+    '[Reads],,,,,,,,,,',
+    '151,,,,,,,,,,',
+    '151,,,,,,,,,,',
+    ',,,,,,,,,,',
+    '[Settings],,,,,,,,,,',
+    'ReverseComplement,0,,,,,,,,,',
+    ',,,,,,,,,,']
+
+
+def get_project_igf_id(project_index: int) -> str:
+    return f'IGFQ{project_index:06d}_benchmark'
+
+
+def get_sample_igf_id(sample_index: int) -> str:
+    return f'IGF{sample_index:06d}'
+
+
+def generate_samplesheet_data(
+    row_count: int = 10000,
+    lane_count: int = 8,
+    seed: int = 1,
+    project_count: int = 1) -> pd.DataFrame:
+    '''
+        A function for generating synthetic samplesheet data rows
+
+        :param row_count: Number of data rows, default 10000
+        :param lane_count: Number of lanes, default 8
+        :param seed: Random seed, default 1
+        :param project_count: Number of projects, default 1
+        :returns: A pandas dataframe with all the entries as strings
+    '''
+    try:
+        rng = random.Random(seed)
+        rows = list()
+        for i in range(row_count):
+            sample_id = get_sample_igf_id(i)
+            is_single_cell = rng.random() < 0.1
+            rows.append({
+                'Lane': str(i % lane_count + 1),
+                'Sample_ID': sample_id,
+                'Sample_Name': f'sample-{i}',
+                'Sample_Plate': '',
+                'Sample_Well': '',
+                'I7_Index_ID': f'i7_{i}',
+                'index': (
+                    f'SI-GA-{chr(65 + i % 8)}{i % 12 + 1}'
+                    if is_single_cell
+                    else ''.join(rng.choice('ACGT') for _ in range(8))),
+                'I5_Index_ID': '' if is_single_cell else f'i5_{i}',
+                'index2': (
+                    ''
+                    if is_single_cell
+                    else ''.join(rng.choice('ACGT') for _ in range(8))),
+                'Sample_Project': get_project_igf_id(i % project_count),
+                'Description': '10X' if is_single_cell else ''})
+        return pd.DataFrame(rows)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to generate samplesheet data, error: {e}")
+
+
+def generate_samplesheet_csv(
+    row_count: int = 10000,
+    lane_count: int = 8,
+    seed: int = 1,
+    project_count: int = 1) -> str:
+    '''
+        A function for generating a synthetic V1 samplesheet
+
+        :param row_count: Number of data rows, default 10000
+        :param lane_count: Number of lanes, default 8
+        :param seed: Random seed, default 1
+        :param project_count: Number of projects, default 1
+        :returns: Samplesheet csv data
+    '''
+    try:
+        data = \
+            generate_samplesheet_data(
+                row_count=row_count,
+                lane_count=lane_count,
+                seed=seed,
+                project_count=project_count)
+        lines = list(SAMPLESHEET_HEADER)
+        lines.append('[Data],,,,,,,,,,')
+        lines.append(','.join(data.columns))
+        lines.extend(
+            ','.join(row) for row in data.values.tolist())
+        return '\n'.join(lines)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to generate samplesheet csv, error: {e}")
+
+
+def generate_metadata_csv(
+    row_count: int = 10000,
+    seed: int = 1,
+    project_count: int = 1) -> str:
+    '''
+        A function for generating synthetic formatted metadata csv
+
+        :param row_count: Number of samples, default 10000
+        :param seed: Random seed, default 1
+        :param project_count: Number of projects, default 1
+        :returns: Metadata csv data
+    '''
+    try:
+        rng = random.Random(seed)
+        library_types = [
+            ('TRANSCRIPTOMIC', 'RNA-SEQ', 'POLYA-RNA'),
+            ('GENOMIC', 'WGS', 'WGS'),
+            ('GENOMIC', 'CHIP-SEQ', 'H3K4ME3'),
+            ('TRANSCRIPTOMIC_SINGLE_CELL', 'RNA-SEQ', 'TENX-TRANSCRIPTOME-3P')]
+        rows = list()
+        for i in range(row_count):
+            project_index = i % project_count
+            library_source, library_strategy, experiment_type = \
+                rng.choice(library_types)
+            rows.append({
+                'project_igf_id': get_project_igf_id(project_index),
+                'name': f'User{project_index}',
+                'email_id': f'user{project_index}@example.com',
+                'hpc_username': '',
+                'username': '',
+                'sample_igf_id': get_sample_igf_id(i),
+                'sample_submitter_id': f'sample-{i}',
+                'library_source': library_source,
+                'library_strategy': library_strategy,
+                'experiment_type': experiment_type,
+                'species_name': rng.choice(['HG38', 'MM10']),
+                'sex': rng.choice(['FEMALE', 'MALE', 'UNKNOWN']),
+                'biomaterial_type': 'PRIMARY_TISSUE',
+                'taxon_id': '9606'})
+        return pd.DataFrame(rows).to_csv(index=False)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to generate metadata csv, error: {e}")
+
+
+def generate_analysis_yaml(
+    sample_count: int = 1000,
+    seed: int = 1) -> str:
+    '''
+        A function for generating a synthetic nf-core analysis design
+
+        :param sample_count: Number of samples, default 1000
+        :param seed: Random seed, default 1
+        :returns: Analysis design yaml string
+    '''
+    try:
+        rng = random.Random(seed)
+        lines = ['sample_metadata:']
+        for i in range(sample_count):
+            lines.append(f'  {get_sample_igf_id(i)}:')
+            lines.append(f'    condition: {rng.choice(["AAA", "BBB"])}')
+            lines.append('    strandedness: reverse')
+        lines.extend([
+            'analysis_metadata:',
+            '  NXF_VER: x.y.z',
+            '  nfcore_pipeline: nf-core/rnaseq',
+            '  nextflow_params:',
+            '    - "-profile singularity"',
+            '    - "-r a.b.c"',
+            '    - "--genome GRCh38"'])
+        return '\n'.join(lines)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to generate analysis yaml, error: {e}")
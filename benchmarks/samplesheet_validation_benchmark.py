@@ -0,0 +1,62 @@
+import timeit
+import argparse
+from app.samplesheet.samplesheet_util import SampleSheet
+from benchmarks.data_generators import generate_samplesheet_data
+
+def run_samplesheet_row_check_benchmark(
+    row_count: int = 10000,
+    repeat: int = 3) -> dict:
+    '''
+        A function for comparing the row-wise apply path and the columnar
+        path of the samplesheet semantic checks
+
+        :param row_count: Number of synthetic samplesheet rows, default 10000
+        :param repeat: Number of timed runs for each path, default 3
+        :returns: A dictionary with the best timing of each path and the speedup
+    '''
+    try:
+        data = generate_samplesheet_data(row_count=row_count)
+        row_errors = data.apply(
+            lambda x: SampleSheet._check_samplesheet_data_row(data_series=x),
+            axis=1).dropna()
+        column_errors = \
+            SampleSheet._check_samplesheet_data_columns(data=data).dropna()
+        if row_errors.to_dict() != column_errors.to_dict():
+            raise ValueError(
+                "Columnar and row-wise checks returned different errors")
+        apply_time = min(
+            timeit.repeat(
+                lambda: data.apply(
+                    lambda x: SampleSheet._check_samplesheet_data_row(data_series=x),
+                    axis=1),
+                number=1,
+                repeat=repeat))
+        columnar_time = min(
+            timeit.repeat(
+                lambda: SampleSheet._check_samplesheet_data_columns(data=data),
+                number=1,
+                repeat=repeat))
+        return {
+            'row_count': row_count,
+            'apply_seconds': apply_time,
+            'columnar_seconds': columnar_time,
+            'speedup': apply_time / columnar_time}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to run samplesheet row check benchmark, error: {e}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    results = \
+        run_samplesheet_row_check_benchmark(
+            row_count=args.rows,
+            repeat=args.repeat)
+    print(
+        f"rows: {results['row_count']}, "
+        f"apply: {results['apply_seconds']:.3f}s, "
+        f"columnar: {results['columnar_seconds']:.3f}s, "
+        f"speedup: {results['speedup']:.1f}x")
@@ -0,0 +1,429 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+from io import StringIO
+from datetime import datetime
+from typing import Callable, Optional
+
+if __name__ == '__main__':
+    ## new benchmark only SQLite dbs, unless the db uris are set in the environment
+    _db_dir = tempfile.mkdtemp(prefix='igfportal_benchmark_')
+    os.environ.setdefault(
+        'SQLALCHEMY_DATABASE_URI',
+        'sqlite:///' + os.path.join(_db_dir, 'benchmark_app.db'))
+    os.environ.setdefault(
+        'SQLALCHEMY_BINDS_IGFDB_URI',
+        'sqlite:///' + os.path.join(_db_dir, 'benchmark_igfdb.db'))
+
+from app import db
+from app.models import (
+    RawMetadataModel,
+    RawPipeline,
+    RawAnalysisValidationSchemaV2,
+    RawAnalysisV2,
+    RawCosMxMetadataBuilder)
+from app.samplesheet.samplesheet_util import SampleSheet
+from app.raw_metadata.raw_metadata_util import validate_raw_metadata_and_set_db_status
+from app.raw_analysis.raw_analysis_util_v2 import _get_validation_errors_for_analysis_design
+from app.cosmx_metadata.cosmx_metadata_utils import validate_raw_cosmx_metadata
+from app.metadata.metadata_util import check_user_name_and_email_in_metadata_db
+from benchmarks.benchmark_db import (
+    reset_db,
+    seed_igfdb,
+    count_db_queries)
+from benchmarks.data_generators import (
+    get_project_igf_id,
+    generate_samplesheet_csv,
+    generate_metadata_csv,
+    generate_analysis_yaml)
+
+DEFAULT_SIZES = (100, 1000, 5000, 20000)
+ANALYSIS_SCHEMA_FILE = \
+    os.path.join(
+        os.path.dirname(__file__),
+        '..',
+        'app',
+        'raw_analysis',
+        'analysis_validation_nfcore_v1.json')
+
+
+def _time_call(
+    func: Callable,
+    repeat: int = 3) -> dict:
+    '''
+        An internal function for timing a function call
+
+        :param func: A function without arguments, returning a list of errors
+        :param repeat: Number of timed runs, default 3
+        :returns: A dictionary with the best, median and mean seconds and the error count
+    '''
+    timings = list()
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    error_count = None
+    if isinstance(result, list):
+        error_count = len(result)
+    return {
+        'best_seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+        'mean_seconds': statistics.mean(timings),
+        'error_count': error_count}
+
+
+def benchmark_samplesheet_validation(
+    row_count: int,
+    repeat: int = 3,
+    project_count: int = 10) -> dict:
+    '''
+        Benchmark SampleSheet.validate_samplesheet_data, including csv parsing
+
+        :param row_count: Number of samplesheet rows
+        :param repeat: Number of timed runs, default 3
+        :param project_count: Number of projects in the samplesheet, default 10
+        :returns: A dictionary with the timings
+    '''
+    try:
+        csv_data = \
+            generate_samplesheet_csv(
+                row_count=row_count,
+                project_count=project_count)
+        return _time_call(
+            lambda: SampleSheet(infile=StringIO(csv_data)).validate_samplesheet_data(),
+            repeat=repeat)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to benchmark samplesheet validation, error: {e}")
+
+
+def benchmark_raw_metadata_validation(
+    row_count: int,
+    repeat: int = 3,
+    project_count: int = 10) -> dict:
+    '''
+        Benchmark validate_raw_metadata_and_set_db_status against a seeded igfdb,
+        without the validation cache
+
+        :param row_count: Number of metadata rows
+        :param repeat: Number of timed runs, default 3
+        :param project_count: Number of projects in the metadata, default 10
+        :returns: A dictionary with the timings
+    '''
+    try:
+        reset_db()
+        seed_igfdb(
+            project_count=project_count,
+            sample_count=row_count // 2)                                        # half of the samples are new
+        try:
+            db.session.add(
+                RawMetadataModel(
+                    raw_metadata_id=1,
+                    metadata_tag='benchmark',
+                    raw_csv_data='',
+                    formatted_csv_data=generate_metadata_csv(
+                        row_count=row_count,
+                        project_count=project_count),
+                    report=''))
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        def run():
+            validate_raw_metadata_and_set_db_status(
+                raw_metadata_id=1,
+                check_db=True,
+                use_cache=False)
+            report = (
+                db.session
+                .query(RawMetadataModel.report)
+                .filter(RawMetadataModel.raw_metadata_id==1)
+                .scalar()
+            )
+            return [i for i in (report or '').split('\n') if i != '']
+        return _time_call(run, repeat=repeat)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to benchmark raw metadata validation, error: {e}")
+
+
+def benchmark_analysis_design_validation(
+    sample_count: int,
+    repeat: int = 3) -> dict:
+    '''
+        Benchmark _get_validation_errors_for_analysis_design against a seeded
+        igfdb, all the samples of the design have fastq files
+
+        :param sample_count: Number of samples in the analysis design
+        :param repeat: Number of timed runs, default 3
+        :returns: A dictionary with the timings
+    '''
+    try:
+        reset_db()
+        seed_igfdb(
+            project_count=1,
+            sample_count=sample_count,
+            fastq_sample_count=sample_count)
+        with open(ANALYSIS_SCHEMA_FILE, 'r') as fp:
+            schema_data = fp.read()
+        try:
+            db.session.add(
+                RawPipeline(
+                    pipeline_id=1,
+                    pipeline_name='benchmark',
+                    pipeline_db='benchmark',
+                    pipeline_type='AIRFLOW'))
+            db.session.add(
+                RawAnalysisValidationSchemaV2(
+                    raw_analysis_schema_id=1,
+                    pipeline_id=1,
+                    json_schema=schema_data,
+                    status='VALIDATED'))
+            db.session.add(
+                RawAnalysisV2(
+                    raw_analysis_id=1,
+                    analysis_name='benchmark',
+                    project_id=1,
+                    pipeline_id=1,
+                    analysis_yaml=generate_analysis_yaml(
+                        sample_count=sample_count)))
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        return _time_call(
+            lambda: _get_validation_errors_for_analysis_design(
+                raw_analysis_id=1),
+            repeat=repeat)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to benchmark analysis design validation, error: {e}")
+
+
+def benchmark_cosmx_metadata_validation(
+    entry_count: int,
+    repeat: int = 3,
+    project_count: int = 1000,
+    seed: int = 1) -> dict:
+    '''
+        Benchmark validate_raw_cosmx_metadata for a batch of builder entries
+        against a seeded igfdb, some of the entries conflict with existing
+        projects and users
+
+        :param entry_count: Number of builder entries
+        :param repeat: Number of timed runs, default 3
+        :param project_count: Number of projects and users in igfdb, default 1000
+        :param seed: Random seed, default 1
+        :returns: A dictionary with the timings
+    '''
+    try:
+        reset_db()
+        seed_igfdb(
+            project_count=project_count,
+            sample_count=0)
+        rng = random.Random(seed)
+        try:
+            for i in range(entry_count):
+                conflict = rng.random() < 0.2
+                index = rng.randrange(project_count) if conflict else project_count + i
+                db.session.add(
+                    RawCosMxMetadataBuilder(
+                        raw_cosmx_metadata_builder_id=i + 1,
+                        cosmx_metadata_tag=get_project_igf_id(index),
+                        name=f'User{index}',
+                        email_id=f'user{index}@example.com',
+                        username=f'user{index}'))
+            db.session.commit()
+        except:
+            db.session.rollback()
+            raise
+        def run():
+            error_list = list()
+            for i in range(entry_count):
+                error_list.extend(
+                    validate_raw_cosmx_metadata(raw_cosmx_id=i + 1))
+            return error_list
+        return _time_call(run, repeat=repeat)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to benchmark cosmx metadata validation, error: {e}")
+
+
+def benchmark_name_email_reconciliation(
+    row_count: int,
+    repeat: int = 3,
+    project_count: int = 1000,
+    seed: int = 1) -> dict:
+    '''
+        Benchmark check_user_name_and_email_in_metadata_db for the name and email
+        columns of a metadata sheet against a seeded igfdb, rows repeat the same
+        users and some of them are missing or conflict with igfdb
+
+        :param row_count: Number of metadata rows
+        :param repeat: Number of timed runs, default 3
+        :param project_count: Number of projects and users in igfdb, default 1000
+        :param seed: Random seed, default 1
+        :returns: A dictionary with the timings and the queries per run
+    '''
+    try:
+        reset_db()
+        seed_igfdb(
+            project_count=project_count,
+            sample_count=0)
+        rng = random.Random(seed)
+        name_email_list = list()
+        for _ in range(row_count):
+            index = rng.randrange(project_count + project_count // 10)          # some users are not in igfdb
+            email_index = index if rng.random() < 0.95 else rng.randrange(project_count)
+            name_email_list.append({
+                'name': f'User{index}',
+                'email_id': f'user{email_index}@example.com'})
+        with count_db_queries() as counter:
+            result = \
+                _time_call(
+                    lambda: check_user_name_and_email_in_metadata_db(
+                        name_email_list=name_email_list),
+                    repeat=repeat)
+        result.update({
+            'query_count': counter.get('query_count') // repeat})
+        return result
+    except Exception as e:
+        raise ValueError(
+            f"Failed to benchmark name and email reconciliation, error: {e}")
+
+
+BENCHMARKS = {
+    'samplesheet_validation': benchmark_samplesheet_validation,
+    'raw_metadata_validation': benchmark_raw_metadata_validation,
+    'analysis_design_validation': benchmark_analysis_design_validation,
+    'cosmx_metadata_validation': benchmark_cosmx_metadata_validation,
+    'name_email_reconciliation': benchmark_name_email_reconciliation}
+
+
+def _get_git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run_validation_benchmarks(
+    sizes: tuple = DEFAULT_SIZES,
+    repeat: int = 3,
+    benchmark_names: Optional[list] = None) -> dict:
+    '''
+        A function for running the validation benchmarks
+
+        :param sizes: Input sizes (rows, samples or entries) for each benchmark
+        :param repeat: Number of timed runs for each benchmark, default 3
+        :param benchmark_names: An optional list of benchmark names, default all
+        :returns: A JSON serializable dictionary with metadata and results
+    '''
+    try:
+        if benchmark_names is None:
+            benchmark_names = list(BENCHMARKS.keys())
+        results = list()
+        for name in benchmark_names:
+            if name not in BENCHMARKS:
+                raise KeyError(
+                    f"Unknown benchmark {name}")
+            for size in sizes:
+                result = BENCHMARKS[name](size, repeat=repeat)
+                result.update({
+                    'benchmark': name,
+                    'size': size})
+                results.append(result)
+        return {
+            'metadata': {
+                'timestamp': datetime.now().isoformat(),
+                'git_revision': _get_git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeat': repeat},
+            'results': results}
+    except Exception as e:
+        raise ValueError(
+            f"Failed to run validation benchmarks, error: {e}")
+
+
+def compare_benchmark_results(
+    baseline: dict,
+    current: dict,
+    max_slowdown: float = 1.25,
+    min_seconds: float = 0.01) -> list:
+    '''
+        A function for finding regressions between two benchmark reports
+
+        :param baseline: Benchmark report of the previous release
+        :param current: Benchmark report of the current code
+        :param max_slowdown: Max allowed ratio of current and baseline best timings, default 1.25
+        :param min_seconds: Baseline timings below this value are ignored as noise, default 0.01
+        :returns: A list of dictionaries with benchmark, size, timings and the slowdown
+    '''
+    try:
+        baseline_lookup = {
+            (r.get('benchmark'), r.get('size')): r
+                for r in baseline.get('results', [])}
+        regressions = list()
+        for result in current.get('results', []):
+            key = (result.get('benchmark'), result.get('size'))
+            baseline_result = baseline_lookup.get(key)
+            if baseline_result is None or \
+               baseline_result.get('best_seconds') < min_seconds:
+                continue
+            slowdown = \
+                result.get('best_seconds') / baseline_result.get('best_seconds')
+            if slowdown > max_slowdown:
+                regressions.append({
+                    'benchmark': key[0],
+                    'size': key[1],
+                    'baseline_seconds': baseline_result.get('best_seconds'),
+                    'current_seconds': result.get('best_seconds'),
+                    'slowdown': slowdown})
+        return regressions
+    except Exception as e:
+        raise ValueError(
+            f"Failed to compare benchmark results, error: {e}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Validation benchmarks, needs benchmark_*.db SQLite dbs as the tables are dropped')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--benchmark', action='append', choices=list(BENCHMARKS.keys()))
+    parser.add_argument('--output', default=None, help='JSON output file, default stdout')
+    parser.add_argument('--baseline', default=None, help='JSON report of a previous run')
+    parser.add_argument('--max_slowdown', type=float, default=1.25)
+    args = parser.parse_args()
+    report = \
+        run_validation_benchmarks(
+            sizes=tuple(args.sizes),
+            repeat=args.repeat,
+            benchmark_names=args.benchmark)
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as fp:
+            baseline = json.load(fp)
+        report['regressions'] = \
+            compare_benchmark_results(
+                baseline=baseline,
+                current=report,
+                max_slowdown=args.max_slowdown)
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    if len(report.get('regressions', [])) > 0:
+        sys.exit(1)
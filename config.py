@@ -19,6 +19,10 @@ CELERY_WORK_DIR = os.environ.get("CELERY_WORK_DIR", tempfile.gettempdir())
 
 # cache
 CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", 'unix://')
+VALIDATION_CACHE_TIMEOUT = int(os.environ.get("VALIDATION_CACHE_TIMEOUT", 300))
+IGFDB_LOOKUP_CACHE_TIMEOUT = int(os.environ.get("IGFDB_LOOKUP_CACHE_TIMEOUT", 300))
+IGFDB_LOOKUP_LOCAL_TIMEOUT = int(os.environ.get("IGFDB_LOOKUP_LOCAL_TIMEOUT", 30))
+IGFDB_LOOKUP_LOCAL_SIZE = int(os.environ.get("IGFDB_LOOKUP_LOCAL_SIZE", 10000))
 
 # Your App secret key
 SECRET_KEY = os.environ.get("SECRET_KEY", "\2\1thisismyscretkey\1\2\e\y\y\h")
@@ -117,6 +121,13 @@ IMG_UPLOAD_URL = "/static/uploads/"
 
 ## report upload folder
 REPORT_UPLOAD_PATH = "/data/static/reports/"
+## internal nginx location for REPORT_UPLOAD_PATH, reports are served with X-Accel-Redirect if set
+REPORT_ACCEL_REDIRECT_PREFIX = os.environ.get("REPORT_ACCEL_REDIRECT_PREFIX", None)
+## precompressed report variants served by nginx for X-Accel-Redirect, gzip_static only by default
+REPORT_ACCEL_ENCODINGS = ("gzip",)
+## min age in seconds of the unused report blobs and the staged uploads removed by the report store cleanup
+REPORT_GC_GRACE_PERIOD = 3600
+REPORT_STAGING_GC_GRACE_PERIOD = 7 * 24 * 3600
 
 # Theme configuration
 # these are located on static/appbuilder/css/themes
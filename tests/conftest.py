@@ -61,6 +61,21 @@ def test_client(db):
                 app.appbuilder.sm.add_permission_view_menu(
                     "can_list",
                     "PreDeMultiplexingDataView"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_download_reports",
+                    "PreDeMultiplexingDataView"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_view_predemult_report",
+                    "IFrameView"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_view_interop_report",
+                    "IFrameView"))
             app.appbuilder.sm.add_permission_role(
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
@@ -252,6 +267,18 @@ def test_client(db):
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
                     "can_search_run_samplesheet", "RawSeqrunApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_get_run_samplesheet", "RawSeqrunApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_get_split_samplesheets", "RawSeqrunApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_get_index_collisions", "RawSeqrunApi"))
             app.appbuilder.sm.add_permission_role(
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
@@ -260,10 +287,62 @@ def test_client(db):
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
                     "can_get_samplesheet_id", "RawSeqrunApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_get_changes", "RawMetadataDataApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_acknowledge_changes", "RawMetadataDataApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_get_changes", "RawAnalysisV2Api"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_acknowledge_changes", "RawAnalysisV2Api"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_get_changes", "RawCosMxMetadataApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_acknowledge_changes", "RawCosMxMetadataApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_get_changes", "RawSeqrunApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_acknowledge_changes", "RawSeqrunApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_mark_analysis_list_synched", "RawAnalysisV2Api"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_mark_analysis_list_rejected", "RawAnalysisV2Api"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_mark_metadata_list_as_synced", "RawMetadataDataApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_mark_metadata_list_as_synced", "RawCosMxMetadataApi"))
             app.appbuilder.sm.add_permission_role(
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
                     "can_update_admin_view_data", "AdminHomeApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_cleanup_report_store", "AdminHomeApi"))
             # app.appbuilder.sm.add_permission_role(
             #     admin_role,
             #     app.appbuilder.sm.add_permission_view_menu(
@@ -272,10 +351,22 @@ def test_client(db):
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
                     "can_add_report", "PreDeMultiplexingDataApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_low_read_samples", "PreDeMultiplexingDataApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_undetermined_barcodes", "PreDeMultiplexingDataApi"))
             app.appbuilder.sm.add_permission_role(
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
                     "can_add_report", "SeqrunInteropApi"))
+            app.appbuilder.sm.add_permission_role(
+                admin_role,
+                app.appbuilder.sm.add_permission_view_menu(
+                    "can_metrics_trend", "SeqrunInteropApi"))
             app.appbuilder.sm.add_permission_role(
                 admin_role,
                 app.appbuilder.sm.add_permission_view_menu(
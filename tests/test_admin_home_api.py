@@ -117,4 +117,24 @@ def test_async_parse_and_add_new_admin_view_data(db, tmp_path):
             filter(AdminHomeData.admin_data_tag=='test').\
             one_or_none()
     assert results is not None
-    assert results.recent_finished_runs == 2
\ No newline at end of file
+    assert results.recent_finished_runs == 2
+
+def test_cleanup_report_store_api(db, test_client):
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    res = \
+        test_client.post(
+            '/api/v1/admin_home/cleanup_report_store',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert json.loads(res.data.decode('utf-8')).get('message') == \
+        'submitted report store cleanup'
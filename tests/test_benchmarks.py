@@ -0,0 +1,61 @@
+import pytest
+from io import StringIO
+from app.samplesheet.samplesheet_util import SampleSheet
+from benchmarks.data_generators import (
+    generate_samplesheet_csv,
+    generate_metadata_csv,
+    generate_analysis_yaml)
+from benchmarks import benchmark_db
+from benchmarks.validation_benchmark import (
+    run_validation_benchmarks,
+    compare_benchmark_results)
+
+def test_data_generators():
+    csv_data = \
+        generate_samplesheet_csv(
+            row_count=20,
+            project_count=2)
+    sa = SampleSheet(infile=StringIO(csv_data))
+    assert len(sa._data) == 20
+    assert generate_samplesheet_csv(row_count=20) == \
+        generate_samplesheet_csv(row_count=20)
+    metadata_csv = \
+        generate_metadata_csv(row_count=20)
+    assert len(metadata_csv.strip().split('\n')) == 21
+    analysis_yaml = \
+        generate_analysis_yaml(sample_count=5)
+    assert analysis_yaml.startswith('sample_metadata:')
+
+def test_reset_db_needs_benchmark_db(db):
+    ## the test dbs are not benchmark only dbs
+    with pytest.raises(ValueError):
+        benchmark_db.reset_db()
+
+def test_run_validation_benchmarks(db, monkeypatch):
+    monkeypatch.setattr(benchmark_db, 'check_sqlite_db', lambda: None)
+    report = \
+        run_validation_benchmarks(
+            sizes=(10,),
+            repeat=1)
+    assert 'git_revision' in report['metadata']
+    assert len(report['results']) == 5
+    results = {
+        r['benchmark']: r for r in report['results']}
+    assert results['analysis_design_validation']['error_count'] == 0
+    assert results['raw_metadata_validation']['error_count'] == 0
+    assert results['samplesheet_validation']['best_seconds'] > 0
+    assert results['name_email_reconciliation']['query_count'] == 1
+    slow_report = {
+        'results': [
+            dict(r, best_seconds=r['best_seconds'] * 2 + 1)
+                for r in report['results']]}
+    regressions = \
+        compare_benchmark_results(
+            baseline=report,
+            current=slow_report,
+            min_seconds=0)
+    assert len(regressions) == 5
+    assert compare_benchmark_results(
+        baseline=report,
+        current=report,
+        min_seconds=0) == []
@@ -0,0 +1,249 @@
+import json
+import datetime
+import pytest
+from app.models import (
+    RawMetadataModel,
+    RawAnalysisV2,
+    RawProject,
+    RawPipeline,
+    RawSeqrun)
+from app.change_feed.change_feed_util import (
+    encode_change_feed_cursor,
+    decode_change_feed_cursor,
+    get_change_feed_page,
+    acknowledge_change_feed_items,
+    update_status_for_id_list)
+from benchmarks.benchmark_db import count_db_queries
+from flask_appbuilder.const import (
+    API_SECURITY_PASSWORD_KEY,
+    API_SECURITY_PROVIDER_KEY,
+    API_SECURITY_USERNAME_KEY)
+
+def _add_raw_metadata(db, count, update_time):
+    try:
+        for i in range(1, count + 1):
+            db.session.add(
+                RawMetadataModel(
+                    raw_metadata_id=i,
+                    metadata_tag=f'test{i}',
+                    raw_csv_data='raw',
+                    formatted_csv_data=f'csv{i}',
+                    status='READY' if i % 5 != 0 else 'VALIDATED',
+                    update_time=update_time))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+
+def test_change_feed_cursor():
+    time_stamp = datetime.datetime(2024, 1, 1, 10, 0, 0, 5)
+    cursor = encode_change_feed_cursor(time_stamp, 10)
+    assert decode_change_feed_cursor(cursor) == (time_stamp, 10)
+    with pytest.raises(ValueError):
+        decode_change_feed_cursor('not-a-cursor')
+
+def test_get_change_feed_page(db):
+    ## all the items share the same update time, pages are ordered by id
+    _add_raw_metadata(db, 12, datetime.datetime(2024, 1, 1, 10, 0, 0))
+    page = \
+        get_change_feed_page(
+            feed_name='raw_metadata',
+            limit=4)
+    assert [i['id'] for i in page['items']] == [1, 2, 3, 4]
+    assert page['items'][0]['payload'] == {
+        'metadata_tag': 'test1',
+        'formatted_csv_data': 'csv1'}
+    assert page['has_more']
+    page = \
+        get_change_feed_page(
+            feed_name='raw_metadata',
+            cursor=page['next_cursor'],
+            limit=4)
+    assert [i['id'] for i in page['items']] == [6, 7, 8, 9]
+    cursor = page['next_cursor']
+    page = \
+        get_change_feed_page(
+            feed_name='raw_metadata',
+            cursor=cursor,
+            limit=4)
+    assert [i['id'] for i in page['items']] == [11, 12]
+    assert not page['has_more']
+    ## items changed after the cursor are listed
+    db.session.\
+        query(RawMetadataModel).\
+        filter(RawMetadataModel.raw_metadata_id==5).\
+        update({
+            'status': 'READY',
+            'update_time': datetime.datetime(2024, 1, 1, 10, 0, 1)})
+    db.session.commit()
+    page = \
+        get_change_feed_page(
+            feed_name='raw_metadata',
+            cursor=page['next_cursor'])
+    assert [i['id'] for i in page['items']] == [5]
+    with pytest.raises(ValueError):
+        get_change_feed_page(feed_name='unknown')
+
+def test_acknowledge_change_feed_items(db):
+    _add_raw_metadata(db, 6, datetime.datetime(2024, 1, 1, 10, 0, 0))
+    results = \
+        acknowledge_change_feed_items(
+            feed_name='raw_metadata',
+            id_list=[1, 2, 5, 2, 100])
+    assert results == {
+        'acknowledged': [1, 2],
+        'skipped': [5, 100]}
+    statuses = dict(
+        db.session.\
+            query(RawMetadataModel.raw_metadata_id, RawMetadataModel.status).\
+            all())
+    assert statuses == {
+        1: 'SYNCHED', 2: 'SYNCHED', 3: 'READY',
+        4: 'READY', 5: 'VALIDATED', 6: 'READY'}
+    page = get_change_feed_page(feed_name='raw_metadata')
+    assert [i['id'] for i in page['items']] == [3, 4, 6]
+
+def test_change_feed_api(db, test_client):
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    pipeline1 = \
+        RawPipeline(
+            pipeline_name='pipeline1',
+            pipeline_db='test')
+    project1 = \
+        RawProject(
+            project_igf_id='project1')
+    try:
+        for i in range(1, 4):
+            db.session.add(
+                RawAnalysisV2(
+                    raw_analysis_id=i,
+                    analysis_name=f'raw_analysis{i}',
+                    analysis_yaml='sample_metadata:\n  sample1: {}\n',
+                    project=project1,
+                    pipeline=pipeline1,
+                    status='VALIDATED'))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    res = \
+        test_client.get(
+            '/api/v1/raw_analysis_v2/get_changes?limit=2',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    json_data = json.loads(res.data.decode("utf-8"))
+    assert [i['id'] for i in json_data['items']] == [1, 2]
+    assert json_data['items'][0]['payload']['analysis_yaml'] == \
+        {'sample_metadata': {'sample1': {}}}
+    assert json_data['has_more']
+    res = \
+        test_client.get(
+            f"/api/v1/raw_analysis_v2/get_changes?limit=2&cursor={json_data['next_cursor']}",
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert [i['id'] for i in json.loads(res.data.decode("utf-8"))['items']] == [3]
+    res = \
+        test_client.post(
+            '/api/v1/raw_analysis_v2/acknowledge_changes',
+            headers={"Authorization": f"Bearer {token}"},
+            json={'id_list': [1, 2, 3]})
+    assert res.status_code == 200
+    assert json.loads(res.data.decode("utf-8"))['acknowledged'] == [1, 2, 3]
+    res = \
+        test_client.get(
+            '/api/v1/raw_analysis_v2/get_changes',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert json.loads(res.data.decode("utf-8"))['items'] == []
+    res = \
+        test_client.get(
+            '/api/v1/raw_metadata/get_changes?cursor=xyz',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    res = \
+        test_client.post(
+            '/api/v1/raw_seqrun/acknowledge_changes',
+            headers={"Authorization": f"Bearer {token}"},
+            json={'ids': [1]})
+    assert res.status_code == 400
+    res = \
+        test_client.get(
+            '/api/v1/raw_cosmx_metadata/get_changes',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_changes',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+
+def test_acknowledge_raw_seqrun_changes(db):
+    try:
+        db.session.add(
+            RawSeqrun(
+                raw_seqrun_id=1,
+                raw_seqrun_igf_id='run1',
+                status='READY'))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    page = get_change_feed_page(feed_name='raw_seqrun')
+    assert [i['payload']['raw_seqrun_igf_id'] for i in page['items']] == ['run1']
+    results = \
+        acknowledge_change_feed_items(
+            feed_name='raw_seqrun',
+            id_list=[1])
+    assert results['acknowledged'] == [1]
+    ## acknowledged runs get their own status, not FINISHED
+    assert db.session.query(RawSeqrun.status).scalar() == 'SYNCHED'
+    assert get_change_feed_page(feed_name='raw_seqrun')['items'] == []
+
+def test_update_status_for_id_list(db):
+    _add_raw_metadata(db, 6, datetime.datetime(2024, 1, 1, 10, 0, 0))
+    ## all the ids are updated by the first statement
+    with count_db_queries() as counter:
+        results = \
+            update_status_for_id_list(
+                model=RawMetadataModel,
+                id_column=RawMetadataModel.raw_metadata_id,
+                id_list=[1, 2],
+                from_status='READY',
+                to_status='SYNCHED')
+    assert results == {'updated': [1, 2], 'skipped': []}
+    assert counter.get('query_count') == 1
+    ## retried ids are skipped
+    results = \
+        update_status_for_id_list(
+            model=RawMetadataModel,
+            id_column=RawMetadataModel.raw_metadata_id,
+            id_list=[2, 3, 5],
+            from_status='READY',
+            to_status='SYNCHED')
+    assert results == {'updated': [3], 'skipped': [2, 5]}
+    statuses = dict(
+        db.session.\
+            query(RawMetadataModel.raw_metadata_id, RawMetadataModel.status).\
+            all())
+    assert statuses == {
+        1: 'SYNCHED', 2: 'SYNCHED', 3: 'SYNCHED',
+        4: 'READY', 5: 'VALIDATED', 6: 'READY'}
+    assert update_status_for_id_list(
+        model=RawMetadataModel,
+        id_column=RawMetadataModel.raw_metadata_id,
+        id_list=[],
+        from_status='READY',
+        to_status='SYNCHED') == {'updated': [], 'skipped': []}
@@ -0,0 +1,196 @@
+import os
+import gzip
+from app import app
+from app.models import (
+    IlluminaInteropData,
+    PreDeMultiplexingData)
+from app.report_store_util import add_report_variants
+from app.file_download_util import get_report_file_etag
+
+def test_interop_report_view(db, test_client, tmp_path):
+    report_dir = os.path.join(tmp_path, 'interop_reports')
+    os.makedirs(report_dir)
+    report_path = os.path.join(report_dir, 'report.html')
+    with open(report_path, 'w') as fp:
+        fp.write('<h1>Its as test report</h1>')
+    try:
+        db.session.add(
+            IlluminaInteropData(
+                report_id=1,
+                run_name='run1',
+                tag='test 1',
+                file_path=report_path))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    rv = test_client.post("/login/", data=dict(
+            username='admin',
+            password='password'
+            ), follow_redirects=True)
+    assert rv.status_code == 200
+    with test_client.session_transaction() as session:
+        session['user_id'] = 1
+        session['_fresh'] = True
+    upload_path = app.config['REPORT_UPLOAD_PATH']
+    app.config['REPORT_UPLOAD_PATH'] = str(tmp_path)
+    try:
+        rv = test_client.get('/static/interop/1')
+        assert rv.status_code == 200
+        assert b'src="/static/interop/1/report"' in rv.data
+        assert b'Its as test report' not in rv.data
+        ## served by flask
+        rv = test_client.get('/static/interop/1/report')
+        assert rv.status_code == 200
+        assert rv.data == b'<h1>Its as test report</h1>'
+        etag = get_report_file_etag(os.stat(report_path))
+        assert rv.headers.get('ETag') == f'"{etag}"'
+        assert rv.headers.get('Last-Modified') is not None
+        assert 'X-Accel-Redirect' not in rv.headers
+        rv = test_client.get(
+            '/static/interop/1/report',
+            headers={'If-None-Match': f'"{etag}"'})
+        assert rv.status_code == 304
+        ## served by nginx
+        app.config['REPORT_ACCEL_REDIRECT_PREFIX'] = '/protected_reports/'
+        rv = test_client.get('/static/interop/1/report')
+        assert rv.status_code == 200
+        assert rv.data == b''
+        assert rv.headers.get('X-Accel-Redirect') == \
+            '/protected_reports/interop_reports/report.html'
+        assert rv.headers.get('ETag') == f'"{etag}"'
+        rv = test_client.get(
+            '/static/interop/1/report',
+            headers={'If-None-Match': f'"{etag}"'})
+        assert rv.status_code == 304
+        assert 'X-Accel-Redirect' not in rv.headers
+        rv = test_client.get('/static/interop/2/report')
+        assert rv.status_code == 404
+    finally:
+        app.config['REPORT_UPLOAD_PATH'] = upload_path
+        app.config['REPORT_ACCEL_REDIRECT_PREFIX'] = None
+
+def test_precompressed_report_download(db, test_client, tmp_path):
+    report_dir = os.path.join(tmp_path, 'predemult_reports')
+    os.makedirs(report_dir)
+    report_path = os.path.join(report_dir, 'report.html')
+    report_data = b'<h1>Its as test report</h1>' * 100
+    with open(report_path, 'wb') as fp:
+        fp.write(report_data)
+    add_report_variants(report_path)
+    try:
+        db.session.add(
+            PreDeMultiplexingData(
+                demult_id=1,
+                run_name='run1',
+                samplesheet_tag='tag1',
+                file_path=report_path))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    rv = test_client.post("/login/", data=dict(
+            username='admin',
+            password='password'
+            ), follow_redirects=True)
+    assert rv.status_code == 200
+    with test_client.session_transaction() as session:
+        session['user_id'] = 1
+        session['_fresh'] = True
+    upload_path = app.config['REPORT_UPLOAD_PATH']
+    app.config['REPORT_UPLOAD_PATH'] = str(tmp_path)
+    try:
+        rv = test_client.get(
+            '/static/predemult/1/report',
+            headers={'Accept-Encoding': 'gzip, deflate'})
+        assert rv.status_code == 200
+        assert rv.headers.get('Content-Encoding') == 'gzip'
+        assert rv.headers.get('Content-Type').startswith('text/html')
+        assert 'Accept-Encoding' in rv.headers.get('Vary')
+        assert gzip.decompress(rv.data) == report_data
+        rv = test_client.get('/static/predemult/1/report')
+        assert rv.status_code == 200
+        assert 'Content-Encoding' not in rv.headers
+        assert rv.data == report_data
+        rv = test_client.get(
+            '/predemultiplexingdataview/download/rawdata/1',
+            headers={'Accept-Encoding': 'gzip'})
+        assert rv.status_code == 200
+        assert rv.headers.get('Content-Encoding') == 'gzip'
+        assert 'tag1.html' in rv.headers.get('Content-Disposition')
+        assert gzip.decompress(rv.data) == report_data
+        ## nginx only serves the .gz variant, so the etag is not taken from the .br file
+        with open(f"{report_path}.br", 'wb') as fp:
+            fp.write(b'br')
+        app.config['REPORT_ACCEL_REDIRECT_PREFIX'] = '/protected_reports/'
+        rv = test_client.get(
+            '/static/predemult/1/report',
+            headers={'Accept-Encoding': 'br, gzip'})
+        assert rv.status_code == 200
+        assert rv.headers.get('X-Accel-Redirect') == \
+            '/protected_reports/predemult_reports/report.html'
+        assert rv.headers.get('ETag') == \
+            f'"{get_report_file_etag(os.stat(f"{report_path}.gz"))}"'
+    finally:
+        app.config['REPORT_UPLOAD_PATH'] = upload_path
+        app.config['REPORT_ACCEL_REDIRECT_PREFIX'] = None
+
+def test_report_download_with_range(db, test_client, tmp_path):
+    report_dir = os.path.join(tmp_path, 'predemult_reports')
+    os.makedirs(report_dir)
+    report_path = os.path.join(report_dir, 'report.html')
+    report_data = bytes(range(256)) * 100
+    with open(report_path, 'wb') as fp:
+        fp.write(report_data)
+    try:
+        db.session.add(
+            PreDeMultiplexingData(
+                demult_id=1,
+                run_name='run1',
+                samplesheet_tag='tag1',
+                file_path=report_path))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    rv = test_client.post("/login/", data=dict(
+            username='admin',
+            password='password'
+            ), follow_redirects=True)
+    assert rv.status_code == 200
+    with test_client.session_transaction() as session:
+        session['user_id'] = 1
+        session['_fresh'] = True
+    etag = get_report_file_etag(os.stat(report_path))
+    rv = test_client.get('/predemultiplexingdataview/download/rawdata/1')
+    assert rv.status_code == 200
+    assert rv.headers.get('Accept-Ranges') == 'bytes'
+    assert rv.headers.get('ETag') == f'"{etag}"'
+    assert rv.headers.get('Last-Modified') is not None
+    assert rv.data == report_data
+    ## resume an interrupted download
+    rv = test_client.get(
+        '/predemultiplexingdataview/download/rawdata/1',
+        headers={'Range': 'bytes=1000-', 'If-Range': f'"{etag}"'})
+    assert rv.status_code == 206
+    assert rv.headers.get('Content-Range') == \
+        f'bytes 1000-{len(report_data) - 1}/{len(report_data)}'
+    assert rv.data == report_data[1000:]
+    rv = test_client.get(
+        '/predemultiplexingdataview/download/rawdata/1',
+        headers={'Range': 'bytes=0-99'})
+    assert rv.status_code == 206
+    assert rv.data == report_data[:100]
+    ## file changed after the first part, full download
+    rv = test_client.get(
+        '/predemultiplexingdataview/download/rawdata/1',
+        headers={'Range': 'bytes=1000-', 'If-Range': '"old-etag"'})
+    assert rv.status_code == 200
+    assert rv.data == report_data
+    rv = test_client.get(
+        '/predemultiplexingdataview/download/rawdata/1',
+        headers={'Range': f'bytes={len(report_data) + 10}-'})
+    assert rv.status_code == 416
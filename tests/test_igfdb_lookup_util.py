@@ -0,0 +1,103 @@
+import time
+import pytest
+from app import app, cache
+from app.models import (
+    Project,
+    Sample,
+    IgfUser)
+from app.metadata.igfdb_lookup_util import (
+    LocalLRUCache,
+    IgfdbReferenceLookup,
+    project_exists_lookup,
+    invalidate_igfdb_reference_lookups)
+from app.metadata.metadata_util import (
+    check_for_projects_in_metadata_db,
+    check_sample_and_project_ids_in_metadata_db)
+from benchmarks.benchmark_db import count_db_queries
+
+@pytest.fixture(scope="function")
+def simple_cache():
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache"})
+    invalidate_igfdb_reference_lookups()
+    yield cache
+    cache.init_app(app)
+    invalidate_igfdb_reference_lookups(clear_shared=False)
+
+def test_local_lru_cache():
+    lru = LocalLRUCache(maxsize=2, timeout=60)
+    lru.set_many({'a': 1, 'b': None})
+    assert lru.get_many(['b', 'a', 'c']) == {'a': 1, 'b': None}
+    lru.set_many({'c': 3})                                                      # b is the least recently used
+    assert lru.get_many(['a', 'b', 'c']) == {'a': 1, 'c': 3}
+    lru = LocalLRUCache(maxsize=2, timeout=0)
+    lru.set_many({'a': 1})
+    time.sleep(0.01)
+    assert lru.get_many(['a']) == {}
+    assert len(lru) == 0
+
+def test_igfdb_reference_lookup(simple_cache):
+    fetched_keys = list()
+    def fetch_func(keys):
+        fetched_keys.append(keys)
+        return {k: k.upper() for k in keys if k != 'x'}
+    lookup = \
+        IgfdbReferenceLookup(
+            name='test',
+            fetch_func=fetch_func)
+    assert lookup.get_many(['a', 'b', 'x', 'a'], chunk_size=2) == \
+        {'a': 'A', 'b': 'B', 'x': None}
+    assert fetched_keys == [['a', 'b'], ['x']]
+    ## missing keys are not cached
+    assert lookup.get_many(['b', 'x']) == {'b': 'B', 'x': None}
+    assert fetched_keys[-1] == ['x']
+    assert len(fetched_keys) == 3
+    ## shared cache
+    lookup.clear_local()
+    assert lookup.get_many(['a', 'c']) == {'a': 'A', 'c': 'C'}
+    assert fetched_keys[-1] == ['c']
+    invalidate_igfdb_reference_lookups()
+    assert lookup.get_many(['a']) == {'a': 'A'}
+    assert fetched_keys[-1] == ['a']
+
+def test_check_for_projects_with_lookup(db, simple_cache):
+    output, errors = \
+        check_for_projects_in_metadata_db(['project1'])
+    assert output == {'project1': False}
+    assert errors == ['Project project1 is missing in db']
+    found, _ = project_exists_lookup.get_cached(['project1'])
+    assert found == {}
+    ## igfdb is loaded outside of the portal session, no invalidation hook
+    with db.session.get_bind(mapper=Project.__mapper__).begin() as conn:
+        conn.execute(
+            Project.__table__.insert(),
+            {'project_id': 1, 'project_igf_id': 'project1'})
+    output, errors = \
+        check_for_projects_in_metadata_db(['project1'])
+    assert output == {'project1': True}
+    assert errors == []
+
+def test_check_sample_and_project_ids_for_a_batch(db, simple_cache):
+    try:
+        db.session.add(Project(project_id=1, project_igf_id='project1'))
+        db.session.add(Sample(sample_id=1, sample_igf_id='sample1', project_id=1))
+        db.session.add(IgfUser(user_id=1, name='User A', email_id='a@g.com'))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    sample_project_list = [{
+        'sample_igf_id': f'sample{i}',
+        'project_igf_id': 'project1',
+        'name': 'User A',
+        'email_id': 'a@g.com'} for i in range(1, 20)]
+    with count_db_queries() as counter:
+        for _ in range(40):
+            errors = \
+                check_for_projects_in_metadata_db(['project1'])[1] + \
+                check_sample_and_project_ids_in_metadata_db(sample_project_list)
+            assert errors == [
+                f'Missing metadata for sample sample{i}'
+                    for i in range(2, 20)]
+    ## found keys are cached, missing samples are queried for each check
+    assert counter.get('query_count') == 3 + 39
@@ -1,7 +1,10 @@
 import json
 import os
+import gzip
+import hashlib
 import tempfile
 from io import BytesIO
+from app import app
 from app.models import IlluminaInteropData
 from app.interop_data_api import (
     load_interop_report,
@@ -83,3 +86,119 @@ def test_SeqrunInteropApi1(db, test_client, tmp_path):
             content_type='multipart/form-data')
     assert res.status_code == 200
     assert json.loads(res.data.decode('utf-8')).get("message") == 'successfully submitted interop report loading job for report.html'
+
+def test_SeqrunInteropApi_streaming_upload(db, test_client, tmp_path):
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    report_data = b'<h1>Its as test report</h1>' * 1000
+    upload_path = app.config['REPORT_UPLOAD_PATH']
+    app.config['REPORT_UPLOAD_PATH'] = str(tmp_path)
+    try:
+        res = \
+            test_client.post(
+                '/api/v1/interop_data/add_report',
+                data=dict(
+                    file=[
+                        (BytesIO(gzip.compress(report_data)), 'report1.html.gz'),
+                        (BytesIO(report_data), 'report2.html')],
+                    run_name="test1",
+                    tag=["test 1", "test 2"]),
+                headers={"Authorization": f"Bearer {token}"},
+                content_type='multipart/form-data')
+        assert res.status_code == 200
+        json_data = json.loads(res.data.decode('utf-8'))
+        assert json_data.get("message") == \
+            'successfully submitted interop report loading job for report1.html, report2.html'
+        reports = json_data.get('reports')
+        assert [r.get('file_name') for r in reports] == ['report1.html', 'report2.html']
+        assert reports[0].get('sha256') == hashlib.sha256(report_data).hexdigest()
+        assert reports[0].get('size') == len(report_data)
+        staged_files = \
+            os.listdir(os.path.join(tmp_path, 'interop_reports', '.staging'))
+        assert len(staged_files) == 2
+        ## worker only moves the staged file and adds the db record
+        load_interop_report(
+            run_name='test1',
+            tag='test 1',
+            file_path=os.path.join(tmp_path, 'interop_reports', '.staging', staged_files[0]),
+            base_path=os.path.join(tmp_path, 'interop_reports'),
+            file_name='report1.html',
+            move_file=True)
+        record = db.session.query(IlluminaInteropData).filter_by(run_name='test1').first()
+        assert os.path.basename(record.file_path) == 'report1.html'
+        with open(record.file_path, 'rb') as fp:
+            assert fp.read() == report_data
+        assert len(os.listdir(os.path.join(tmp_path, 'interop_reports', '.staging'))) == 1
+        ## one tag for each file
+        res = \
+            test_client.post(
+                '/api/v1/interop_data/add_report',
+                data=dict(
+                    file=[
+                        (BytesIO(report_data), 'report1.html'),
+                        (BytesIO(report_data), 'report2.html')],
+                    run_name="test1",
+                    tag="test 1"),
+                headers={"Authorization": f"Bearer {token}"},
+                content_type='multipart/form-data')
+        assert res.status_code == 400
+    finally:
+        app.config['REPORT_UPLOAD_PATH'] = upload_path
+
+def test_SeqrunInteropApi_failed_upload_cleanup(db, test_client, tmp_path):
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    upload_path = app.config['REPORT_UPLOAD_PATH']
+    app.config['REPORT_UPLOAD_PATH'] = str(tmp_path)
+    staging_dir = os.path.join(tmp_path, 'interop_reports', '.staging')
+    try:
+        ## second file is not a valid gzip file
+        res = \
+            test_client.post(
+                '/api/v1/interop_data/add_report',
+                data=dict(
+                    file=[
+                        (BytesIO(b'<h1>Its as test report</h1>'), 'report1.html'),
+                        (BytesIO(b'not gzip'), 'report2.html.gz')],
+                    run_name="test1",
+                    tag=["test 1", "test 2"]),
+                headers={"Authorization": f"Bearer {token}"},
+                content_type='multipart/form-data')
+        assert res.status_code == 500
+        assert os.listdir(staging_dir) == []
+    finally:
+        app.config['REPORT_UPLOAD_PATH'] = upload_path
+    ## failed job removes the staged file
+    staged_path = os.path.join(staging_dir, 'upload_1.part')
+    with open(staged_path, 'w') as fp:
+        fp.write('<h1>Its as test report</h1>')
+    store_file = os.path.join(tmp_path, 'not_a_dir')
+    with open(store_file, 'w') as fp:
+        fp.write('')
+    async_load_interop_report(
+        run_name='test1',
+        tag='test 1',
+        file_path=staged_path,
+        base_path=store_file,
+        file_name='report.html',
+        move_file=True)
+    assert not os.path.exists(staged_path)
+    assert db.session.query(IlluminaInteropData).count() == 0
@@ -0,0 +1,147 @@
+import os
+import json
+import datetime
+import pytest
+from app.models import IlluminaInteropLaneMetrics
+from app.interop_data_api import load_interop_report
+from app.interop_metrics_util import (
+    get_run_instrument_and_date,
+    parse_interop_table_data,
+    load_interop_metrics,
+    load_interop_metrics_from_report,
+    get_interop_metrics_trend)
+from benchmarks.benchmark_db import count_db_queries
+from flask_appbuilder.const import (
+    API_SECURITY_PASSWORD_KEY,
+    API_SECURITY_PROVIDER_KEY,
+    API_SECURITY_USERNAME_KEY)
+
+INTEROP_JSON = 'data/interop_example.json'
+
+def _get_table_data():
+    with open(INTEROP_JSON, 'r') as fp:
+        return json.load(fp).get('table_data')
+
+def _add_runs(db, instrument, count, q30_pct=90.0):
+    for i in range(1, count + 1):
+        run_name = f"2001{i:02d}_{instrument}_{i}_AAACWLNM5"
+        load_interop_metrics(
+            run_name=run_name,
+            metrics_list=[{
+                'lane_id': 1,
+                'read_id': read_id,
+                'index_read': 'N',
+                'q30_pct': q30_pct + i}
+                    for read_id in (1, 2)])
+
+def test_get_run_instrument_and_date():
+    assert get_run_instrument_and_date('200505_MP2-14_94_AAACWLNM5') == \
+        ('MP2-14', datetime.date(2020, 5, 5))
+    assert get_run_instrument_and_date('run1') == ('UNKNOWN', None)
+    assert get_run_instrument_and_date('test_run') == ('UNKNOWN', None)
+
+def test_parse_interop_table_data():
+    metrics_list = \
+        parse_interop_table_data(_get_table_data())
+    assert len(metrics_list) == 3
+    assert metrics_list[0]['lane_id'] == 1
+    assert metrics_list[0]['read_id'] == 1
+    assert metrics_list[0]['q30_pct'] == 94.05
+    assert metrics_list[0]['yield_gb'] == 16.39
+    assert metrics_list[0]['cluster_pf'] == 0.83
+    assert metrics_list[0]['phasing_slope'] == 0.122
+    assert metrics_list[1]['index_read'] == 'Y'
+    assert metrics_list[2]['cycles'] == 91
+    assert parse_interop_table_data('<h1>Its as test report</h1>') == []
+
+def test_load_interop_metrics_from_report(db, tmp_path):
+    assert load_interop_metrics_from_report(
+        run_name='200505_MP2-14_94_AAACWLNM5',
+        file_path=INTEROP_JSON) == 3
+    report_path = os.path.join(tmp_path, 'report.html')
+    with open(report_path, 'w') as fp:
+        fp.write(f"<html><body><h1>Report</h1>{_get_table_data()}</body></html>")
+    ## metrics are replaced for a run
+    load_interop_report(
+        run_name='200505_MP2-14_94_AAACWLNM5',
+        tag='test 1',
+        file_path=report_path,
+        base_path=os.path.join(tmp_path, 'store'))
+    records = \
+        db.session.\
+            query(IlluminaInteropLaneMetrics).\
+            order_by(IlluminaInteropLaneMetrics.read_id).\
+            all()
+    assert len(records) == 3
+    assert records[0].instrument == 'MP2-14'
+    assert records[0].run_date == datetime.date(2020, 5, 5)
+    assert records[2].q30_pct == 91.35
+    ## reports without metrics are skipped
+    plot_path = os.path.join(tmp_path, 'plot.png')
+    with open(plot_path, 'wb') as fp:
+        fp.write(b'png')
+    assert load_interop_metrics_from_report(
+        run_name='run1',
+        file_path=plot_path) == 0
+
+def test_get_interop_metrics_trend(db):
+    _add_runs(db, 'MP2-14', 5)
+    _add_runs(db, 'A01234', 3, q30_pct=80.0)
+    with count_db_queries() as counter:
+        trend = \
+            get_interop_metrics_trend(
+                metric='q30_pct',
+                instrument='MP2-14',
+                read_id=1,
+                limit=3)
+    assert counter.get('query_count') == 1
+    assert [i['run_name'] for i in trend] == [
+        '200103_MP2-14_3_AAACWLNM5',
+        '200104_MP2-14_4_AAACWLNM5',
+        '200105_MP2-14_5_AAACWLNM5']
+    assert [i['value'] for i in trend] == [93.0, 94.0, 95.0]
+    assert trend[0]['run_date'] == '2020-01-03'
+    trend = \
+        get_interop_metrics_trend(
+            metric='q30_pct',
+            limit=2)
+    assert len(trend) == 4
+    assert set(i['run_name'] for i in trend) == {
+        '200105_MP2-14_5_AAACWLNM5',
+        '200104_MP2-14_4_AAACWLNM5'}
+    with pytest.raises(ValueError):
+        get_interop_metrics_trend(metric='run_name')
+    with pytest.raises(ValueError):
+        get_interop_metrics_trend(metric='q30_pct', limit=501)
+
+def test_metrics_trend_api(db, test_client):
+    _add_runs(db, 'MP2-14', 3)
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    res = \
+        test_client.get(
+            '/api/v1/interop_data/metrics_trend?metric=q30_pct&instrument=MP2-14&lane_id=1&read_id=2',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    json_data = json.loads(res.data.decode("utf-8"))
+    assert json_data['metric'] == 'q30_pct'
+    assert [i['value'] for i in json_data['trend']] == [91.0, 92.0, 93.0]
+    res = \
+        test_client.get(
+            '/api/v1/interop_data/metrics_trend?metric=file_path',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    res = \
+        test_client.get(
+            '/api/v1/interop_data/metrics_trend?limit=1000',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
@@ -22,7 +22,8 @@ from app.metadata.metadata_util import (
     # cleanup_and_load_new_data_to_metadata_tables,
     check_for_projects_in_metadata_db,
     check_sample_and_project_ids_in_metadata_db,
-    check_user_name_and_email_in_metadata_db)
+    check_user_name_and_email_in_metadata_db,
+    get_user_name_and_email_lookup)
 
 # def test_backup_specific_portal_tables(db, tmp_path):
 #     project3 = \
@@ -452,5 +453,35 @@ def test_check_user_name_and_email_in_metadata_db(db, tmp_path):
         # self.assertEqual(len(errors), 0)
         assert len(errors) == 0
 
+def test_get_user_name_and_email_lookup(db):
+    users = [
+        IgfUser(user_id=i + 1, name=f'User {i}', email_id=f'{i}@g.com')
+            for i in range(5)]
+    users.append(IgfUser(user_id=6, name='User 0', email_id='x@g.com'))
+    try:
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    name_dict, email_dict = \
+        get_user_name_and_email_lookup(
+            name_list=['User 0', 'User 1', 'User 9'],
+            email_list=['2@g.com', '3@g.com', '4@g.com', '9@g.com'],
+            chunk_size=2)
+    assert name_dict == {'User 0': 'x@g.com', 'User 1': '1@g.com'}
+    assert email_dict == {'2@g.com': 'User 2', '3@g.com': 'User 3', '4@g.com': 'User 4'}
+    data1 = [
+        {'name': 'User 1', 'email_id': '1@g.com'},
+        {'name': 'User 2', 'email_id': '1@g.com'},
+        {'name': 'User 2', 'email_id': '1@g.com'}]
+    errors = \
+        check_user_name_and_email_in_metadata_db(data1)
+    assert errors == [
+        "User User 2 registered with email id 2@g.com, not 1@g.com",
+        "Email 1@g.com registered with name User 1, not User 2"]
+    assert check_user_name_and_email_in_metadata_db([]) == []
+
 # if __name__ == '__main__':
 #   unittest.main()
\ No newline at end of file
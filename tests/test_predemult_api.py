@@ -1,7 +1,9 @@
 import json
 import os
+import gzip
 import tempfile
 from io import BytesIO
+from app import app
 from app.models import PreDeMultiplexingData
 from app.pre_demultiplexing_data_api import (
     load_predemult_report,
@@ -86,3 +88,58 @@ def test_PreDeMultiplexingDataApi1(db, test_client, tmp_path):
             content_type='multipart/form-data')
     assert res.status_code == 200
     assert json.loads(res.data.decode('utf-8')).get("message") == 'successfully submitted demult report loading job for report.html'
+
+def test_PreDeMultiplexingDataApi_gzip_upload(db, test_client, tmp_path):
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    report_data = b'<h1>Its as test report</h1>'
+    upload_path = app.config['REPORT_UPLOAD_PATH']
+    app.config['REPORT_UPLOAD_PATH'] = str(tmp_path)
+    try:
+        res = \
+            test_client.post(
+                '/api/v1/predemultiplexing_data/add_report',
+                data=dict(
+                    file=(BytesIO(gzip.compress(report_data)), 'report.html.gz'),
+                    run_name="test1",
+                    samplesheet_tag="test 1"),
+                headers={"Authorization": f"Bearer {token}"},
+                content_type='multipart/form-data')
+        assert res.status_code == 200
+        json_data = json.loads(res.data.decode('utf-8'))
+        assert json_data.get("message") == \
+            'successfully submitted demult report loading job for report.html'
+        staging_dir = \
+            os.path.join(tmp_path, 'predemult_reports', '.staging')
+        staged_files = os.listdir(staging_dir)
+        assert len(staged_files) == 1
+        with open(os.path.join(staging_dir, staged_files[0]), 'rb') as fp:
+            assert fp.read() == report_data
+    finally:
+        app.config['REPORT_UPLOAD_PATH'] = upload_path
+
+def test_async_load_predemult_report_cleanup(db, tmp_path):
+    staged_path = os.path.join(tmp_path, 'upload_1.part')
+    with open(staged_path, 'w') as fp:
+        fp.write('<h1>Its as test report</h1>')
+    store_file = os.path.join(tmp_path, 'not_a_dir')
+    with open(store_file, 'w') as fp:
+        fp.write('')
+    async_load_predemult_report(
+        run_name='test1',
+        tag_name='test 1',
+        file_path=staged_path,
+        base_path=store_file,
+        file_name='report.html',
+        move_file=True)
+    assert not os.path.exists(staged_path)
+    assert db.session.query(PreDeMultiplexingData).count() == 0
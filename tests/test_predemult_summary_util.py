@@ -0,0 +1,187 @@
+import os
+import json
+import shutil
+import datetime
+import pandas as pd
+from app.models import (
+    PreDeMultiplexingSampleSummary,
+    PreDeMultiplexingUndeterminedBarcode)
+from app.pre_demultiplexing_data_api import load_predemult_report
+from app.predemult_summary_util import (
+    parse_demult_summary_tables,
+    load_demult_summary,
+    load_demult_summary_from_report,
+    get_low_read_count_samples,
+    get_recurrent_undetermined_barcodes)
+from flask_appbuilder.const import (
+    API_SECURITY_PASSWORD_KEY,
+    API_SECURITY_PROVIDER_KEY,
+    API_SECURITY_USERNAME_KEY)
+
+BCLCONVERT_REPORT = 'static/predemult/bclconvert_report_v0.03.html'
+
+def _get_run_name(days_ago, flowcell):
+    run_date = \
+        datetime.date.today() - datetime.timedelta(days=days_ago)
+    return f"{run_date.strftime('%y%m%d')}_A01234_0001_{flowcell}"
+
+def _add_summary(db, run_name, read_count, barcodes):
+    load_demult_summary(
+        run_name=run_name,
+        samplesheet_tag='tag1',
+        samples=[{
+            'lane_id': 1,
+            'sample_id': sample_id,
+            'project_name': 'project1',
+            'read_count': read_count}
+                for sample_id in ('IGF001', 'Undetermined')],
+        undetermined_barcodes=[{
+            'lane_id': 1,
+            'barcode': barcode,
+            'read_count': 1000}
+                for barcode in barcodes])
+
+def test_parse_demult_summary_tables():
+    tables = pd.read_html(BCLCONVERT_REPORT, flavor='lxml')
+    summary = parse_demult_summary_tables(tables)
+    assert len(summary['samples']) == 18
+    assert summary['samples'][0] == {
+        'lane_id': 1,
+        'project_name': 'IGFQ001580_johnson_4-5-2023_10x-GEX',
+        'sample_id': 'IGF125385',
+        'sample_name': 'sc06',
+        'index_sequence': 'TCCCAAGGGT-AAAGGTAGTA',
+        'read_count': 351247,
+        'read_pct': 0.0852,
+        'perfect_index_pct': 0.8327,
+        'q30_pct': 0.875,
+        'mean_quality_score': 31.9}
+    assert summary['undetermined_barcodes'][0]['barcode'] == 'GAACGGTTAT-ATTCCTCCGT'
+    assert all(
+        len([i for i in summary['undetermined_barcodes'] if i['lane_id'] == lane_id]) <= 20
+            for lane_id in (1, 2))
+    assert parse_demult_summary_tables([]) == {
+        'samples': [], 'undetermined_barcodes': []}
+
+def test_load_demult_summary_from_report(db, tmp_path):
+    run_name = _get_run_name(1, 'HXXXXXXXX')
+    report_path = os.path.join(tmp_path, 'report.html')
+    shutil.copy(BCLCONVERT_REPORT, report_path)
+    for _ in range(2):
+        load_predemult_report(
+            run_name=run_name,
+            tag_name='tag1',
+            file_path=report_path,
+            base_path=os.path.join(tmp_path, 'store'))
+    ## summary is replaced for the run and samplesheet
+    assert db.session.query(PreDeMultiplexingSampleSummary).count() == 18
+    record = \
+        db.session.\
+            query(PreDeMultiplexingSampleSummary).\
+            filter_by(lane_id=2, sample_id='IGF125385').\
+            one()
+    assert record.run_date == datetime.date.today() - datetime.timedelta(days=1)
+    assert record.samplesheet_tag == 'tag1'
+    assert db.session.query(PreDeMultiplexingUndeterminedBarcode).count() > 0
+    ## json payload with gviz tables for each lane
+    payload_path = os.path.join(tmp_path, 'payload.json')
+    with open(payload_path, 'w') as fp:
+        json.dump({
+            'sample_table': {
+                '1': json.dumps({
+                    'cols': [
+                        {'id': 'Sample_ID', 'label': 'Sample_ID', 'type': 'string'},
+                        {'id': 'Sample_Project', 'label': 'Sample_Project', 'type': 'string'},
+                        {'id': 'Barcode sequence', 'label': 'Barcode sequence', 'type': 'string'},
+                        {'id': 'PF Clusters', 'label': 'PF Clusters', 'type': 'number'}],
+                    'rows': [
+                        {'c': [{'v': 'IGF001'}, {'v': 'project1'}, {'v': 'AAAA'}, {'v': 100}]}]})},
+            'undetermined_table': {
+                '1': {
+                    'cols': [
+                        {'id': 'Barcode', 'label': 'Barcode', 'type': 'string'},
+                        {'id': 'Reads', 'label': 'Reads', 'type': 'number'}],
+                    'rows': [{'c': [{'v': 'GGGG'}, {'v': 50}]}]}}}, fp)
+    assert load_demult_summary_from_report(
+        run_name='run1',
+        samplesheet_tag='tag1',
+        file_path=payload_path) == {'samples': 1, 'undetermined_barcodes': 1}
+    record = \
+        db.session.\
+            query(PreDeMultiplexingSampleSummary).\
+            filter_by(run_name='run1').\
+            one()
+    assert record.index_sequence == 'AAAA'
+    assert record.read_count == 100
+    assert record.run_date is None
+    ## payloads without the tables are skipped
+    assert load_demult_summary_from_report(
+        run_name='run2',
+        samplesheet_tag='tag1',
+        file_path='data/demultiplexing_example.json') == \
+            {'samples': 0, 'undetermined_barcodes': 0}
+
+def test_get_low_read_count_samples(db):
+    _add_summary(db, _get_run_name(1, 'A'), 100, [])
+    _add_summary(db, _get_run_name(5, 'B'), 5000, [])
+    _add_summary(db, _get_run_name(60, 'C'), 100, [])
+    samples = \
+        get_low_read_count_samples(
+            max_read_count=1000)
+    assert [(i['run_name'], i['sample_id']) for i in samples] == \
+        [(_get_run_name(1, 'A'), 'IGF001')]
+    assert len(get_low_read_count_samples(max_read_count=1000, days=90)) == 2
+    assert get_low_read_count_samples(
+        max_read_count=1000, project_name='project2') == []
+
+def test_get_recurrent_undetermined_barcodes(db):
+    _add_summary(db, _get_run_name(1, 'A'), 100, ['AAAA', 'CCCC'])
+    _add_summary(db, _get_run_name(2, 'B'), 100, ['AAAA', 'GGGG'])
+    _add_summary(db, _get_run_name(3, 'C'), 100, ['AAAA', 'CCCC'])
+    _add_summary(db, _get_run_name(60, 'D'), 100, ['GGGG'])
+    barcodes = get_recurrent_undetermined_barcodes()
+    assert [(i['barcode'], i['run_count']) for i in barcodes] == \
+        [('AAAA', 3), ('CCCC', 2)]
+    assert barcodes[0]['read_count'] == 3000
+    assert barcodes[0]['last_run_date'] == \
+        (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    barcodes = get_recurrent_undetermined_barcodes(days=90, min_runs=3)
+    assert [i['barcode'] for i in barcodes] == ['AAAA']
+
+def test_demult_summary_api(db, test_client):
+    _add_summary(db, _get_run_name(1, 'A'), 100, ['AAAA'])
+    _add_summary(db, _get_run_name(2, 'B'), 100, ['AAAA'])
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    res = \
+        test_client.get(
+            '/api/v1/predemultiplexing_data/low_read_samples?max_read_count=1000&days=7',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert len(json.loads(res.data.decode("utf-8"))['samples']) == 2
+    res = \
+        test_client.get(
+            '/api/v1/predemultiplexing_data/low_read_samples',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    res = \
+        test_client.get(
+            '/api/v1/predemultiplexing_data/undetermined_barcodes?days=7',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    barcodes = json.loads(res.data.decode("utf-8"))['barcodes']
+    assert [(i['barcode'], i['run_count']) for i in barcodes] == [('AAAA', 2)]
+    res = \
+        test_client.get(
+            '/api/v1/predemultiplexing_data/undetermined_barcodes?limit=0',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
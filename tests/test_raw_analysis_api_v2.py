@@ -134,5 +134,56 @@ def test_raw_analysis_api1(db, test_client, tmp_path):
             '/api/v1/raw_analysis_v2/mark_analysis_synched/3',
             headers={"Authorization": f"Bearer {token}"})
     assert json.loads(res.data.decode('utf-8')).get('status') == 'failed'
-
-
+    raw_analysis3 = \
+        RawAnalysisV2(
+            analysis_name='raw_analysis3',
+            analysis_yaml=analysis_yaml,
+            project=project1,
+            pipeline=pipeline1,
+            status='VALIDATED')
+    raw_analysis4 = \
+        RawAnalysisV2(
+            analysis_name='raw_analysis4',
+            analysis_yaml=analysis_yaml,
+            project=project1,
+            pipeline=pipeline1,
+            status='VALIDATED')
+    try:
+        db.session.add(raw_analysis3)
+        db.session.add(raw_analysis4)
+        db.session.flush()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    res = \
+        test_client.post(
+            '/api/v1/raw_analysis_v2/mark_analysis_rejected/3',
+            headers={"Authorization": f"Bearer {token}"})
+    assert json.loads(res.data.decode('utf-8')).get('status') == 'success'
+    res = \
+        test_client.post(
+            '/api/v1/raw_analysis_v2/mark_analysis_rejected/3',
+            headers={"Authorization": f"Bearer {token}"})
+    assert json.loads(res.data.decode('utf-8')).get('status') == 'failed'
+    res = \
+        test_client.post(
+            '/api/v1/raw_analysis_v2/mark_analysis_list_synched',
+            headers={"Authorization": f"Bearer {token}"},
+            json={'id_list': [2, 3, 4]})
+    assert res.status_code == 200
+    json_data = json.loads(res.data.decode('utf-8'))
+    assert json_data.get('updated') == [4]
+    assert json_data.get('skipped') == [2, 3]
+    res = \
+        test_client.post(
+            '/api/v1/raw_analysis_v2/mark_analysis_list_rejected',
+            headers={"Authorization": f"Bearer {token}"},
+            json={'id_list': 'x'})
+    assert res.status_code == 400
+    statuses = dict(
+        db.session.\
+            query(RawAnalysisV2.raw_analysis_id, RawAnalysisV2.status).\
+            all())
+    assert statuses == {
+        1: 'FAILED', 2: 'SYNCHED', 3: 'REJECTED', 4: 'SYNCHED'}
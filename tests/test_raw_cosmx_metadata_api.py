@@ -59,4 +59,31 @@ def test_raw_cosmx_metadata_api1(db, test_client, tmp_path):
             filter(RawCosMxMetadataModel.raw_cosmx_metadata_id==1).\
             one_or_none()
     assert records is not None
-    assert records[0] == 'SYNCHED'
\ No newline at end of file
+    assert records[0] == 'SYNCHED'
+    assert json.loads(res.data.decode('utf-8')).get('status') == 'success'
+    ## retried calls for already synced metadata are a success
+    res = \
+        test_client.get(
+            '/api/v1/raw_cosmx_metadata/mark_ready_metadata_as_synced/1',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    json_data = json.loads(res.data.decode('utf-8'))
+    assert json_data.get('message') == 'metadata synced'
+    assert json_data.get('status') == 'success'
+    assert json_data.get('skipped') == [1]
+    ## unknown metadata is not synced
+    res = \
+        test_client.get(
+            '/api/v1/raw_cosmx_metadata/mark_ready_metadata_as_synced/100',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert json.loads(res.data.decode('utf-8')).get('status') == 'failed'
+    res = test_client.post(
+        '/api/v1/raw_cosmx_metadata/mark_metadata_list_as_synced',
+        headers={"Authorization": f"Bearer {token}"},
+        json={'id_list': [1]}
+    )
+    assert res.status_code == 200
+    json_data = json.loads(res.data.decode('utf-8'))
+    assert json_data.get('updated') == []
+    assert json_data.get('skipped') == [1]
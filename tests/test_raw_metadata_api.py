@@ -1,5 +1,6 @@
 import json
 import os
+import gzip
 from io import BytesIO
 from app.models import (
     RawMetadataModel)
@@ -175,4 +176,83 @@ def test_raw_metadata_api1(db, test_client, tmp_path):
             one_or_none()
     assert records is not None
     assert records[0] == 'SYNCHED'
-
+    assert json.loads(res.data.decode('utf-8')).get('status') == 'success'
+    ## retried calls for already synced metadata are a success
+    res = \
+        test_client.get(
+            '/api/v1/raw_metadata/mark_ready_metadata_as_synced/4',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    json_data = json.loads(res.data.decode('utf-8'))
+    assert json_data.get('message') == 'metadata synced'
+    assert json_data.get('status') == 'success'
+    assert json_data.get('skipped') == [4]
+    ## unknown metadata is not synced
+    res = \
+        test_client.get(
+            '/api/v1/raw_metadata/mark_ready_metadata_as_synced/100',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert json.loads(res.data.decode('utf-8')).get('status') == 'failed'
+    metadata_file_data = \
+        BytesIO(
+            gzip.compress(
+                b'[{"metadata_tag": "test2", "raw_csv_data": [{"project_id": "c","sample_id": "d"}], '
+                b'"formatted_csv_data": [{"project_id": "c","sample_id": "d"}]}, '
+                b'{"metadata_tag": "test_gz", "raw_csv_data": [{"project_id": "e","sample_id": "f"}], '
+                b'"formatted_csv_data": [{"project_id": "e","sample_id": "f"}]}]'))
+    res = \
+        test_client.post(
+            '/api/v1/raw_metadata/add_metadata',
+            headers={"Authorization": f"Bearer {token}"},
+            data=dict(file=(metadata_file_data, 'test.json.gz')),
+            content_type='multipart/form-data',
+            follow_redirects=True)
+    assert res.status_code == 200
+    result = \
+        db.session.\
+            query(RawMetadataModel.formatted_csv_data).\
+            filter(RawMetadataModel.metadata_tag=='test_gz').\
+            one_or_none()
+    assert result is not None
+    assert result[0] == 'project_id,sample_id\ne,f\n'
+    try:
+        for tag in ('test5', 'test6', 'test7'):
+            db.session.add(
+                RawMetadataModel(
+                    metadata_tag=tag,
+                    raw_csv_data='raw',
+                    formatted_csv_data=f'{tag}\n"a,b"\n',
+                    status='READY',
+                    report=''))
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    res = \
+        test_client.get(
+            '/api/v1/raw_metadata/download_ready_metadata?limit=2',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert json.loads(res.data.decode('utf-8')) == {
+        'test5': 'test5\n"a,b"\n',
+        'test6': 'test6\n"a,b"\n'}
+    next_cursor = res.headers.get('X-Next-Cursor')
+    assert next_cursor is not None
+    res = \
+        test_client.get(
+            f'/api/v1/raw_metadata/download_ready_metadata?limit=2&cursor={next_cursor}',
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers.get('Content-Encoding') == 'gzip'
+    assert res.headers.get('X-Next-Cursor') is None
+    assert json.loads(gzip.decompress(res.data).decode('utf-8')) == {
+        'test7': 'test7\n"a,b"\n'}
+    res = \
+        test_client.get(
+            '/api/v1/raw_metadata/download_ready_metadata?limit=0',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
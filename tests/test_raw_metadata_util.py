@@ -1,16 +1,27 @@
+import json
+import gzip
+import random
+import pytest
+import numpy as np
+import pandas as pd
 from app.models import (
     RawMetadataModel,
     Project,
     Sample)
+from io import BytesIO, StringIO
 from unittest.mock import patch
 from app.raw_metadata.raw_metadata_util import (
     _run_metadata_json_validation,
+    _run_metadata_validation_stages,
     _validate_metadata_library_type,
+    _validate_metadata_library_types,
+    EXPERIMENT_TYPE_LOOKUP,
     _set_metadata_validation_status,
     validate_raw_metadata_and_set_db_status,
     compare_metadata_sample_with_db,
     search_metadata_table_and_get_new_projects,
-    parse_and_add_new_raw_metadata)
+    parse_and_add_new_raw_metadata,
+    iter_json_list_items)
 from app.raw_metadata_view import (
     async_validate_metadata)
 
@@ -26,6 +37,35 @@ def test_run_metadata_json_validation():
     assert len([err for err in errors if 'c.s#email.ac.uk' in err]) == 1
     assert isinstance(errors[0], str)
 
+def test_run_metadata_validation_stages(db):
+    metadata_df = pd.read_csv("data/metadata_file1.csv")
+    errors = _run_metadata_json_validation(
+        schema_json="app/raw_metadata/metadata_validation.json",
+        metadata_df=metadata_df
+    )
+    file_errors = _run_metadata_json_validation(
+        metadata_file="data/metadata_file1.csv",
+        schema_json="app/raw_metadata/metadata_validation.json"
+    )
+    assert errors == file_errors
+    stage_timings = dict()
+    errors = _run_metadata_validation_stages(
+        metadata_df=metadata_df,
+        check_db=True,
+        stage_timings=stage_timings
+    )
+    assert set(file_errors).issubset(errors)
+    assert set(stage_timings.keys()) == \
+        {'schema', 'duplicate', 'library_type', 'igfdb'}
+    assert all(t >= 0 for t in stage_timings.values())
+    stage_timings = dict()
+    _ = _run_metadata_validation_stages(
+        metadata_df=metadata_df,
+        check_db=False,
+        stage_timings=stage_timings
+    )
+    assert 'igfdb' not in stage_timings
+
 def test_validate_metadata_library_type():
     err = _validate_metadata_library_type(
         sample_id='test1',
@@ -42,6 +82,58 @@ def test_validate_metadata_library_type():
     )
     assert err is not None
 
+def test_validate_metadata_library_types():
+    rng = random.Random(1)
+    library_sources = \
+        list(set(e['library_source'] for e in EXPERIMENT_TYPE_LOOKUP)) + \
+        ['GENOMIC_SINGLE_CELL', np.nan]
+    library_strategies = \
+        list(set(e['library_strategy'] for e in EXPERIMENT_TYPE_LOOKUP)) + \
+        ['UNKNOWN', np.nan]
+    experiment_types = \
+        list(set(e['experiment_type'] for e in EXPERIMENT_TYPE_LOOKUP)) + \
+        ['UNKNOWN', 'CHIP-Seq', np.nan]
+    metadata_df = pd.DataFrame([{
+        'sample_igf_id': f'IGF{i}',
+        'library_source': rng.choice(library_sources),
+        'library_strategy': rng.choice(library_strategies),
+        'experiment_type': rng.choice(experiment_types)}
+            for i in range(2000)])
+    ## rows copied from the lookup are valid
+    valid_df = \
+        pd.DataFrame(EXPERIMENT_TYPE_LOOKUP).\
+            assign(sample_igf_id='IGF0')
+    metadata_df = pd.concat([metadata_df, valid_df], ignore_index=True)
+    expected_errors = dict()
+    for row_index, entry in metadata_df.iterrows():
+        err = \
+            _validate_metadata_library_type(
+                sample_id=entry['sample_igf_id'],
+                library_source=entry['library_source'],
+                library_strategy=entry['library_strategy'],
+                experiment_type=entry['experiment_type'])
+        if err is not None:
+            expected_errors[row_index] = err
+    errors = \
+        _validate_metadata_library_types(
+            metadata_df=metadata_df)
+    assert len(expected_errors) > 0
+    assert errors.to_dict() == expected_errors
+    errors = \
+        _validate_metadata_library_types(
+            metadata_df=valid_df)
+    assert len(errors) == 0
+    errors = \
+        _validate_metadata_library_types(
+            metadata_df=pd.DataFrame([{
+                'sample_igf_id': 'IGF1',
+                'library_source': 'GENOMIC',
+                'library_strategy': 'CHIP-SEQ',
+                'experiment_type': 'CHIP-Seq'}]))
+    assert errors.to_dict() == {
+        0: 'IGF1: library_strategy CHIP-SEQ or experiment_type CHIP-Seq '
+           + 'is not compatible with library_source GENOMIC'}
+
 def test_set_metadata_validation_status(db):
     metadata = RawMetadataModel(
         raw_metadata_id=1,
@@ -248,4 +340,45 @@ def test_parse_and_add_new_raw_metadata(db):
     )
     results = [i[0] for i in results]
     assert len(results) == 2
-    assert 'test1' in results
\ No newline at end of file
+    assert 'test1' in results
+    metadata_list = [{
+        'metadata_tag': f'test{i}',
+        'raw_csv_data': json.dumps([{'project_id': f'p{i}', 'sample_id': f's{i}'}]),
+        'formatted_csv_data': [{'project_id': f'p{i}', 'sample_id': f's{i}'}]}
+            for i in range(1, 8)]
+    metadata_list.append(metadata_list[-1])
+    json_file = BytesIO(gzip.compress(json.dumps(metadata_list).encode()))
+    with gzip.open(json_file, 'rb') as fp:
+        new_entries = \
+            parse_and_add_new_raw_metadata(
+                data=fp,
+                chunk_size=3)
+    assert new_entries == 5
+    results = (
+        db.session
+        .query(
+            RawMetadataModel.metadata_tag,
+            RawMetadataModel.formatted_csv_data)
+        .all()
+    )
+    results = dict(results)
+    assert len(results) == 7
+    assert results.get('test7') == 'project_id,sample_id\np7,s7\n'
+    with pytest.raises(ValueError):
+        parse_and_add_new_raw_metadata(
+            data=[{'metadata_tag': 'test8', 'raw_csv_data': []}])
+    assert db.session.query(RawMetadataModel).count() == 7
+
+
+def test_iter_json_list_items():
+    data = [{'metadata_tag': 'test1', 'raw_csv_data': [{'a': 'é' * 10, 'b': 1}]}, 2, 'c', None]
+    json_data = json.dumps(data, ensure_ascii=False).encode()
+    for chunk_size in (1, 3, 100):
+        assert list(
+            iter_json_list_items(
+                BytesIO(json_data),
+                chunk_size=chunk_size)) == data
+    with pytest.raises(TypeError):
+        list(iter_json_list_items(StringIO('{"a": 1}')))
+    with pytest.raises(ValueError):
+        list(iter_json_list_items(StringIO('[1, 2'), chunk_size=2))
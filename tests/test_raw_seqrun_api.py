@@ -3,7 +3,9 @@ import os
 from io import BytesIO
 from app.models import (
     RawSeqrun,
-    SampleSheetModel)
+    SampleSheetModel,
+    SampleSheetVariantModel)
+from app.samplesheet.samplesheet_util import update_samplesheet_validation_entry_in_db
 from flask_appbuilder.const import (
     API_SECURITY_PASSWORD_KEY,
     API_SECURITY_PROVIDER_KEY,
@@ -60,4 +62,139 @@ def test_raw_seqrun_api(db, test_client, tmp_path):
             query(RawSeqrun.raw_seqrun_igf_id).\
             filter(RawSeqrun.raw_seqrun_igf_id=="run3").\
             one_or_none()
-    assert records is not None
\ No newline at end of file
+    assert records is not None
+def test_get_run_samplesheet(db, test_client):
+    res = \
+        test_client.post(
+            "/api/v1/security/login",
+            json={
+                API_SECURITY_USERNAME_KEY: "admin",
+                API_SECURITY_PASSWORD_KEY: "password",
+                API_SECURITY_PROVIDER_KEY: "db"})
+    assert res.status_code == 200
+    token = \
+        json.loads(res.data.decode("utf-8")).\
+            get("access_token")
+    with open("data/SampleSheet_v1.csv", 'r') as fp:
+        csv_data = fp.read()
+    samplesheet = \
+        SampleSheetModel(
+            samplesheet_id=1,
+            samplesheet_tag='test 1',
+            csv_data=csv_data)
+    raw_seqrun = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run1',
+            samplesheet_id=1,
+            override_cycles='Y151;I8;I8;Y151')
+    try:
+        db.session.add(samplesheet)
+        db.session.add(raw_seqrun)
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_run_samplesheet/run1',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
+    update_samplesheet_validation_entry_in_db(
+        samplesheet_tag='test 1',
+        report='',
+        status='pass')
+    variants = (
+        db.session
+        .query(SampleSheetVariantModel.variant_type)
+        .filter(SampleSheetVariantModel.samplesheet_id==1)
+        .all()
+    )
+    assert len(variants) == 3
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_run_samplesheet/run1',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert res.data.decode('utf-8') == csv_data
+    etag = res.headers.get('ETag')
+    assert etag is not None
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_run_samplesheet/run1',
+            headers={
+                "Authorization": f"Bearer {token}",
+                "If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.data == b''
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_run_samplesheet/run1?variant=V2',
+            headers={
+                "Authorization": f"Bearer {token}",
+                "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers.get('ETag') != etag
+    assert '[BCLConvert_Data]' in res.data.decode('utf-8')
+    assert 'test_1_V2.csv' in res.headers.get('Content-Disposition')
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_run_samplesheet/run1?variant=V3',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    res = \
+        test_client.post(
+            '/api/v1/raw_seqrun/search_run_samplesheet',
+            headers={"Authorization": f"Bearer {token}"},
+            data=dict(file=(BytesIO(b'{"seqrun_id":"run1", "variant":"I5_RC"}'), 'test.json')),
+            content_type='multipart/form-data')
+    assert res.status_code == 200
+    assert res.headers.get('ETag') is not None
+    assert 'test_1_I5_RC.csv' in res.headers.get('Content-Disposition')
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_split_samplesheets/run1',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    split_samplesheets = res.json.get('samplesheets')
+    assert len(split_samplesheets) == 5
+    assert split_samplesheets[0]['lane'] == '1'
+    assert split_samplesheets[0]['override_cycles'] == 'Y151;I8;I8;Y151'
+    assert '[BCLConvert_Data]' in split_samplesheets[0]['csv_data']
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_split_samplesheets/run2',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_index_collisions/run1?mismatches=1',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 200
+    assert res.json.get('collisions')[0]['samples'] == ['IGF0008', 'IGF0009']
+    assert res.json.get('lane_mismatches')['1'] == 2
+    assert res.json.get('lane_mismatches')['5'] is None
+    assert res.json.get('mismatches') is None
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_index_collisions/run1?mismatches=one',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 400
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_index_collisions/run2',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
+    ## samplesheet changed after validation
+    (
+        db.session
+        .query(SampleSheetModel)
+        .filter(SampleSheetModel.samplesheet_id==1)
+        .update({'csv_data': csv_data + '\n'})
+    )
+    db.session.commit()
+    res = \
+        test_client.get(
+            '/api/v1/raw_seqrun/get_run_samplesheet/run1',
+            headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
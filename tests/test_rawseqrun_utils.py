@@ -1,4 +1,4 @@
-import os, unittest, tempfile
+import os, json, unittest, tempfile
 # from app import db
 from datetime import datetime
 from app.models import SampleSheetModel, RawSeqrun
@@ -8,6 +8,9 @@ from app.raw_seqrun.raw_seqrun_util import fetch_samplesheet_for_seqrun
 from app.raw_seqrun.raw_seqrun_util import change_raw_run_status
 from app.raw_seqrun.raw_seqrun_util import check_and_filter_raw_seqruns_after_checking_samplesheet
 from app.raw_seqrun.raw_seqrun_util import check_and_add_new_raw_seqrun
+from app.raw_seqrun.raw_seqrun_util import fetch_index_collisions_for_seqrun
+from app.raw_seqrun.raw_seqrun_util import get_read_cycles_from_run_config
+from app.raw_seqrun.raw_seqrun_util import fetch_split_samplesheets_for_seqrun
 
 # class TestRawSeqrunA(unittest.TestCase):
 #     def setUp(self):
@@ -242,5 +245,141 @@ def test_check_and_add_new_raw_seqrun(db):
     # self.assertIn('run_3', results)
     assert 'run_3' in results
 
+def test_fetch_index_collisions_for_seqrun(db):
+    with open("data/SampleSheet_v1.csv", 'r') as fp:
+        csv_data = fp.read()
+    samplesheet1 = \
+        SampleSheetModel(
+            samplesheet_tag='samplesheet1',
+            csv_data=csv_data,
+            status='PASS',
+            update_time=datetime.now(),
+            validation_time=datetime.now())
+    raw_seqrun1 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run1',
+            samplesheet=samplesheet1,
+            mismatches='2')
+    raw_seqrun2 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run2')
+    ## no reads in the run config, cycles from the run's override cycles
+    raw_seqrun3 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run3',
+            samplesheet=samplesheet1,
+            run_config='run setting',
+            override_cycles='Y151;I10;I10;Y151')
+    raw_seqrun4 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run4',
+            samplesheet=samplesheet1)
+    try:
+        db.session.add(samplesheet1)
+        db.session.add(raw_seqrun1)
+        db.session.add(raw_seqrun2)
+        db.session.add(raw_seqrun3)
+        db.session.add(raw_seqrun4)
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    result = \
+        fetch_index_collisions_for_seqrun('run2')
+    assert result is None
+    collisions, lane_mismatches, run_mismatches = \
+        fetch_index_collisions_for_seqrun('run1')
+    assert len(collisions) == 2
+    assert collisions[0]['lane'] == '3'
+    assert collisions[0]['distance'] == 3
+    assert collisions[1]['samples'] == ['IGF0008', 'IGF0009']
+    assert lane_mismatches['3'] == 1
+    assert lane_mismatches['5'] is None
+    assert run_mismatches is None
+
+def test_get_read_cycles_from_run_config():
+    assert get_read_cycles_from_run_config(None) is None
+    assert get_read_cycles_from_run_config('') is None
+    assert get_read_cycles_from_run_config('run setting') is None
+    run_config = {
+        "reads": [
+            {"number": 2, "num_cycles": 10, "is_indexed_read": "Y"},
+            {"number": 1, "num_cycles": 151, "is_indexed_read": "N"},
+            {"number": 3, "num_cycles": 10, "is_indexed_read": "Y"},
+            {"number": 4, "num_cycles": 151, "is_indexed_read": "N"}]}
+    read_cycles = \
+        get_read_cycles_from_run_config(json.dumps(run_config))
+    assert read_cycles == [('Y', 151), ('I', 10), ('I', 10), ('Y', 151)]
+    read_cycles = \
+        get_read_cycles_from_run_config({
+            "Reads": [
+                {"Number": 1, "NumCycles": 51, "IsIndexedRead": "N"},
+                {"Number": 2, "NumCycles": 8, "IsIndexedRead": "Y"}]})
+    assert read_cycles == [('Y', 51), ('I', 8)]
+
+def test_fetch_split_samplesheets_for_seqrun(db):
+    with open("data/SampleSheet_v1.csv", 'r') as fp:
+        csv_data = fp.read()
+    samplesheet1 = \
+        SampleSheetModel(
+            samplesheet_tag='samplesheet1',
+            csv_data=csv_data,
+            status='PASS',
+            update_time=datetime.now(),
+            validation_time=datetime.now())
+    run_config = {
+        "reads": [
+            {"number": 1, "num_cycles": 151, "is_indexed_read": "N"},
+            {"number": 2, "num_cycles": 10, "is_indexed_read": "Y"},
+            {"number": 3, "num_cycles": 10, "is_indexed_read": "Y"},
+            {"number": 4, "num_cycles": 151, "is_indexed_read": "N"}]}
+    raw_seqrun1 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run1',
+            samplesheet=samplesheet1,
+            run_config=json.dumps(run_config))
+    raw_seqrun2 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run2')
+    ## no reads in the run config, cycles from the run's override cycles
+    raw_seqrun3 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run3',
+            samplesheet=samplesheet1,
+            run_config='run setting',
+            override_cycles='Y151;I10;I10;Y151')
+    raw_seqrun4 = \
+        RawSeqrun(
+            raw_seqrun_igf_id='run4',
+            samplesheet=samplesheet1)
+    try:
+        db.session.add(samplesheet1)
+        db.session.add(raw_seqrun1)
+        db.session.add(raw_seqrun2)
+        db.session.add(raw_seqrun3)
+        db.session.add(raw_seqrun4)
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+    assert fetch_split_samplesheets_for_seqrun('run2') is None
+    split_samplesheets = \
+        fetch_split_samplesheets_for_seqrun('run1')
+    assert len(split_samplesheets) == 5
+    assert [s['lane'] for s in split_samplesheets] == ['1', '2', '3', '4', '5']
+    assert split_samplesheets[0]['override_cycles'] == 'Y151;I8N2;I8N2;Y151'
+    split_samplesheets = \
+        fetch_split_samplesheets_for_seqrun('run3')
+    assert split_samplesheets[0]['override_cycles'] == 'Y151;I8N2;I8N2;Y151'
+    assert 'OverrideCycles,Y151;I8N2;I8N2;Y151' in split_samplesheets[0]['csv_data']
+    ## no read cycles for the run, so no OverrideCycles
+    split_samplesheets = \
+        fetch_split_samplesheets_for_seqrun('run4')
+    assert len(split_samplesheets) == 5
+    assert split_samplesheets[0]['override_cycles'] is None
+    assert 'OverrideCycles' not in split_samplesheets[0]['csv_data']
+
 # if __name__ == '__main__':
-#   unittest.main()
\ No newline at end of file
+#   unittest.main()
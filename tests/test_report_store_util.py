@@ -0,0 +1,174 @@
+import os
+import gzip
+import time
+import hashlib
+from app.models import (
+    IlluminaInteropData,
+    PreDeMultiplexingData)
+from app.interop_data_api import load_interop_report
+from app.pre_demultiplexing_data_api import load_predemult_report
+from app import report_store_util
+from app.report_store_util import (
+    get_report_blob_path,
+    add_report_to_store,
+    add_report_variants,
+    get_report_blob_ref_counts,
+    garbage_collect_report_store)
+
+def _write_report(path, data=b'<h1>Its as test report</h1>'):
+    with open(path, 'wb') as fp:
+        fp.write(data)
+    return path
+
+def test_get_report_blob_path():
+    sha256 = hashlib.sha256(b'test').hexdigest()
+    assert get_report_blob_path('/store', sha256, 'report.html') == \
+        os.path.join('/store', 'blobs', sha256[:2], sha256[2:4], sha256, 'report.html')
+
+def test_add_report_to_store(tmp_path):
+    store_path = os.path.join(tmp_path, 'store')
+    report1 = _write_report(os.path.join(tmp_path, 'report1.html'))
+    blob1 = \
+        add_report_to_store(
+            file_path=report1,
+            store_path=store_path,
+            file_name='report.html')
+    assert os.path.exists(report1)                                              # copied
+    sha256 = hashlib.sha256(b'<h1>Its as test report</h1>').hexdigest()
+    assert blob1 == get_report_blob_path(store_path, sha256, 'report.html')
+    ## identical report collapses to the same blob
+    report2 = _write_report(os.path.join(tmp_path, 'report2.html'))
+    blob2 = \
+        add_report_to_store(
+            file_path=report2,
+            store_path=store_path,
+            file_name='report.html',
+            move_file=True)
+    assert blob2 == blob1
+    assert not os.path.exists(report2)
+    ## same bytes with another name are linked to the blob
+    report3 = _write_report(os.path.join(tmp_path, 'report3.html'))
+    blob3 = \
+        add_report_to_store(
+            file_path=report3,
+            store_path=store_path,
+            move_file=True)
+    assert os.path.basename(blob3) == 'report3.html'
+    assert os.path.samefile(blob1, blob3)
+    assert os.listdir(os.path.join(store_path, '.staging')) == []
+
+def test_load_reports_with_dedup(db, tmp_path):
+    store_path = os.path.join(tmp_path, 'store')
+    for i in range(3):
+        load_interop_report(
+            run_name='run1',
+            tag=f'test {i}',
+            file_path=_write_report(os.path.join(tmp_path, 'report.html')),
+            base_path=store_path)
+    load_predemult_report(
+        run_name='run1',
+        tag_name='test 1',
+        file_path=_write_report(os.path.join(tmp_path, 'report.html')),
+        base_path=store_path)
+    file_paths = set(
+        i[0] for i in db.session.query(IlluminaInteropData.file_path).all())
+    file_paths.update(
+        i[0] for i in db.session.query(PreDeMultiplexingData.file_path).all())
+    assert len(file_paths) == 1
+    blob_path = file_paths.pop()
+    assert get_report_blob_ref_counts([blob_path, '/missing']) == \
+        {blob_path: 4, '/missing': 0}
+
+def test_garbage_collect_report_store(db, tmp_path):
+    store_path = os.path.join(tmp_path, 'store')
+    load_interop_report(
+        run_name='run1',
+        tag='test 1',
+        file_path=_write_report(os.path.join(tmp_path, 'report.html')),
+        base_path=store_path)
+    used_blob = \
+        db.session.query(IlluminaInteropData.file_path).one()[0]
+    orphan_blob = \
+        add_report_to_store(
+            file_path=_write_report(os.path.join(tmp_path, 'orphan.html'), b'orphan'),
+            store_path=store_path)
+    new_blob = \
+        add_report_to_store(
+            file_path=_write_report(os.path.join(tmp_path, 'new.html'), b'new'),
+            store_path=store_path)
+    staged_file = \
+        _write_report(os.path.join(store_path, '.staging', 'upload_1.part'))
+    queued_file = \
+        _write_report(os.path.join(store_path, '.staging', 'upload_2.part'))
+    old_time = time.time() - 7200
+    for file_path in (used_blob, orphan_blob, queued_file):
+        os.utime(file_path, (old_time, old_time))
+    ## staged files wait longer for the queued jobs
+    staged_time = time.time() - 8 * 24 * 3600
+    os.utime(staged_file, (staged_time, staged_time))
+    assert sorted(garbage_collect_report_store(store_path, dry_run=True)) == \
+        sorted([orphan_blob, staged_file])
+    assert os.path.exists(orphan_blob)
+    removed_files = \
+        garbage_collect_report_store(store_path)
+    assert sorted(removed_files) == sorted([orphan_blob, staged_file])
+    assert not os.path.exists(os.path.dirname(orphan_blob))
+    assert os.path.exists(used_blob)
+    assert os.path.exists(new_blob)
+    assert os.path.exists(queued_file)
+
+def test_garbage_collect_keeps_reused_blob(db, tmp_path, monkeypatch):
+    store_path = os.path.join(tmp_path, 'store')
+    blob_path = \
+        add_report_to_store(
+            file_path=_write_report(os.path.join(tmp_path, 'report.html')),
+            store_path=store_path)
+    old_time = time.time() - 7200
+    os.utime(blob_path, (old_time, old_time))
+    ## blob is reused after the gc listed it as a candidate
+    def get_ref_counts(blob_paths):
+        os.utime(blob_path)
+        return get_report_blob_ref_counts(blob_paths)
+    monkeypatch.setattr(
+        report_store_util,
+        'get_report_blob_ref_counts',
+        get_ref_counts)
+    assert garbage_collect_report_store(store_path) == []
+    assert os.path.exists(blob_path)
+
+def test_add_report_variants(db, tmp_path):
+    store_path = os.path.join(tmp_path, 'store')
+    report_data = b'<h1>Its as test report</h1>' * 100
+    load_interop_report(
+        run_name='run1',
+        tag='test 1',
+        file_path=_write_report(os.path.join(tmp_path, 'report.html'), report_data),
+        base_path=store_path)
+    blob_path = \
+        db.session.query(IlluminaInteropData.file_path).one()[0]
+    with gzip.open(f"{blob_path}.gz", 'rb') as fp:
+        assert fp.read() == report_data
+    assert os.path.getsize(f"{blob_path}.gz") < len(report_data)
+    assert add_report_variants(blob_path).get('gzip') == f"{blob_path}.gz"
+    assert add_report_variants(
+        _write_report(os.path.join(tmp_path, 'plot.png'), b'png')) == {}
+    ## variants are not used for linking new names
+    blob2 = \
+        add_report_to_store(
+            file_path=_write_report(os.path.join(tmp_path, 'report2.html'), report_data),
+            store_path=store_path)
+    assert os.path.samefile(blob_path, blob2)
+    ## variants are removed with their report
+    orphan_blob = \
+        add_report_to_store(
+            file_path=_write_report(os.path.join(tmp_path, 'orphan.html'), b'orphan'),
+            store_path=store_path)
+    add_report_variants(orphan_blob)
+    old_time = time.time() - 7200
+    for file_path in (blob_path, f"{blob_path}.gz", blob2, orphan_blob, f"{orphan_blob}.gz"):
+        os.utime(file_path, (old_time, old_time))
+    removed_files = \
+        garbage_collect_report_store(store_path)
+    assert sorted(removed_files) == \
+        sorted([blob2, orphan_blob, f"{orphan_blob}.gz"])
+    assert os.path.exists(f"{blob_path}.gz")
@@ -1,8 +1,11 @@
 import os, unittest, tempfile
 from app import db
 import pandas as pd
+from io import StringIO
 from app.models import SampleSheetModel, Project, Sample
 from app.samplesheet.samplesheet_util import SampleSheet
+from app.samplesheet.samplesheet_util import get_override_cycles
+from app.samplesheet.samplesheet_util import get_read_cycles_from_override_cycles
 from app.samplesheet.samplesheet_util import update_samplesheet_validation_entry_in_db
 from app.samplesheet.samplesheet_util import validate_samplesheet_data_and_update_db
 from app.samplesheet.samplesheet_util import compare_sample_with_metadata_db
@@ -29,6 +32,189 @@ class TestSampleSheetUtil(unittest.TestCase):
         errors = sa.validate_samplesheet_data()
         self.assertEqual(len(errors), 2)
 
+    def test_read_samplesheet_from_buffer(self):
+        with open("data/SampleSheet_v1.csv", 'r') as fp:
+            csv_data = fp.read()
+        sa = SampleSheet(infile=StringIO(csv_data.replace('\n', '\r\n')))
+        self.assertEqual(sa.samplesheet_version, 'v1')
+        self.assertEqual(len(sa._data), 8)
+        sa_file = SampleSheet(infile="data/SampleSheet_v1.csv")
+        self.assertEqual(sa._data, sa_file._data)
+        self.assertEqual(sa._header_data, sa_file._header_data)
+        self.assertEqual(
+            sa.validate_samplesheet_data(),
+            sa_file.validate_samplesheet_data())
+
+    def test_get_override_cycles(self):
+        read_cycles = [('Y', 151), ('I', 10), ('I', 10), ('Y', 151)]
+        self.assertEqual(
+            get_override_cycles(read_cycles, 8, 8),
+            'Y151;I8N2;I8N2;Y151')
+        self.assertEqual(
+            get_override_cycles(read_cycles, 10, 0),
+            'Y151;I10;N10;Y151')
+        with self.assertRaises(ValueError):
+            get_override_cycles(read_cycles, 12, 8)
+        with self.assertRaises(ValueError):
+            get_override_cycles([('Y', 151), ('I', 8), ('Y', 151)], 8, 8)
+
+    def test_get_read_cycles_from_override_cycles(self):
+        self.assertIsNone(get_read_cycles_from_override_cycles(None))
+        self.assertIsNone(get_read_cycles_from_override_cycles('Y*;I8;I8;Y*'))
+        self.assertEqual(
+            get_read_cycles_from_override_cycles('Y151;I8N2;N10;Y151'),
+            [('Y', 151), ('I', 10), ('I', 10), ('Y', 151)])
+        self.assertEqual(
+            get_read_cycles_from_override_cycles('U8Y143;I8;Y151'),
+            [('Y', 151), ('I', 8), ('Y', 151)])
+        with self.assertRaises(ValueError):
+            get_read_cycles_from_override_cycles('Y151;X8;Y151')
+
+    def test_get_split_samplesheets(self):
+        with open("data/SampleSheet_v1.csv", 'r') as fp:
+            csv_data = fp.read()
+        csv_data = csv_data.replace(
+            '4,IGF0005,s4,,,702,TCCGGAGA,506,TAAGATTA,',
+            '4,IGF0005,s4,,,702,TCCGGAGATT,,,')
+        sa = SampleSheet(infile=StringIO(csv_data))
+        ## index cycles of the run are not known without the read cycles
+        split_samplesheets = sa.get_split_samplesheets()
+        self.assertTrue(
+            all(s['override_cycles'] is None for s in split_samplesheets))
+        self.assertTrue(
+            all('OverrideCycles' not in s['csv_data'] for s in split_samplesheets))
+        split_samplesheets = \
+            sa.get_split_samplesheets(
+                read_cycles=[('Y', 151), ('I', 10), ('I', 8), ('Y', 151)])
+        self.assertEqual(
+            [(s['lane'], s['index1_length'], s['index2_length'], s['sample_count'])
+                for s in split_samplesheets],
+            [('1', 8, 8, 1), ('2', 8, 8, 1), ('3', 8, 8, 2),
+             ('4', 8, 8, 1), ('4', 10, 0, 1), ('5', 8, 8, 2)])
+        self.assertEqual(
+            split_samplesheets[3]['override_cycles'],
+            'Y151;I8N2;I8;Y151')
+        self.assertEqual(
+            split_samplesheets[4]['override_cycles'],
+            'Y151;I10;N8;Y151')
+        split_samplesheets = \
+            sa.get_split_samplesheets(
+                read_cycles=[('Y', 151), ('I', 10), ('I', 10), ('Y', 151)])
+        sub_sheet = \
+            SampleSheet(infile=StringIO(split_samplesheets[4]['csv_data']))
+        self.assertEqual(sub_sheet.samplesheet_version, 'v2')
+        self.assertEqual(
+            sub_sheet._data,
+            [{'Lane': '4', 'Sample_ID': 'IGF0005', 'index': 'TCCGGAGATT',
+              'index2': '', 'Sample_Project': 'IGFQ_project_1'}])
+        self.assertIn(
+            'OverrideCycles,Y151;I10;N10;Y151',
+            split_samplesheets[4]['csv_data'])
+        ## single cell samples don't get the template OverrideCycles
+        csv_data = csv_data.replace(
+            '5,IGF0009,s9,,,703,TCCGGAGA ,501,GTCAGTAC,',
+            '5,IGF0009,s9,,,SI-GA-A1,SI-GA-A1,,,')
+        sa = SampleSheet(infile=StringIO(csv_data))
+        split_samplesheets = \
+            sa.get_split_samplesheets(
+                read_cycles=[('Y', 151), ('I', 10), ('I', 10), ('Y', 151)])
+        single_cell_sheet = [
+            s for s in split_samplesheets
+                if s['lane'] == '5' and s['index1_length'] is None][0]
+        self.assertIsNone(single_cell_sheet['override_cycles'])
+        self.assertNotIn('OverrideCycles', single_cell_sheet['csv_data'])
+        self.assertIn('SI-GA-A1', single_cell_sheet['csv_data'])
+
+    def test_get_index_collisions(self):
+        sa = SampleSheet(infile="data/SampleSheet_v1.csv")
+        collisions, lane_mismatches = \
+            sa.get_index_collisions(mismatches=1)
+        self.assertEqual(len(collisions), 1)
+        self.assertEqual(collisions[0]['lane'], '5')
+        self.assertEqual(collisions[0]['samples'], ['IGF0008', 'IGF0009'])
+        self.assertEqual(collisions[0]['distance'], 0)
+        self.assertEqual(lane_mismatches['1'], 2)
+        self.assertEqual(lane_mismatches['3'], 1)
+        self.assertIsNone(lane_mismatches['5'])
+        sa._data = [
+            {"Lane": "1", "Sample_ID": "IGF1", "index": "AAAAAAAA", "index2": "CCCCCCCC"},
+            {"Lane": "1", "Sample_ID": "IGF2", "index": "AAAAAATT", "index2": "CCCCCCCC"},
+            {"Lane": "1", "Sample_ID": "IGF3", "index": "AAAAAAAATT", "index2": ""},
+            {"Lane": "1", "Sample_ID": "IGF4", "index": "SI-GA-A1", "index2": ""},
+            {"Lane": "2", "Sample_ID": "IGF5", "index": "GGGGGG", "index2": "TTTTTT"},
+            {"Lane": "2", "Sample_ID": "IGF6", "index": "GGGGGN", "index2": "TTTTTG"}]
+        collisions, lane_mismatches = \
+            sa.get_index_collisions(mismatches=1, block_size=2)
+        self.assertEqual(
+            [(c['samples'], c['distance']) for c in collisions],
+            [(['IGF1', 'IGF2'], 2),
+             (['IGF1', 'IGF3'], 0),
+             (['IGF2', 'IGF3'], 2),
+             (['IGF5', 'IGF6'], 1)])
+        self.assertIsNone(lane_mismatches['1'])
+        self.assertEqual(lane_mismatches['2'], 0)
+        self.assertNotIn('IGF4', str(collisions))
+
+    def test_check_samplesheet_data_columns(self):
+        data = pd.DataFrame([{
+            "Sample_ID": "IGF0001",
+            "Sample_Name": "IGF0001",
+            "I5_Index_ID": "501",
+            "index": "AAAAAA",
+            "index2": "",
+            "Description": ""
+        },{
+            "Sample_ID": "IGF0002",
+            "Sample_Name": "s2",
+            "I5_Index_ID": "",
+            "index": "SI-GA-A1",
+            "index2": "AAAAAA",
+            "Description": "10x"
+        },{
+            "Sample_ID": "IGF0003",
+            "Sample_Name": "s3",
+            "I5_Index_ID": "",
+            "index": "AAAAAA",
+            "index2": "",
+            "Description": "10X"
+        },{
+            "Sample_ID": "IGF0004",
+            "Sample_Name": "s4",
+            "I5_Index_ID": "",
+            "index": "SI-TT-B12",
+            "index2": "",
+            "Description": ""
+        },{
+            "Sample_ID": "IGF0005",
+            "Sample_Name": "s5",
+            "I5_Index_ID": "502",
+            "index": "AAAAAA",
+            "index2": "TTTTTT",
+            "Description": ""
+        }])
+        column_errors = \
+            SampleSheet._check_samplesheet_data_columns(data=data)
+        row_errors = \
+            data.apply(
+                lambda x: SampleSheet._check_samplesheet_data_row(data_series=x),
+                axis=1)
+        self.assertEqual(
+            column_errors.dropna().to_dict(),
+            row_errors.dropna().to_dict())
+        self.assertEqual(len(column_errors.dropna()), 4)
+        self.assertEqual(
+            column_errors[0],
+            "Same sample id and sample names are not allowedIGF0001\n"
+            + "Missing I_5 index sequences for IGF0001")
+        self.assertEqual(
+            column_errors[1],
+            "Found I_5 index(2) for single cell sample IGF0002")
+        self.assertTrue(pd.isna(column_errors[4]))
+        column_errors = \
+            SampleSheet._check_samplesheet_data_columns(
+                data=data.drop(columns=["index2"]))
+        self.assertTrue("Missing I_5 index sequences for IGF0005" in column_errors[4])
+
 class TestSampleSheetDbUpdate(unittest.TestCase):
     def setUp(self):
         db.create_all()
@@ -239,6 +425,11 @@ class TestSampleSheetDbUpdate(unittest.TestCase):
                 samplesheet_file=samplesheet_file)
         self.assertTrue('Missing metadata for sample test_sample3' in metadata_errors)
         self.assertTrue("Sample test_sample2 is linked to project test2, not test1" in metadata_errors)
+        with open(samplesheet_file, 'r') as fp:
+            sa = SampleSheet(infile=fp)
+        self.assertEqual(
+            compare_sample_with_metadata_db(samplesheet=sa),
+            metadata_errors)
 
 
 
@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import patch
+from app.models import SampleSheetModel, SampleSheetVariantModel
+from app.samplesheet_view import (
+    async_get_samplesheet_validation_report,
+    async_update_samplesheet_validation_reports,
+    submit_samplesheet_validation_jobs)
+
+def _add_samplesheets(db):
+    with open("data/SampleSheet_v1.csv", 'r') as fp:
+        csv_data = fp.read()
+    samplesheet1 = \
+        SampleSheetModel(
+            samplesheet_id=1,
+            samplesheet_tag='test1',
+            csv_data=csv_data)
+    samplesheet2 = \
+        SampleSheetModel(
+            samplesheet_id=2,
+            samplesheet_tag='test2',
+            csv_data=csv_data)
+    try:
+        db.session.add(samplesheet1)
+        db.session.add(samplesheet2)
+        db.session.flush()
+        db.session.commit()
+    except:
+        db.session.rollback()
+        raise
+
+def test_async_get_samplesheet_validation_report(db):
+    _add_samplesheets(db)
+    with patch(
+        'app.samplesheet.samplesheet_util.compare_sample_with_metadata_db',
+        return_value=[]):
+        report = \
+            async_get_samplesheet_validation_report(samplesheet_id=1)
+    assert report['samplesheet_id'] == 1
+    assert report['samplesheet_tag'] == 'test1'
+    assert report['status'] == 'failed'
+    assert report['report'].startswith('1. ')
+    report = \
+        async_get_samplesheet_validation_report(samplesheet_id=3)
+    assert report is None
+    entry = \
+        db.session.\
+            query(SampleSheetModel).\
+            filter(SampleSheetModel.samplesheet_id==1).\
+            one_or_none()
+    assert entry.status == 'UNKNOWN'
+
+def test_async_update_samplesheet_validation_reports(db):
+    _add_samplesheets(db)
+    results = \
+        async_update_samplesheet_validation_reports(
+            report_list=[
+                {'samplesheet_id': 1, 'status': 'pass', 'report': ''},
+                {'samplesheet_id': 2, 'status': 'failed', 'report': '1. error'},
+                {'samplesheet_id': 3, 'status': None, 'error': 'error'},
+                None])
+    assert results == {1: 'pass', 2: 'failed', 3: None}
+    entry1 = \
+        db.session.\
+            query(SampleSheetModel).\
+            filter(SampleSheetModel.samplesheet_id==1).\
+            one_or_none()
+    assert entry1.status == 'PASS'
+    assert entry1.validation_time is not None
+    entry2 = \
+        db.session.\
+            query(SampleSheetModel).\
+            filter(SampleSheetModel.samplesheet_id==2).\
+            one_or_none()
+    assert entry2.status == 'FAILED'
+    assert entry2.report == '1. error'
+    variants = \
+        db.session.\
+            query(
+                SampleSheetVariantModel.samplesheet_id,
+                SampleSheetVariantModel.variant_type).\
+            all()
+    assert sorted(variants) == [(1, 'I5_RC'), (1, 'ORIGINAL'), (1, 'V2')]
+
+def test_async_update_samplesheet_validation_reports_failure(db):
+    ## a failed db update is reported as a failed task, not as a null result
+    with patch(
+        'app.samplesheet_view.update_samplesheet_validation_entries_in_db',
+        side_effect=ValueError('db error')):
+        with pytest.raises(ValueError):
+            async_update_samplesheet_validation_reports(
+                report_list=[{'samplesheet_id': 1, 'status': 'pass', 'report': ''}])
+
+def test_submit_samplesheet_validation_jobs(db):
+    with patch('app.samplesheet_view.chord') as mock_chord:
+        submit_samplesheet_validation_jobs(id_list=[1, 2])
+        mock_chord.assert_called_once()
+        header_tasks = list(mock_chord.call_args[0][0])
+        assert len(header_tasks) == 2
+        assert header_tasks[0].args == (1,)
@@ -0,0 +1,70 @@
+import json
+import glob
+import random
+import pandas as pd
+from jsonschema import Draft4Validator, Draft202012Validator
+from app.schema_registry.schema_compiler_util import (
+    CompiledSchemaValidator,
+    format_validation_errors)
+
+def _get_random_rows(schema: dict, row_count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    rows = list()
+    properties = schema['items']['properties']
+    for i in range(row_count):
+        row = dict()
+        for property_name, subschema in properties.items():
+            choices = ['', 'IGF1', 'IGF1 2', 'a@b.com', 'ACGT', 'abcdefghijklmnopqrstuvwxyz', 1, 2.5, True]
+            choices.extend(subschema.get('enum', [])[:3])
+            row[property_name] = rng.choice(choices)
+        rows.append(row)
+    return rows
+
+def test_compiled_validator_matches_jsonschema():
+    for schema_file in (
+        'app/samplesheet/samplesheet_validation.json',
+        'app/raw_metadata/metadata_validation.json'):
+        with open(schema_file, 'r') as fp:
+            schema = json.load(fp)
+        validator = Draft4Validator(schema)
+        compiled_validator = CompiledSchemaValidator(validator)
+        assert compiled_validator.is_compiled
+        rows = _get_random_rows(schema, row_count=300, seed=1)
+        df = pd.DataFrame(rows)
+        str_df = df.fillna('').astype(str)
+        for data in (
+            df,
+            str_df,
+            str_df.drop(columns=[schema['items']['required'][0]]),
+            pd.concat([str_df.head(2), str_df.head(2)]),
+            str_df.head(0)):
+            expected_errors = \
+                format_validation_errors(
+                    validator.iter_errors(data.to_dict(orient='records')))
+            assert compiled_validator.validate_dataframe(data) == expected_errors
+
+def test_compiled_validator_fallback():
+    for schema_file in glob.glob('app/raw_analysis/analysis_validation_*.json'):
+        with open(schema_file, 'r') as fp:
+            schema = json.load(fp)
+        compiled_validator = \
+            CompiledSchemaValidator(Draft202012Validator(schema))
+        assert not compiled_validator.is_compiled
+    schema = {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "A": {"type": "integer", "minimum": 2}}}}
+    validator = Draft4Validator(schema)
+    compiled_validator = CompiledSchemaValidator(validator)
+    assert not compiled_validator.is_compiled
+    assert 'minimum' in compiled_validator.fallback_reason
+    data = pd.DataFrame([{"A": 1}, {"A": 3}, {"A": 1.5}])
+    errors = compiled_validator.validate_dataframe(data)
+    assert errors == [
+        "A: 1.0 is not of type 'integer'",
+        "A: 1.0 is less than the minimum of 2",
+        "A: 3.0 is not of type 'integer'",
+        "A: 1.5 is not of type 'integer'",
+        "A: 1.5 is less than the minimum of 2"]
@@ -0,0 +1,73 @@
+import os
+import json
+import tempfile
+from jsonschema import Draft4Validator, Draft202012Validator
+from app.schema_registry.schema_registry_util import SchemaValidatorRegistry
+
+def test_get_validator_for_file():
+    registry = SchemaValidatorRegistry(maxsize=2)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        schema_file = os.path.join(temp_dir, 'schema.json')
+        with open(schema_file, 'w') as fp:
+            json.dump({"type": "string"}, fp)
+        validator1 = \
+            registry.get_validator_for_file(
+                schema_file=schema_file,
+                validator_class=Draft4Validator)
+        validator2 = \
+            registry.get_validator_for_file(
+                schema_file=schema_file,
+                validator_class=Draft4Validator)
+        assert validator1 is validator2
+        assert registry.get_stats()['hits'] == 1
+        assert registry.get_stats()['misses'] == 1
+        assert len(list(validator1.iter_errors(1))) == 1
+        ## reload schema after file change
+        with open(schema_file, 'w') as fp:
+            json.dump({"type": "integer"}, fp)
+        os.utime(schema_file, ns=(0, 0))
+        validator3 = \
+            registry.get_validator_for_file(
+                schema_file=schema_file,
+                validator_class=Draft4Validator)
+        assert validator3 is not validator1
+        assert len(list(validator3.iter_errors(1))) == 0
+        assert registry.get_stats()['size'] == 1
+
+def test_get_validator_for_schema():
+    registry = SchemaValidatorRegistry(maxsize=2)
+    validator1 = \
+        registry.get_validator_for_schema(
+            schema='{"type": "string"}',
+            source='schema:1',
+            validator_class=Draft202012Validator)
+    validator2 = \
+        registry.get_validator_for_schema(
+            schema='{"type": "string"}',
+            source='schema:1')
+    assert validator1 is validator2
+    validator3 = \
+        registry.get_validator_for_schema(
+            schema='{"type": "integer"}',
+            source='schema:1')
+    assert validator3 is not validator1
+    assert registry.get_stats()['size'] == 1
+    registry.invalidate(source='schema:1')
+    assert registry.get_stats()['size'] == 0
+    ## lru eviction
+    registry.get_validator_for_schema(schema='{"type": "string"}')
+    registry.get_validator_for_schema(schema='{"type": "integer"}')
+    registry.get_validator_for_schema(schema='{"type": "string"}')
+    registry.get_validator_for_schema(schema='{"type": "number"}')
+    stats = registry.get_stats()
+    assert stats['size'] == 2
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 2
+    assert stats['misses'] == 5
+    registry.get_validator_for_schema(schema='{"type": "string"}')
+    assert registry.get_stats()['hits'] == 3
+    try:
+        registry.get_validator_for_schema(schema='{"A", "B"}')
+        assert False
+    except json.JSONDecodeError:
+        pass
@@ -0,0 +1,244 @@
+import os
+import pytest
+from app import app, cache
+from app.models import (
+    Project,
+    Sample,
+    IgfUser,
+    SampleSheetModel,
+    RawMetadataModel)
+from app.validation_cache.validation_cache_util import (
+    get_normalized_content_hash,
+    get_schema_file_stamp,
+    get_igfdb_reference_stamp,
+    get_validation_cache_key,
+    get_cached_validation_report,
+    set_cached_validation_report,
+    invalidate_validation_cache)
+from app.samplesheet.samplesheet_util import (
+    SAMPLESHEET_SCHEMA_JSON,
+    get_samplesheet_validation_report)
+from app.raw_metadata.raw_metadata_util import (
+    validate_raw_metadata_and_set_db_status)
+from app.metadata.igfdb_lookup_util import invalidate_igfdb_reference_lookups
+from app.schema_registry.schema_registry_util import schema_validator_registry
+
+@pytest.fixture(scope="function")
+def simple_cache():
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache"})
+    yield cache
+    cache.init_app(app)
+
+def test_get_normalized_content_hash():
+    hash1 = \
+        get_normalized_content_hash("a,b\nc,d\n")
+    hash2 = \
+        get_normalized_content_hash(b"\xef\xbb\xbfa,b\r\n\r\nc,d\r\n\r\n")
+    hash3 = \
+        get_normalized_content_hash("a,b\nc,d ,\n")
+    assert hash1 == hash2
+    assert hash1 != hash3
+
+def test_get_schema_file_stamp(tmp_path):
+    schema_file = tmp_path / "schema.json"
+    schema_file.write_text('{"type": "array"}')
+    stamp1 = get_schema_file_stamp(str(schema_file))
+    os.utime(schema_file, ns=(0, 0))
+    stamp2 = get_schema_file_stamp(str(schema_file))
+    assert stamp1 != stamp2
+
+def test_get_igfdb_reference_stamp(db):
+    stamp1 = get_igfdb_reference_stamp()
+    assert stamp1 == get_igfdb_reference_stamp()
+    project = \
+        Project(
+            project_id=1,
+            project_igf_id="test1")
+    db.session.add(project)
+    db.session.commit()
+    stamp2 = get_igfdb_reference_stamp()
+    assert stamp1 != stamp2
+    user = \
+        IgfUser(
+            user_id=1,
+            name='test user',
+            email_id='test@x.com',
+            username='test')
+    db.session.add(user)
+    db.session.commit()
+    stamp3 = get_igfdb_reference_stamp()
+    assert stamp2 != stamp3
+
+def test_get_validation_cache_key(db, simple_cache):
+    key1 = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data="a,b\nc,d\n",
+            schema_file=SAMPLESHEET_SCHEMA_JSON)
+    key2 = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data="a,b\r\nc,d\r\n",
+            schema_file=SAMPLESHEET_SCHEMA_JSON)
+    assert key1 == key2
+    set_cached_validation_report(
+        cache_key=key1,
+        status='pass',
+        report='')
+    assert get_cached_validation_report(key2) == {'status': 'pass', 'report': ''}
+    db.session.add(Project(project_id=1, project_igf_id="test1"))
+    db.session.commit()
+    key3 = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data="a,b\nc,d\n",
+            schema_file=SAMPLESHEET_SCHEMA_JSON)
+    assert key1 != key3
+    assert get_cached_validation_report(key3) is None
+    key4 = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data="a,b\nc,d\n",
+            schema_file=SAMPLESHEET_SCHEMA_JSON,
+            check_db=False)
+    set_cached_validation_report(
+        cache_key=key4,
+        status='pass',
+        report='')
+    invalidate_validation_cache()
+    key5 = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data="a,b\nc,d\n",
+            schema_file=SAMPLESHEET_SCHEMA_JSON,
+            check_db=False)
+    assert key4 != key5
+    assert get_cached_validation_report(key5) is None
+
+def test_get_samplesheet_validation_report_from_cache(db, simple_cache):
+    with open("data/SampleSheet_v1.csv", 'r') as fp:
+        csv_data = fp.read()
+    db.session.add(
+        SampleSheetModel(
+            samplesheet_id=1,
+            samplesheet_tag='test1',
+            csv_data=csv_data))
+    db.session.add(
+        SampleSheetModel(
+            samplesheet_id=2,
+            samplesheet_tag='test2',
+            csv_data=csv_data.replace('\n', '\r\n')))
+    db.session.commit()
+    report1 = \
+        get_samplesheet_validation_report(
+            samplesheet_id=1)
+    cache_key = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data=csv_data,
+            schema_file=SAMPLESHEET_SCHEMA_JSON)
+    assert get_cached_validation_report(cache_key) == {
+        'status': report1.get('status'),
+        'report': report1.get('report')}
+    report2 = \
+        get_samplesheet_validation_report(
+            samplesheet_id=2)
+    assert report2.get('samplesheet_tag') == 'test2'
+    assert report2.get('status') == report1.get('status')
+    assert report2.get('report') == report1.get('report')
+    report3 = \
+        get_samplesheet_validation_report(
+            samplesheet_id=2,
+            use_cache=False)
+    assert report3 == report2
+
+def test_validate_raw_metadata_from_cache(db, simple_cache):
+    with open("data/metadata_file1.csv", "r") as fp:
+        csv_data = fp.read()
+    db.session.add(
+        RawMetadataModel(
+            raw_metadata_id=1,
+            metadata_tag='test1',
+            raw_csv_data='raw',
+            formatted_csv_data=csv_data,
+            report=''))
+    db.session.add(
+        RawMetadataModel(
+            raw_metadata_id=2,
+            metadata_tag='test2',
+            raw_csv_data='raw',
+            formatted_csv_data=csv_data,
+            report=''))
+    db.session.commit()
+    status1 = \
+        validate_raw_metadata_and_set_db_status(
+            raw_metadata_id=1)
+    status2 = \
+        validate_raw_metadata_and_set_db_status(
+            raw_metadata_id=2)
+    assert status1 == 'FAILED'
+    assert status2 == status1
+    entries = (
+        db.session
+        .query(RawMetadataModel)
+        .order_by(RawMetadataModel.raw_metadata_id)
+        .all()
+    )
+    assert entries[0].report != ''
+    assert entries[0].report == entries[1].report
+    assert entries[1].status == 'FAILED'
+
+def test_samplesheet_validation_after_igfdb_load(db, simple_cache):
+    with open("data/SampleSheet_v1.csv", 'r') as fp:
+        csv_data = fp.read()
+    db.session.add(
+        SampleSheetModel(
+            samplesheet_id=1,
+            samplesheet_tag='test1',
+            csv_data=csv_data))
+    db.session.commit()
+    report1 = \
+        get_samplesheet_validation_report(
+            samplesheet_id=1)
+    assert 'IGFQ_project_1' in report1.get('report')
+    ## igfdb is loaded outside of the portal session
+    with db.session.get_bind(mapper=Project.__mapper__).begin() as conn:
+        conn.execute(
+            Project.__table__.insert(), [
+                {'project_id': 1, 'project_igf_id': 'IGFQ_phix_test'},
+                {'project_id': 2, 'project_igf_id': 'IGFQ_project_1'}])
+        conn.execute(
+            Sample.__table__.insert(), [
+                {'sample_id': i, 'sample_igf_id': sample_id, 'project_id': project_id}
+                    for i, (sample_id, project_id) in enumerate([
+                        ('PhiX', 1), ('IGF0001', 2), ('IGF0004', 2),
+                        ('IGF0005', 2), ('IGF0008', 2), ('IGF0009', 2)], start=1)])
+    report2 = \
+        get_samplesheet_validation_report(
+            samplesheet_id=1)
+    assert report2 == \
+        get_samplesheet_validation_report(
+            samplesheet_id=1,
+            use_cache=False)
+    assert 'IGFQ_project_1' not in report2.get('report')
+    ## cached reports are dropped with the lookups
+    cache_key = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data=csv_data,
+            schema_file=SAMPLESHEET_SCHEMA_JSON)
+    assert get_cached_validation_report(cache_key) is not None
+    invalidate_igfdb_reference_lookups()
+    cache_key2 = \
+        get_validation_cache_key(
+            kind='samplesheet',
+            csv_data=csv_data,
+            schema_file=SAMPLESHEET_SCHEMA_JSON)
+    assert cache_key2 != cache_key
+    assert get_cached_validation_report(cache_key2) is None
+    ## but not with the schema validators, e.g. for an analysis schema
+    schema_validator_registry.invalidate()
+    assert get_validation_cache_key(
+        kind='samplesheet',
+        csv_data=csv_data,
+        schema_file=SAMPLESHEET_SCHEMA_JSON) == cache_key2